@@ -0,0 +1,34 @@
+"""
+Helpers shared by cinch's benchmarks. Each benchmark module can be run as
+a script, and prints its results as JSON.
+"""
+
+from __future__ import absolute_import, print_function
+import json
+import os
+import sys
+from timeit import default_timer
+
+
+# Benchmark the working tree's cinch, rather than an installed one.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def ops_per_sec(func, number=1000, repeat=3):
+    """
+    Call ``func`` ``number`` times, ``repeat`` times over, and return the
+    best rate achieved, in calls per second.
+    """
+    best = None
+    for _ in range(repeat):
+        start = default_timer()
+        for _ in range(number):
+            func()
+        elapsed = default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return number / best if best else float('inf')
+
+
+def print_results(results):
+    """Print a dict of results as stable (sorted, indented) JSON."""
+    print(json.dumps(results, indent=2, sort_keys=True))
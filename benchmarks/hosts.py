@@ -0,0 +1,61 @@
+"""
+Host validation throughput, by number of ALLOWED_HOSTS patterns (half
+exact hosts, half '.example.com' patterns): a linear scan, as Django
+does, against cinch's compiled HostMatcher (see cinch.hosts).
+
+    python -m benchmarks.hosts [--number N]
+"""
+
+from __future__ import absolute_import
+from optparse import OptionParser
+from .common import ops_per_sec, print_results
+from cinch.hosts import HostMatcher, split_domain
+
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def make_patterns(size):
+    return ['tenant{}.example.com'.format(i) if i % 2 else '.tenant{}.example.org'.format(i)
+            for i in range(size)]
+
+
+def linear_validate(host, patterns):
+    """Django's validate_host(): a scan of each pattern in turn."""
+    domain = split_domain(host)
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if pattern == '*' or pattern.startswith('.') and (
+                domain.endswith(pattern) or domain == pattern[1:]) or pattern == domain:
+            return True
+    return False
+
+
+def run(number=2000):
+    results = {}
+    for size in SIZES:
+        patterns = make_patterns(size)
+        matcher = HostMatcher(patterns)
+        # The last patterns (the worst case for a scan), and a miss.
+        hosts = ['tenant{}.example.com:8000'.format(size - 1),
+                 'www.tenant{}.example.org'.format(size - 2),
+                 'unknown.example.net']
+        assert [matcher.validate(host) for host in hosts] == \
+            [linear_validate(host, patterns) for host in hosts] == [True, True, False]
+        scan_number = max(10, number * 10 // size)
+        results['hosts.{}.linear_per_sec'.format(size)] = round(ops_per_sec(
+            lambda: [linear_validate(host, patterns) for host in hosts], scan_number))
+        results['hosts.{}.matcher_per_sec'.format(size)] = round(ops_per_sec(
+            lambda: [matcher.validate(host) for host in hosts], number))
+    return results
+
+
+def main(argv=None):
+    parser = OptionParser()
+    parser.add_option('--number', type='int', default=2000)
+    options, args = parser.parse_args(argv)
+    print_results(run(options.number))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Time taken to import and include each of cinch's settings modules, in a
+fresh interpreter, for a project in a temporary directory. On Pythons
+with ``-X importtime`` (3.7+), the time spent importing modules is
+reported too, along with the slowest imports.
+
+Exits non-zero if any module takes longer than its budget, in ms:
+
+    python -m benchmarks.importtime [--budget MS] [--import-budget MS] [--repeat N]
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from optparse import OptionParser
+from timeit import default_timer
+from .common import print_results
+
+
+SETTINGS_MODULES = ('default', 'debug', 'prod', 'bootstrap')
+
+# Run in a fresh interpreter, as a project's settings file would be.
+INCLUDE_SCRIPT = """
+import sys
+sys.path.insert(0, {cinch_path!r})
+from unipath import Path
+from cinch import include_settings
+g = {{'PROJECT_DIR': Path({project_dir!r}), 'PROJECT_NAME': 'project', 'ADMINS': ()}}
+include_settings(g, {module!r})
+"""
+
+
+def has_importtime():
+    return sys.version_info >= (3, 7)
+
+
+def parse_importtime(stderr):
+    """
+    Return the total microseconds spent importing (the sum of top-level
+    imports' cumulative times) and a list of (self us, module) pairs.
+    """
+    total, modules = 0, []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue    # The header
+        modules.append((int(self_us), name.strip()))
+        # Top-level imports are indented by one space; nested ones by more.
+        if not name.startswith('  '):
+            total += int(cumulative_us)
+    return total, modules
+
+
+def time_include(module, project_dir):
+    """
+    Include settings ``module`` in a new interpreter, and return (wall ms,
+    import us or None, slowest imports or None).
+    """
+    cinch_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = INCLUDE_SCRIPT.format(cinch_path=cinch_path, project_dir=project_dir,
+                                   module=module)
+    command = [sys.executable] + (['-X', 'importtime'] if has_importtime() else []) + \
+        ['-c', script]
+    start = default_timer()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    stdout, stderr = process.communicate()
+    wall_ms = (default_timer() - start) * 1000
+    if process.returncode:
+        raise RuntimeError("Including {} failed:\n{}".format(
+            module, '\n'.join(line for line in stderr.splitlines()
+                              if not line.startswith('import time:'))))
+    if not has_importtime():
+        return wall_ms, None, None
+    import_us, modules = parse_importtime(stderr)
+    return wall_ms, import_us, sorted(modules, reverse=True)[:5]
+
+
+def run(repeat=3):
+    project_dir = tempfile.mkdtemp(prefix='cinch-importtime-')
+    results = {}
+    try:
+        for module in SETTINGS_MODULES:
+            # The best of a few runs, to reduce noise from the machine.
+            timings = [time_include(module, project_dir) for _ in range(repeat)]
+            wall_ms, import_us, slowest = min(timings, key=lambda timing: timing[0])
+            results['settings.{}.wall_ms'.format(module)] = round(wall_ms, 1)
+            if import_us is not None:
+                results['settings.{}.import_ms'.format(module)] = round(import_us / 1000.0, 1)
+                results['settings.{}.slowest_imports'.format(module)] = [
+                    '{} ({:.1f} ms)'.format(name, self_us / 1000.0)
+                    for (self_us, name) in slowest]
+    finally:
+        shutil.rmtree(project_dir)
+    return results
+
+
+def over_budget(results, budget_ms=None, import_budget_ms=None):
+    """Return the names of results which exceed their budget."""
+    over = []
+    for (name, value) in sorted(results.items()):
+        if name.endswith('.wall_ms') and budget_ms is not None and value > budget_ms:
+            over.append(name)
+        if name.endswith('.import_ms') and import_budget_ms is not None and \
+                value > import_budget_ms:
+            over.append(name)
+    return over
+
+
+def main(argv=None):
+    parser = OptionParser()
+    parser.add_option('--budget', type='float', default=500,
+                      help="Most ms including a settings module may take.")
+    parser.add_option('--import-budget', type='float', default=250,
+                      help="Most ms importing modules may take, per settings module.")
+    parser.add_option('--repeat', type='int', default=3)
+    options, args = parser.parse_args(argv)
+    results = run(options.repeat)
+    print_results(results)
+    over = over_budget(results, options.budget, options.import_budget)
+    if over:
+        sys.stderr.write("Over budget: {}\n".format(', '.join(over)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Records formatted per second by the 'verbose' and 'simple' formatters in
+cinch.settings.base, and by JSONLinesFormatter with the standard library
+and fastest available JSON serialisers.
+
+    python -m benchmarks.logformatters [--records N]
+"""
+
+from __future__ import absolute_import
+import logging
+from optparse import OptionParser
+from .common import ops_per_sec, print_results
+from cinch.logformatters import JSONLinesFormatter
+
+
+VERBOSE_FORMAT = "\n%(levelname)s [%(asctime)s][%(pathname)s:%(lineno)s]" + \
+    "[p/t:%(process)d/%(thread)d]\n%(message)s"
+SIMPLE_FORMAT = '%(levelname)s [%(module)s:%(lineno)s] %(message)s'
+
+
+def make_record():
+    return logging.LogRecord(
+        'django.request', logging.ERROR, '/srv/project/src/apps/views.py', 42,
+        'Internal Server Error: %s (user %d)', ('/some/path/', 1234), None, 'view')
+
+
+def run(records=20000):
+    formatters = {
+        'verbose': logging.Formatter(VERBOSE_FORMAT),
+        'simple': logging.Formatter(SIMPLE_FORMAT),
+        'jsonlines': JSONLinesFormatter(serializer='json'),
+        'jsonlines-fast': JSONLinesFormatter(serializer='fast'),
+    }
+    record = make_record()
+    return {'formatters.{}.records_per_sec'.format(name): round(ops_per_sec(
+                lambda: formatter.format(record), number=records))
+            for (name, formatter) in formatters.items()}
+
+
+def main(argv=None):
+    parser = OptionParser()
+    parser.add_option('--records', type='int', default=20000)
+    options, args = parser.parse_args(argv)
+    print_results(run(options.records))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+LoggingSetting construction, and deep_update() with large maps of
+handlers and loggers, as when many settings modules build on base.py.
+
+    python -m benchmarks.loggingsetting [--number N] [--size N]
+"""
+
+from __future__ import absolute_import
+from optparse import OptionParser
+from .common import ops_per_sec, print_results
+from cinch.logging import LoggingSetting
+
+
+def make_overlay(size, prefix='app'):
+    """A LOGGING-style dict with ``size`` handlers and loggers."""
+    names = ['{}{}'.format(prefix, i) for i in range(size)]
+    return {
+        'handlers': dict((name, {
+            'level': 'DEBUG',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': '/srv/project/var/log/{}.log'.format(name),
+            'formatter': 'verbose',
+        }) for name in names),
+        'loggers': dict((name, {
+            'handlers': [name],
+            'level': 'INFO',
+            'propagate': False,
+        }) for name in names),
+    }
+
+
+def run(number=200, size=500):
+    overlays = [make_overlay(size, prefix) for prefix in ('base', 'debug', 'local')]
+
+    def construct():
+        LoggingSetting(logfile_dir='/srv/project/var/log')
+
+    def deep_update():
+        setting = LoggingSetting(logfile_dir='/srv/project/var/log')
+        for overlay in overlays:
+            setting.deep_update(overlay)
+
+    def deep_update_and_resolve():
+        setting = LoggingSetting(logfile_dir='/srv/project/var/log')
+        for overlay in overlays:
+            setting.deep_update(overlay)
+        setting['loggers']['local0']['level'] = 'DEBUG'
+        setting.resolve()
+
+    def add_logfile_handlers():
+        setting = LoggingSetting(logfile_dir='/srv/project/var/log')
+        for i in range(size):
+            setting.add_logfile_handler('app{}'.format(i))
+
+    return {
+        'loggingsetting.construct.ops_per_sec': round(ops_per_sec(construct, number=number * 10)),
+        'loggingsetting.deep_update_{}.ops_per_sec'.format(size): round(
+            ops_per_sec(deep_update, number=number)),
+        'loggingsetting.deep_update_{}_resolve.ops_per_sec'.format(size): round(
+            ops_per_sec(deep_update_and_resolve, number=max(1, number // 20)), 1),
+        'loggingsetting.add_logfile_handler_{}.ops_per_sec'.format(size): round(
+            ops_per_sec(add_logfile_handlers, number=max(1, number // 20)), 1),
+    }
+
+
+def main(argv=None):
+    parser = OptionParser()
+    parser.add_option('--number', type='int', default=200)
+    parser.add_option('--size', type='int', default=500,
+                      help="Handlers and loggers in each deep_update()'d dict.")
+    options, args = parser.parse_args(argv)
+    print_results(run(options.number, options.size))
+
+
+if __name__ == '__main__':
+    main()
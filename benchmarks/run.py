@@ -0,0 +1,89 @@
+"""
+Run cinch's benchmarks and print their results together as stable JSON,
+to save and diff between commits. With ``--compare``, results are
+checked against a saved run, and the exit status is non-zero if any got
+worse by more than ``--threshold`` (a fraction, e.g. 0.1 for 10%).
+
+    python -m benchmarks.run [--only NAME,...] [--output FILE]
+                             [--compare FILE [--threshold 0.1]]
+"""
+
+from __future__ import absolute_import, print_function
+import json
+import sys
+import traceback
+from importlib import import_module
+from optparse import OptionParser
+from .common import print_results
+
+
+# Modules in this package with a run() returning a dict of results.
+BENCHMARKS = ('settings', 'loggingsetting', 'logformatters', 'sqlite', 'hosts', 'importtime')
+
+# Results ending with these are better when higher; others when lower.
+HIGHER_IS_BETTER = ('_per_sec',)
+LOWER_IS_BETTER = ('_ms', '_us')
+
+
+def run(names=BENCHMARKS):
+    """Return (results, names of benchmarks which failed)."""
+    results, failed = {}, []
+    for name in names:
+        try:
+            results.update(import_module('benchmarks.' + name).run())
+        except Exception:
+            sys.stderr.write("Benchmark {} failed:\n".format(name))
+            traceback.print_exc()
+            failed.append(name)
+    return results, failed
+
+
+def regressions(results, baseline, threshold=0.1):
+    """
+    Return a list of (name, baseline, result, change) for each numeric
+    result which is worse than in ``baseline`` by more than ``threshold``.
+    """
+    worse = []
+    for (name, value) in sorted(results.items()):
+        before = baseline.get(name)
+        if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) \
+                or not before:
+            continue
+        change = (value - before) / float(before)
+        if name.endswith(HIGHER_IS_BETTER) and change < -threshold or \
+                name.endswith(LOWER_IS_BETTER) and change > threshold:
+            worse.append((name, before, value, change))
+    return worse
+
+
+def main(argv=None):
+    parser = OptionParser()
+    parser.add_option('--only', default=None,
+                      help="Comma-separated benchmarks to run, of: " + ', '.join(BENCHMARKS))
+    parser.add_option('--output', default=None, help="Also save the results to this file.")
+    parser.add_option('--compare', default=None,
+                      help="Compare the results with those saved in this file.")
+    parser.add_option('--threshold', type='float', default=0.1,
+                      help="Fraction by which a result may get worse [default: %default].")
+    options, args = parser.parse_args(argv)
+    names = options.only.split(',') if options.only else BENCHMARKS
+    results, failed = run(names)
+    print_results(results)
+    if options.output:
+        with open(options.output, 'w') as output_f:
+            json.dump(results, output_f, indent=2, sort_keys=True)
+    status = 1 if failed else 0
+    if options.compare:
+        with open(options.compare) as compare_f:
+            baseline = json.load(compare_f)
+        worse = regressions(results, baseline, options.threshold)
+        for (name, before, value, change) in worse:
+            sys.stderr.write("Regression: {}: {} -> {} ({:+.1%})\n".format(
+                name, before, value, change))
+        if worse:
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Throughput of cinch's settings machinery: exporting settings classes with
+cinch_settings() (by number of settings, and depth of mixin hierarchy),
+SetDefaultMixin.setdefault() and explicit(), and FHSDirs construction.
+
+    python -m benchmarks.settings [--number N]
+"""
+
+from __future__ import absolute_import
+from optparse import OptionParser
+from .common import ops_per_sec, print_results
+from cinch import CinchSettings, cinch_settings
+from cinch.utils import FHSDirs
+
+
+def make_settings_class(num_settings, depth=1):
+    """
+    Return a CinchSettings subclass with ``num_settings`` settings, spread
+    across ``depth`` mixins, each of which also setdefault()s one setting
+    in its setup(), as mixins in real projects do.
+    """
+    bases = []
+    per_mixin = max(1, num_settings // depth)
+    for level in range(depth):
+        namespace = dict(('SETTING_{}_{}'.format(level, i), i) for i in range(per_mixin))
+        bases.append(type('Mixin{}'.format(level), (object,), namespace))
+    # Give each mixin a setup() calling the next one, along the MRO.
+    for (level, mixin) in enumerate(bases):
+        mixin.setup = _make_setup(mixin, level)
+    return type('Settings{}x{}'.format(num_settings, depth), tuple(bases) + (CinchSettings,), {})
+
+
+def _make_setup(mixin, level):
+    name = 'DEFAULT_{}'.format(level)
+
+    def setup(self, *args, **kwargs):
+        self.setdefault(name, True)
+        super(mixin, self).setup(*args, **kwargs)
+    return setup
+
+
+def bench_export(num_settings, depth, number):
+    settings_class = make_settings_class(num_settings, depth)
+
+    def export():
+        cinch_settings({'Settings': settings_class}, 'Settings')
+    return round(ops_per_sec(export, number=number))
+
+
+def bench_setdefault(number):
+    settings = make_settings_class(100)()
+    names = ['SETTING_0_{}'.format(i) for i in range(100)]
+
+    def setdefault_existing():
+        for name in names:
+            settings.setdefault(name, None)
+
+    def explicit():
+        for name in names:
+            settings.explicit(name)
+    # Per call, rather than per 100.
+    return {
+        'setdefault.existing.calls_per_sec': round(
+            ops_per_sec(setdefault_existing, number=number) * len(names)),
+        'explicit.calls_per_sec': round(ops_per_sec(explicit, number=number) * len(names)),
+    }
+
+
+def bench_fhsdirs(number):
+    dir_names = ('ETC_DIR', 'ETC_LOCAL_DIR', 'LIB_DIR', 'SRC_DIR', 'TEMPLATE_DIRS',
+                 'USR_DIR', 'VAR_DIR', 'DB_DIR', 'FIXTURES_DIRS', 'LOG_DIR',
+                 'MEDIA_ROOT', 'STATIC_ROOT')
+
+    def construct():
+        FHSDirs('/srv/project')
+
+    def construct_and_read():
+        dirs = FHSDirs('/srv/project')
+        for name in dir_names:
+            getattr(dirs, name)
+    return {
+        'fhsdirs.construct.ops_per_sec': round(ops_per_sec(construct, number=number)),
+        'fhsdirs.construct_and_read.ops_per_sec': round(
+            ops_per_sec(construct_and_read, number=number)),
+    }
+
+
+def run(number=200):
+    results = {}
+    for num_settings in (10, 100, 1000):
+        results['export.settings_{}.ops_per_sec'.format(num_settings)] = \
+            bench_export(num_settings, 1, max(1, number * 10 // num_settings))
+    for depth in (10, 50):
+        results['export.depth_{}.ops_per_sec'.format(depth)] = \
+            bench_export(100, depth, number)
+    results.update(bench_setdefault(number))
+    results.update(bench_fhsdirs(number * 5))
+    return results
+
+
+def main(argv=None):
+    parser = OptionParser()
+    parser.add_option('--number', type='int', default=200)
+    options, args = parser.parse_args(argv)
+    print_results(run(options.number))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Concurrent read and write throughput of a SQLite database with SQLite's
+own defaults, and with cinch's SQLite profile (see cinch.db.sqlite), for
+some writer and reader threads each with their own connection.
+
+    python -m benchmarks.sqlite [--seconds S] [--writers N] [--readers N]
+"""
+
+from __future__ import absolute_import
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from optparse import OptionParser
+from .common import print_results
+from cinch.db.sqlite import apply_pragmas, get_pragmas
+
+
+def _connect(db_path, pragmas):
+    connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    if pragmas:
+        apply_pragmas(connection, pragmas)
+    return connection
+
+
+def run_profile(db_path, pragmas, seconds, writers, readers):
+    """Return (writes per second, reads per second)."""
+    connection = _connect(db_path, pragmas)
+    connection.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, value TEXT)')
+    connection.executemany('INSERT INTO item (value) VALUES (?)',
+                           [('x' * 100,)] * 10000)
+    connection.commit()
+    connection.close()
+    counts = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+
+    def work(kind):
+        connection = _connect(db_path, pragmas)
+        done = 0
+        while time.time() < deadline:
+            if kind == 'write':
+                # A transaction per write, as a request would commit.
+                connection.execute('INSERT INTO item (value) VALUES (?)', ('y' * 100,))
+                connection.commit()
+            else:
+                connection.execute(
+                    'SELECT COUNT(*), MAX(id) FROM item WHERE id > ?', (done % 10000,)).fetchone()
+            done += 1
+        connection.close()
+        with lock:
+            counts[kind] += done
+    threads = [threading.Thread(target=work, args=('write',)) for _ in range(writers)] + \
+        [threading.Thread(target=work, args=('read',)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts['write'] / float(seconds), counts['read'] / float(seconds)
+
+
+def run(seconds=3, writers=2, readers=4):
+    results = {}
+    tmp_dir = tempfile.mkdtemp(prefix='cinch-sqlite-')
+    try:
+        for (profile, pragmas) in (('default', None), ('cinch', get_pragmas())):
+            writes, reads = run_profile(os.path.join(tmp_dir, profile + '.db'), pragmas,
+                                        seconds, writers, readers)
+            results['sqlite.{}.writes_per_sec'.format(profile)] = round(writes)
+            results['sqlite.{}.reads_per_sec'.format(profile)] = round(reads)
+    finally:
+        shutil.rmtree(tmp_dir)
+    return results
+
+
+def main(argv=None):
+    parser = OptionParser()
+    parser.add_option('--seconds', type='float', default=3)
+    parser.add_option('--writers', type='int', default=2)
+    parser.add_option('--readers', type='int', default=4)
+    options, args = parser.parse_args(argv)
+    print_results(run(options.seconds, options.writers, options.readers))
+
+
+if __name__ == '__main__':
+    main()
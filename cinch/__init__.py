@@ -1,18 +1,31 @@
 
+from importlib import import_module
 from itertools import chain
-from os import environ
+from os import environ, path
 import sys
+from .lazy import lazy_setting
 from .mixins import SetDefaultMixin
+from .profiling import timed
 
 
 __version__ = '0.0.1'
 
 
+# Settings files being executed by (possibly nested) include_settings() calls.
+_included_files = []
+
+
 def cinch_settings(settings_globals, settings_class):
+    from .layered import LayeredDict
     settings_obj = settings_globals[settings_class]()
     settings = {att: getattr(settings_obj, att)
-                for att in dir(settings_obj)
-                if att == att.upper()}
+                for att in settings_obj.setting_names()}
+    # Export layered settings (e.g. LoggingSettings) as the plain dicts
+    # Django expects.
+    settings = dict((att, val.resolve() if isinstance(val, LayeredDict) else val)
+                    for (att, val) in settings.items())
+    from .fingerprint import apply_fingerprint
+    apply_fingerprint(settings)
     settings_globals.update(settings)
 
 
@@ -20,6 +33,86 @@ def cinch_django_settings(settings_globals, env_var='DJANGO_SETTINGS_CLASS'):
     cinch_settings(settings_globals, environ[env_var])
 
 
+def include_settings(settings_globals, module_name, package='cinch.settings'):
+    """
+    Execute the settings file of ``module_name``, a module in ``package``,
+    in ``settings_globals`` - i.e. execfile() it into the including file.
+
+    If settings snapshots are enabled (see ``cinch.snapshot``), the
+    outermost include is saved to a snapshot under ``VAR_DIR``, which
+    later includes with the same preceding settings load instead of
+    executing the settings files again (unless one of those settings
+    can't be serialised, to tell whether they're the same).
+    """
+    file_path = path.join(path.dirname(import_module(package).__file__),
+                          module_name + '.py')
+    if _included_files:
+        # Nested includes are part of the outer include's snapshot.
+        _execute_settings(settings_globals, file_path)
+        return
+
+    from .snapshot import settings_seed, snapshot_enabled
+    seed = None
+    if snapshot_enabled(settings_globals) and (
+            'VAR_DIR' in settings_globals or 'PROJECT_DIR' in settings_globals):
+        # None if the preceding settings can't be serialised, to compare.
+        seed = settings_seed(settings_globals, __version__, file_path)
+    if seed is None:
+        try:
+            _execute_settings(settings_globals, file_path)
+            _settings_loaded(settings_globals)
+        finally:
+            del _included_files[:]
+        return
+
+    from .snapshot import SettingsSnapshot, cinch_json_dependencies, snapshot_settings
+    var_dir = settings_globals.get('VAR_DIR') or \
+        path.join(settings_globals['PROJECT_DIR'], 'var')
+    snapshot = SettingsSnapshot(
+        path.join(var_dir, 'cinch-{}-{}.snapshot'.format(module_name, seed[:12])), seed)
+    with timed('include_settings: load snapshot'):
+        settings = snapshot.load()
+    if settings is not None:
+        settings_globals.update(settings)
+        return
+
+    old_sys_path = list(sys.path)
+    try:
+        _execute_settings(settings_globals, file_path)
+        _settings_loaded(settings_globals)
+        files = list(_included_files)
+    finally:
+        del _included_files[:]
+    files.extend(mod.__file__.rstrip('co') for (name, mod) in sorted(sys.modules.items())
+                 if name.split('.')[0] == 'cinch' and getattr(mod, '__file__', None))
+    env_vars = list(settings_globals.get('CINCH_SNAPSHOT_ENV_VARS', ()))
+    if 'ETC_DIR' in settings_globals:
+        json_files, json_env_vars = cinch_json_dependencies(settings_globals['ETC_DIR'])
+        files.extend(json_files)
+        env_vars.extend(json_env_vars)
+    if 'SECRET_KEY_FILE' in settings_globals:
+        files.append(settings_globals['SECRET_KEY_FILE'])
+    with timed('include_settings: save snapshot'):
+        snapshot.save(
+            snapshot_settings(settings_globals),
+            files=files, env_vars=env_vars,
+            sys_path=[entry for entry in sys.path if entry not in old_sys_path])
+
+
+def _settings_loaded(settings_globals):
+    """Finish settings, once the outermost included file has executed."""
+    from .fingerprint import apply_fingerprint
+    apply_fingerprint(settings_globals)
+
+
+def _execute_settings(settings_globals, file_path):
+    _included_files.append(file_path)
+    with timed('include_settings: ' + path.basename(file_path)):
+        with open(file_path) as settings_f:
+            code = compile(settings_f.read(), file_path, 'exec')
+        exec(code, settings_globals)
+
+
 class CinchSettings(SetDefaultMixin):
     """
     Base class for settings classes. TODOLipsum
@@ -55,11 +148,11 @@ class NormaliseSettings(object):
         cnf.setdefault('TIME_ZONE', 'UTC')      # Default is "America/Chicago"
         cnf.setdefault('LANGUAGE_CODE', 'en')   # Default is 'en-us'
         cnf.setdefault('SITE_ID', 1)            # Default is not defined
-        cnf.setdefault('WSGI_APPLICATION', cnf.PROJECT_MODULE + '.wsgi.application')
+        cnf.setdefault_lazy('WSGI_APPLICATION', lambda c: c.PROJECT_MODULE + '.wsgi.application')
 
         # Debugging, testing, development
         cnf.setdefault('DEBUG', False)
-        cnf.setdefault('TEMPLATE_DEBUG', cnf.DEBUG)
+        cnf.setdefault_lazy('TEMPLATE_DEBUG', lambda c: c.DEBUG)
         cnf.setdefault('TESTING', True if 'test' in sys.argv else False)
 
         # Security
@@ -72,7 +165,7 @@ class NormaliseSettings(object):
         cnf.setdefault('STATIC_URL', '/static/')
         cnf.setdefault('MEDIA_URL', '/media/')
         if hasattr(cnf, 'PROJECT_MODULE'):
-            cnf.setdefault('ROOT_URLCONF', cnf.PROJECT_MODULE + '.urls')
+            cnf.setdefault_lazy('ROOT_URLCONF', lambda c: c.PROJECT_MODULE + '.urls')
 
         super(NormaliseSettings, cnf).setup(*args, **kwargs)
 
@@ -0,0 +1,263 @@
+"""
+A two-tier cache backend: a small per-process cache (L1, e.g. LocMem)
+in front of a shared one (L2, e.g. memcached), so hot keys are read
+without a round trip. Configure it with ``CachesSetting.add_tiered()``.
+
+Reads try L1, then L2, copying L2 hits into L1 for at most L1_TIMEOUT
+seconds. Writes go to both, so other processes' L1 copies of a key live
+no longer than L1_TIMEOUT after it's set elsewhere; keep it short.
+
+Deletes (and incr()) are fanned out to every process: each leaves a
+tombstone of the keys in L2, numbered by a counter there, and every
+process reads the counter at most every GENERATION_INTERVAL seconds and
+drops the keys of the tombstones since from its L1 (or all of its L1, if
+it's missed any). ``clear()`` and ``invalidate()`` drop every process's
+L1 cache at once, by incrementing a generation number kept in L2 (and
+read along with the counter), which every L1 key includes.
+
+Since sets aren't fanned out, a TieredCache isn't for sessions, or
+anything else which must be read as it was last set; the production
+profile (cinch.performance) doesn't cache sessions in one.
+
+``cache_stats()`` returns the hits and misses of each tier, by cache.
+"""
+
+from __future__ import absolute_import
+import threading
+import time
+from django.core.cache.backends.base import BaseCache
+try:
+    from django.core.cache.backends.base import DEFAULT_TIMEOUT
+except ImportError:
+    # Django < 1.6
+    DEFAULT_TIMEOUT = object()
+
+
+__all__ = ['TieredCache', 'cache_stats']
+
+
+_missing = object()
+
+# Shared by every instance for a cache (Django < 1.7 creates one per use).
+_stats = {}
+# name -> (generation, tombstone counter, local generation, time checked)
+_generations = {}
+_lock = threading.Lock()
+
+# Tombstones a process catches up with, before it drops all of its L1.
+MAX_TOMBSTONES = 100
+
+
+def _get_cache(alias):
+    try:
+        from django.core.cache import caches
+    except ImportError:
+        # Django < 1.7
+        from django.core.cache import get_cache
+        return get_cache(alias)
+    return caches[alias]
+
+
+def cache_stats():
+    """Return the hits and misses of each tier of each TieredCache."""
+    with _lock:
+        return dict((name, dict(stats)) for (name, stats) in _stats.items())
+
+
+class TieredCache(BaseCache):
+    """
+    Cache backend reading through the cache aliases OPTIONS['L1'] and
+    OPTIONS['L2']. Its LOCATION names it, in cache_stats().
+    """
+    def __init__(self, location, params):
+        super(TieredCache, self).__init__(params)
+        options = params.get('OPTIONS', {})
+        self.name = location
+        self.l1_alias = options['L1']
+        self.l2_alias = options['L2']
+        self.l1_timeout = options.get('L1_TIMEOUT', 30)
+        self.generation_interval = options.get('GENERATION_INTERVAL', 1)
+        self.generation_key = 'cinch-tiered-generation:' + self.name
+        self.tombstones_key = 'cinch-tiered-tombstones:' + self.name
+        # Kept until every process will have read them, or dropped its L1.
+        self.tombstone_timeout = max(60, 2 * (self.l1_timeout + self.generation_interval))
+        self._l1 = self._l2 = None
+        with _lock:
+            self.stats = _stats.setdefault(self.name, dict.fromkeys(
+                ('l1_hits', 'l1_misses', 'l2_hits', 'l2_misses'), 0))
+
+    @property
+    def l1(self):
+        if self._l1 is None:
+            self._l1 = _get_cache(self.l1_alias)
+        return self._l1
+
+    @property
+    def l2(self):
+        if self._l2 is None:
+            self._l2 = _get_cache(self.l2_alias)
+        return self._l2
+
+    def _count(self, stat, number=1):
+        with _lock:
+            self.stats[stat] += number
+
+    def _generation(self):
+        """
+        Return the prefix of L1 keys for the current generation, catching
+        up with the tombstones and generation in L2, if due.
+        """
+        now = time.time()
+        state = _generations.get(self.name)
+        if state is None or now - state[3] >= self.generation_interval:
+            state = self._catch_up(state, now)
+        return '{}.{}'.format(state[0], state[2])
+
+    def _catch_up(self, state, now):
+        values = self.l2.get_many([self.generation_key, self.tombstones_key])
+        generation = values.get(self.generation_key, 0)
+        tombstones = values.get(self.tombstones_key, 0)
+        if state is None:
+            # A new process, with nothing in its L1 to drop.
+            local = 0
+        else:
+            local = state[2]
+            seen = state[1]
+            if generation == state[0] and tombstones != seen:
+                prefix = '{}.{}'.format(generation, local)
+                keys = self._deleted_keys(seen, tombstones)
+                if keys is None:
+                    # Missed some: drop everything, with a new local generation.
+                    local += 1
+                else:
+                    self.l1.delete_many(['{}:{}:{}'.format(prefix, version or '', key)
+                                         for (key, version) in keys])
+        state = _generations[self.name] = (generation, tombstones, local, now)
+        return state
+
+    def _deleted_keys(self, seen, tombstones):
+        """
+        Return the (key, version) pairs of the tombstones after number
+        ``seen``, up to ``tombstones``, or None if they can't all be read.
+        """
+        if not 0 <= tombstones - seen <= MAX_TOMBSTONES:
+            return None
+        names = [self._tombstone_key(number) for number in range(seen + 1, tombstones + 1)]
+        found = self.l2.get_many(names)
+        if len(found) < len(names):
+            return None
+        return [tuple(pair) for name in names for pair in found[name]]
+
+    def _tombstone_key(self, number):
+        return '{}:{}'.format(self.tombstones_key, number)
+
+    def _bury(self, keys, version):
+        """Leave a tombstone of ``keys`` in L2, for other processes' L1s."""
+        try:
+            number = self.l2.incr(self.tombstones_key)
+        except ValueError:
+            # Not set yet (or evicted from L2).
+            number = 1
+            if not self.l2.add(self.tombstones_key, number, None):
+                number = self.l2.incr(self.tombstones_key)
+        self.l2.set(self._tombstone_key(number), [(key, version) for key in keys],
+                    self.tombstone_timeout)
+
+    def _l1_key(self, key, version):
+        return '{}:{}:{}'.format(self._generation(), version or '', key)
+
+    def _l1_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def invalidate(self):
+        """Invalidate every process's L1 cache (within generation_interval)."""
+        try:
+            self.l2.incr(self.generation_key)
+        except ValueError:
+            # Not set yet (or evicted from L2).
+            if not self.l2.add(self.generation_key, 1, None):
+                self.l2.incr(self.generation_key)
+        # Read the new generation (and tombstone counter) from L2, next use.
+        _generations.pop(self.name, None)
+
+    def _timeout_kwargs(self, timeout):
+        # So the tiers' own default timeouts apply, where none's given.
+        return {} if timeout is DEFAULT_TIMEOUT else {'timeout': timeout}
+
+    def get(self, key, default=None, version=None):
+        l1_key = self._l1_key(key, version)
+        value = self.l1.get(l1_key, _missing)
+        if value is not _missing:
+            self._count('l1_hits')
+            return value
+        self._count('l1_misses')
+        value = self.l2.get(key, _missing, version=version)
+        if value is _missing:
+            self._count('l2_misses')
+            return default
+        self._count('l2_hits')
+        self.l1.set(l1_key, value, self.l1_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        l1_keys = dict((self._l1_key(key, version), key) for key in keys)
+        found = dict((l1_keys[l1_key], value)
+                     for (l1_key, value) in self.l1.get_many(list(l1_keys)).items())
+        self._count('l1_hits', len(found))
+        self._count('l1_misses', len(l1_keys) - len(found))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            from_l2 = self.l2.get_many(missing, version=version)
+            self._count('l2_hits', len(from_l2))
+            self._count('l2_misses', len(missing) - len(from_l2))
+            if from_l2:
+                self.l1.set_many(dict((self._l1_key(key, version), value)
+                                      for (key, value) in from_l2.items()), self.l1_timeout)
+            found.update(from_l2)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, version=version, **self._timeout_kwargs(timeout))
+        if timeout != 0:
+            self.l1.set(self._l1_key(key, version), value, self._l1_timeout(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set_many(data, version=version, **self._timeout_kwargs(timeout))
+        if timeout != 0:
+            self.l1.set_many(dict((self._l1_key(key, version), value)
+                                  for (key, value) in data.items()), self._l1_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, version=version, **self._timeout_kwargs(timeout))
+        if added and timeout != 0:
+            self.l1.set(self._l1_key(key, version), value, self._l1_timeout(timeout))
+        return added
+
+    def delete(self, key, version=None):
+        self.l2.delete(key, version=version)
+        self.l1.delete(self._l1_key(key, version))
+        self._bury([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys, version=version)
+        self.l1.delete_many([self._l1_key(key, version) for key in keys])
+        if keys:
+            self._bury(keys, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version=version) is not _missing
+
+    def incr(self, key, delta=1, version=None):
+        # Incremented in L2, and dropped from every process's L1.
+        value = self.l2.incr(key, delta, version=version)
+        self.l1.delete(self._l1_key(key, version))
+        self._bury([key], version)
+        return value
+
+    def clear(self):
+        self.l2.clear()
+        self.l1.clear()
+        self.invalidate()
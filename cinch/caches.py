@@ -1,14 +1,95 @@
+__all__ = ['CachesSetting']
 
-from revkom.coll import EasyDict
 
+# Short names for cache backends.
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'pylibmc': 'django.core.cache.backends.memcached.PyLibMCCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
 
-__all__ = ['CachesSetting']
 
+class CacheSetting(dict):
+    """
+    The settings of a single cache. Unless ``fingerprint`` is False, the
+    settings fingerprint is added to its KEY_PREFIX (see cinch.fingerprint).
+    """
+    def __init__(self, backend='locmem', location='', timeout=300, fingerprint=True, **kwargs):
+        super(CacheSetting, self).__init__()
+        self['BACKEND'] = BACKENDS.get(backend, backend)
+        self['LOCATION'] = location
+        self['TIMEOUT'] = timeout
+        for (key, val) in kwargs.items():
+            self[key.upper()] = val
+        # Ignored by Django's cache backends.
+        self['CINCH_FINGERPRINT'] = fingerprint
+
+    def apply_fingerprint(self, fingerprint):
+        """Set KEY_PREFIX to the original KEY_PREFIX and ``fingerprint``."""
+        if self['CINCH_FINGERPRINT']:
+            # Kept, so applying another fingerprint replaces this one.
+            key_prefix = self.setdefault('CINCH_KEY_PREFIX', self.get('KEY_PREFIX', ''))
+            self['KEY_PREFIX'] = ':'.join(
+                prefix for prefix in (key_prefix, fingerprint) if prefix)
+
+
+class CachesSetting(dict):
+    """
+    A CACHES manager class, which builds the settings of each alias.
+    - https://docs.djangoproject.com/en/dev/topics/cache/
+    """
+    def add(self, alias='default', backend='locmem', location='', timeout=300, **kwargs):
+        """
+        Add the cache ``alias``, using ``backend`` (a short name from
+        BACKENDS, or a backend's class). Other keyword arguments are
+        upper-cased and added to its settings (e.g. options={...}).
+
+        Pass fingerprint=False for caches which should outlive changes to
+        the settings, e.g. of sessions.
+        """
+        self[alias] = CacheSetting(backend, location, timeout, **kwargs)
+        return self[alias]
 
-class CacheSetting(EasyDict):
-    pass
+    def add_tiered(self, alias='default', backend='file', location='', timeout=300,
+                   l1_max_entries=1000, l1_timeout=30, generation_interval=1,
+                   fingerprint=True, **kwargs):
+        """
+        Add the cache ``alias``, a cinch.cache_backends.TieredCache: a
+        per-process LocMem cache (``alias``_l1) of up to ``l1_max_entries``
+        entries, in front of a shared cache (``alias``_l2) with
+        ``backend`` at ``location`` (other keyword arguments are for it).
 
+        Values are kept in the L1 cache for at most ``l1_timeout`` seconds,
+        which is also how long other processes may read a key after it's
+        set. Deletes reach every process's L1 cache within
+        ``generation_interval`` seconds, as do ``clear()`` and
+        ``invalidate()``, which clear it (see TieredCache).
+        """
+        l1_alias, l2_alias = alias + '_l1', alias + '_l2'
+        self.add(l1_alias, 'locmem', 'cinch-' + l1_alias, l1_timeout,
+                 fingerprint=fingerprint,
+                 options={'MAX_ENTRIES': l1_max_entries, 'CULL_FREQUENCY': 4})
+        self.add(l2_alias, backend, location, timeout, fingerprint=fingerprint, **kwargs)
+        self[alias] = CacheSetting(
+            'cinch.cache_backends.TieredCache', alias, timeout, fingerprint,
+            options={
+                'L1': l1_alias,
+                'L2': l2_alias,
+                'L1_TIMEOUT': l1_timeout,
+                'GENERATION_INTERVAL': generation_interval,
+            })
+        return self[alias]
 
-class CachesSetting(EasyDict):
-    pass
-    #def __set__(self, obj, value):
+    def apply_fingerprint(self, fingerprint):
+        """
+        Add the settings fingerprint ``fingerprint`` to the KEY_PREFIX of
+        each cache, so entries cached under other settings are ignored
+        (and age out). Called by cinch.fingerprint.apply_fingerprint().
+        """
+        for cache in self.values():
+            if hasattr(cache, 'apply_fingerprint'):
+                cache.apply_fingerprint(fingerprint)
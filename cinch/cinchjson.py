@@ -0,0 +1,70 @@
+"""
+Reading ``etc/cinch.json``, which defines settings for the base settings
+(cinch.settings.base) from a JSON file kept outside of the project's code::
+
+    {
+        "settings": {"debug": false, "cinch_log_levels": {"django": "INFO"}},
+        "read_files": ["secret_key"],
+        "env_vars": ["database_url"]
+    }
+
+Keys of its 'settings' object are settings, the contents of each file in
+its 'read_files' array (in the same directory) are the setting of the
+file's name, and each environment variable named in its 'env_vars' array
+is a setting of the same name; names are upper-cased.
+
+The base settings, settings snapshots (cinch.snapshot) and reloading
+(cinch.reload) all read it through the functions here.
+"""
+
+from __future__ import absolute_import
+import json
+import os
+
+
+__all__ = ['load_cinch_json', 'read_cinch_json', 'cinch_json_dependencies']
+
+
+CINCH_JSON = 'cinch.json'
+
+
+def load_cinch_json(etc_dir):
+    """Return the parsed ``etc_dir``/cinch.json, or None if there isn't one."""
+    conf_path = os.path.join(etc_dir, CINCH_JSON)
+    if not os.path.exists(conf_path):
+        return None
+    with open(conf_path) as conf_f:
+        return json.load(conf_f)
+
+
+def read_cinch_json(etc_dir, conf=None):
+    """
+    Return the settings ``etc_dir``/cinch.json (or ``conf``, as already
+    loaded from it) defines: its 'settings' object, the contents of each
+    of its 'read_files' and the value of each of its 'env_vars'.
+    """
+    if conf is None:
+        conf = load_cinch_json(etc_dir) or {}
+    settings = {}
+    for (key, val) in conf.get('settings', {}).items():
+        settings[key.upper()] = val
+    for file_name in conf.get('read_files', ()):
+        with open(os.path.join(etc_dir, file_name)) as setting_f:
+            settings[file_name.upper()] = setting_f.read()
+    for env_var in conf.get('env_vars', ()):
+        settings[env_var.upper()] = os.getenv(env_var.upper())
+    return settings
+
+
+def cinch_json_dependencies(etc_dir, conf=None):
+    """
+    Return a tuple ``(files, env_vars)`` of everything ``etc_dir``/cinch.json
+    pulls settings from: the JSON file itself, each file in its
+    'read_files' array and each variable named in its 'env_vars' array.
+    """
+    if conf is None:
+        conf = load_cinch_json(etc_dir) or {}
+    files = [os.path.join(etc_dir, CINCH_JSON)]
+    files.extend(os.path.join(etc_dir, file_name) for file_name in conf.get('read_files', ()))
+    env_vars = [env_var.upper() for env_var in conf.get('env_vars', ())]
+    return files, env_vars
@@ -1,9 +1,101 @@
+__all__ = ['DatabasesSetting']
 
-from revkom.coll import EasyDict
 
+# Short names for Django's database engines.
+ENGINES = {
+    'sqlite3': 'django.db.backends.sqlite3',
+    'postgresql_psycopg2': 'django.db.backends.postgresql_psycopg2',
+    'mysql': 'django.db.backends.mysql',
+    'oracle': 'django.db.backends.oracle',
+}
+# Engines which can take their connections from a pool (see cinch.db.pool),
+# and for sqlite3 apply a performance profile (see cinch.db.sqlite).
+POOLED_ENGINES = {
+    'django.db.backends.sqlite3': 'cinch.db.backends.sqlite3',
+    'django.db.backends.postgresql_psycopg2': 'cinch.db.backends.postgresql_psycopg2',
+}
 
-__all__ = ['DatabasesSetting']
 
+class DatabasesSetting(dict):
+    """
+    A DATABASES manager class, which builds the settings of each alias.
+    - https://docs.djangoproject.com/en/dev/ref/settings/#databases
+    """
+    def add(self, alias='default', engine='sqlite3', name=None, conn_max_age=60,
+            health_checks=True, pool=None, sqlite_profile=None,
+            sqlite_maintenance_interval=None, **kwargs):
+        """
+        Add the database ``alias``, using ``engine`` (a short name from
+        ENGINES, or a backend's module) and database ``name``. Other keyword
+        arguments are upper-cased and added to its settings (e.g. user=...,
+        host=..., options={...}).
+
+        Connections are kept open for ``conn_max_age`` seconds (None for
+        ever). If ``pool`` is True, or a dict of options (see
+        cinch.db.pool.POOL_DEFAULTS), each worker keeps a pool of
+        connections instead, which are returned to the pool at the end of
+        each request, and with ``health_checks`` are checked before being
+        reused after a while idle.
+
+        For sqlite3, ``sqlite_profile`` applies cinch.db.sqlite's pragmas
+        to each connection, if it's True, or updated from it if it's a
+        dict (e.g. {'mmap_size': 0}), and ``sqlite_maintenance_interval``
+        has each process checkpoint and optimise the database every so
+        many seconds. Either uses cinch's sqlite3 backend.
+        """
+        engine = ENGINES.get(engine, engine)
+        settings = {
+            'ENGINE': engine,
+            'NAME': name,
+            'CONN_MAX_AGE': conn_max_age,
+        }
+        if pool:
+            if engine not in POOLED_ENGINES:
+                raise ValueError("Connection pooling isn't supported for " + engine)
+            # Django closes connections after each request; into the pool.
+            settings.update(ENGINE=POOLED_ENGINES[engine], CONN_MAX_AGE=0,
+                            POOL=dict(pool) if isinstance(pool, dict) else {})
+            settings['POOL'].setdefault('CHECK_AFTER', 30 if health_checks else None)
+        if sqlite_profile:
+            if engine != ENGINES['sqlite3']:
+                raise ValueError("sqlite_profile is only for sqlite3 databases")
+            from cinch.db.sqlite import get_pragmas
+            settings.update(
+                ENGINE=POOLED_ENGINES[engine],
+                PRAGMAS=get_pragmas(sqlite_profile if isinstance(sqlite_profile, dict) else None))
+        if sqlite_maintenance_interval:
+            if engine != ENGINES['sqlite3']:
+                raise ValueError("sqlite_maintenance_interval is only for sqlite3 databases")
+            settings.update(ENGINE=POOLED_ENGINES[engine],
+                            SQLITE_MAINTENANCE_INTERVAL=sqlite_maintenance_interval)
+        for (key, val) in kwargs.items():
+            settings[key.upper()] = val
+        self[alias] = settings
+        return settings
+
+    def add_replica(self, alias, primary='default', weight=1, **kwargs):
+        """
+        Add the database ``alias``, a read replica of ``primary``, which
+        cinch.db.routers.ReplicaRouter sends a share of reads to in
+        proportion to its ``weight``. Other arguments are as for add(),
+        with the engine defaulting to the primary's. E.g., to try replicas
+        locally with sqlite::
+
+            DATABASES.add_replica('replica1', name=DB_DIR.child('replica1.db'))
+        """
+        if primary not in self:
+            raise KeyError("Add the primary database, {!r}, before its replicas".format(primary))
+        engine = self[primary]['ENGINE']
+        unpooled = dict((pooled, plain) for (plain, pooled) in POOLED_ENGINES.items())
+        kwargs.setdefault('engine', unpooled.get(engine, engine))
+        settings = self.add(alias, **kwargs)
+        # Tests run against the primary, rather than a separate test replica.
+        settings.update(REPLICA_OF=primary, WEIGHT=weight, TEST_MIRROR=primary,
+                        TEST={'MIRROR': primary})
+        return settings
 
-class DatabasesSetting(EasyDict):
-    pass
+    def routers(self):
+        """Return the DATABASE_ROUTERS these databases need."""
+        if any(settings.get('REPLICA_OF') for settings in self.values()):
+            return ['cinch.db.routers.ReplicaRouter']
+        return []
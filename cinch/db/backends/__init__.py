@@ -0,0 +1,40 @@
+"""
+Django database backends which take their connections from a
+``cinch.db.pool.ConnectionPool``, if there's a 'POOL' dict in the alias's
+settings, and (for sqlite3) apply the SQLite profile in 'PRAGMAS' (see
+``cinch.db.sqlite``). Use them as the ENGINE of an alias, e.g.
+'cinch.db.backends.postgresql_psycopg2', or let ``DatabasesSetting.add()``
+pick them when given ``pool`` or ``sqlite_profile``.
+"""
+
+from cinch.db.pool import get_pool
+
+
+__all__ = ['PooledDatabaseWrapperMixin']
+
+
+def check_connection(connection):
+    """Return True if ``connection`` can still run a query."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+    return True
+
+
+class PooledDatabaseWrapperMixin(object):
+    """
+    Mixin for a backend's DatabaseWrapper, which borrows connections from
+    the alias's pool, and returns them when Django closes them, if its
+    settings have a 'POOL'.
+    """
+    def get_new_connection(self, conn_params):
+        parent = super(PooledDatabaseWrapperMixin, self)
+        if 'POOL' not in self.settings_dict:
+            return parent.get_new_connection(conn_params)
+        pool = get_pool(self.alias, options=self.settings_dict.get('POOL'),
+                        check=check_connection)
+        # Connect with this wrapper and its current parameters, not those of
+        # the wrapper which happened to create the pool.
+        return pool.acquire(lambda: parent.get_new_connection(conn_params))
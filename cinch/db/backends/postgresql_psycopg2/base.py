@@ -0,0 +1,8 @@
+from __future__ import absolute_import
+from django.db.backends.postgresql_psycopg2.base import *
+from django.db.backends.postgresql_psycopg2.base import DatabaseWrapper as BaseDatabaseWrapper
+from cinch.db.backends import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, BaseDatabaseWrapper):
+    pass
@@ -0,0 +1,26 @@
+from __future__ import absolute_import
+from django.db.backends.sqlite3.base import *
+from django.db.backends.sqlite3.base import DatabaseWrapper as BaseDatabaseWrapper
+from cinch.db.backends import PooledDatabaseWrapperMixin
+from cinch.db.sqlite import apply_pragmas, start_maintenance
+
+
+class SQLiteProfileMixin(object):
+    """
+    Applies the alias's 'PRAGMAS' to each new connection, and starts
+    maintaining its database if it has a SQLITE_MAINTENANCE_INTERVAL.
+    """
+    def get_new_connection(self, conn_params):
+        connection = super(SQLiteProfileMixin, self).get_new_connection(conn_params)
+        if self.settings_dict.get('PRAGMAS'):
+            apply_pragmas(connection, self.settings_dict['PRAGMAS'])
+        interval = self.settings_dict.get('SQLITE_MAINTENANCE_INTERVAL')
+        name = self.settings_dict['NAME']
+        if interval and name and name != ':memory:' and 'mode=memory' not in name:
+            start_maintenance(name, interval)
+        return connection
+
+
+# Pooled connections have had the pragmas applied once, when they were made.
+class DatabaseWrapper(PooledDatabaseWrapperMixin, SQLiteProfileMixin, BaseDatabaseWrapper):
+    pass
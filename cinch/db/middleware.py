@@ -0,0 +1,45 @@
+from cinch.db.routers import has_written, pin, unpin
+
+
+__all__ = ['ReplicaPinningMiddleware', 'add_pinning_middleware']
+
+
+PIN_COOKIE = 'cinch_replica_pin'
+MIDDLEWARE = 'cinch.db.middleware.ReplicaPinningMiddleware'
+
+
+class ReplicaPinningMiddleware(object):
+    """
+    Starts each request reading from replicas (see cinch.db.routers),
+    unless the client wrote within the last CINCH_REPLICA_PIN_SECONDS,
+    which is remembered with a cookie. Put it before anything that
+    queries the database.
+    """
+    def __init__(self):
+        from django.conf import settings
+        self.pin_seconds = getattr(settings, 'CINCH_REPLICA_PIN_SECONDS', 0)
+
+    def process_request(self, request):
+        unpin()
+        if self.pin_seconds and PIN_COOKIE in request.COOKIES:
+            pin(write=False)
+
+    def process_response(self, request, response):
+        if self.pin_seconds and has_written():
+            response.set_cookie(PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True)
+        unpin()
+        return response
+
+
+def add_pinning_middleware(middleware):
+    """
+    Return MIDDLEWARE_CLASSES ``middleware`` with ReplicaPinningMiddleware,
+    after the middleware cinch puts first, and before anything else.
+    """
+    middleware = list(middleware)
+    if MIDDLEWARE not in middleware:
+        position = max([middleware.index(name) + 1 for name in (
+            'cinch.reload.SettingsReloadMiddleware', 'cinch.hosts.HostValidationMiddleware',
+            'cinch.overlays.HostOverlayMiddleware') if name in middleware] or [0])
+        middleware.insert(position, MIDDLEWARE)
+    return middleware
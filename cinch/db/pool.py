@@ -0,0 +1,253 @@
+"""
+An in-process pool of database connections, for each alias, in each
+worker process. Connections are handed out wrapped in PooledConnection,
+whose ``close()`` returns the connection to the pool rather than closing
+it, so Django closing its connection at the end of a request (with
+CONN_MAX_AGE = 0) leaves it ready for the next.
+
+Pools are created by the backends in ``cinch.db.backends`` for aliases
+with a 'POOL' dict in their settings (see ``DatabasesSetting.add()``).
+``pool_stats()`` returns the numbers of connections created, reused,
+closed and waited for, by alias, for monitoring.
+"""
+
+from __future__ import absolute_import
+import os
+import threading
+import time
+
+
+__all__ = ['ConnectionPool', 'PooledConnection', 'PoolExhausted', 'get_pool', 'pool_stats']
+
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 10,         # Connections open at once, in each process.
+    'IDLE_TIMEOUT': 300,    # Seconds a connection is kept unused.
+    'TIMEOUT': 30,          # Seconds to wait for a connection when at MAX_SIZE.
+    'CHECK_AFTER': 30,      # Seconds idle after which connections are checked,
+                            # or None not to check them.
+}
+
+
+class PoolExhausted(Exception):
+    """Raised when no connection became free within the pool's timeout."""
+
+
+class PooledConnection(object):
+    """
+    A connection borrowed from a ConnectionPool, which passes everything
+    on to the real connection, except ``close()``, which returns it.
+    """
+    def __init__(self, pool, connection):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_connection', connection)
+
+    def __getattr__(self, name):
+        connection = self._connection
+        if connection is None:
+            raise AttributeError("{!r} has been returned to its pool".format(self))
+        return getattr(connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+    def close(self):
+        connection = self._connection
+        if connection is not None:
+            object.__setattr__(self, '_connection', None)
+            self._pool.release(connection)
+
+    def discard(self):
+        """Close the real connection, e.g. after an error made it unusable."""
+        connection = self._connection
+        if connection is not None:
+            object.__setattr__(self, '_connection', None)
+            self._pool.discard(connection)
+
+
+class ConnectionPool(object):
+    """
+    A pool of up to ``max_size`` connections made by ``connect()`` (or
+    the ``connect`` given to ``acquire()``).
+    Connections idle for longer than ``idle_timeout`` seconds are closed,
+    and those idle for longer than ``check_after`` seconds (unless it's
+    None) are checked with ``check(connection)`` (which should return
+    False or raise if the connection can't be used) before being handed
+    out again.
+    """
+    def __init__(self, connect=None, max_size=10, idle_timeout=300, timeout=30,
+                 check=None, check_after=30):
+        self.connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.check = check
+        self.check_after = check_after
+        self._lock = threading.Condition(threading.Lock())
+        self._reset()
+
+    def _reset(self):
+        # Connections inherited from a parent process are the parent's.
+        self._pid = os.getpid()
+        self._idle = []     # (connection, time released), oldest first
+        self._size = 0
+        self.stats = dict.fromkeys(
+            ('created', 'reused', 'released', 'closed_idle', 'closed_unusable',
+             'discarded', 'waited', 'exhausted'), 0)
+
+    def acquire(self, connect=None):
+        """
+        Return a PooledConnection, waiting for one if the pool is full, and
+        making a new one with ``connect`` (or the pool's) if there's room.
+        """
+        connect = connect or self.connect
+        deadline = time.time() + self.timeout
+        while True:
+            connection, released = self._reserve(deadline)
+            if connection is None:
+                break
+            if self._usable(connection, released):
+                with self._lock:
+                    self.stats['reused'] += 1
+                return PooledConnection(self, connection)
+        # Connect outside the lock; the slot's been reserved.
+        try:
+            connection = connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self.stats['created'] += 1
+        return PooledConnection(self, connection)
+
+    def _reserve(self, deadline):
+        """
+        Take the most recently released idle connection, and when it was
+        released, or else reserve a slot for a new connection and return
+        (None, None), waiting until ``deadline`` if the pool is full.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            self._close_idle()
+            waited = False
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return (None, None)
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.stats['exhausted'] += 1
+                    raise PoolExhausted("No connection free after {} seconds (max_size {})"
+                                        .format(self.timeout, self.max_size))
+                if not waited:
+                    self.stats['waited'] += 1
+                    waited = True
+                self._lock.wait(remaining)
+
+    def _usable(self, connection, released):
+        """
+        Check a connection taken from the pool, if it's been idle long
+        enough to need it, and close it if it can't be used. Called outside
+        the lock, so a slow check doesn't hold up other threads.
+        """
+        if self.check is None or self.check_after is None or \
+                time.time() - released < self.check_after:
+            return True
+        try:
+            usable = self.check(connection) is not False
+        except Exception:
+            usable = False
+        if not usable:
+            try:
+                connection.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._size -= 1
+                self.stats['closed_unusable'] += 1
+                self._lock.notify()
+        return usable
+
+    def _close_idle(self):
+        """Called under the lock; closes connections idle too long."""
+        cutoff = time.time() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:
+            self._close(self._idle.pop(0)[0])
+            self.stats['closed_idle'] += 1
+
+    def _close(self, connection):
+        self._size -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def release(self, connection):
+        """Return a connection to the pool, rolling back anything unfinished."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+        try:
+            connection.rollback()
+        except Exception:
+            self.discard(connection)
+            return
+        with self._lock:
+            self._idle.append((connection, time.time()))
+            self.stats['released'] += 1
+            self._lock.notify()
+
+    def discard(self, connection):
+        """Close a connection taken from the pool, rather than returning it."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._close(connection)
+            self.stats['discarded'] += 1
+            self._lock.notify()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            while self._idle:
+                self._close(self._idle.pop()[0])
+
+    def get_stats(self):
+        """Return a copy of the pool's counters, and its current sizes."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update(size=self._size, idle=len(self._idle),
+                         in_use=self._size - len(self._idle), max_size=self.max_size)
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, connect=None, options=None, check=None):
+    """
+    Return the pool for database ``alias``, creating it with ``connect``,
+    ``check`` and ``options`` (a 'POOL' dict, see POOL_DEFAULTS) first.
+    Callers whose way of connecting can change should leave out ``connect``
+    and pass it to ``acquire()`` instead.
+    """
+    with _pools_lock:
+        if alias not in _pools:
+            options = dict(POOL_DEFAULTS, **(options or {}))
+            _pools[alias] = ConnectionPool(
+                connect, max_size=options['MAX_SIZE'], idle_timeout=options['IDLE_TIMEOUT'],
+                timeout=options['TIMEOUT'], check=check, check_after=options['CHECK_AFTER'])
+        return _pools[alias]
+
+
+def pool_stats():
+    """Return the stats of this process's pools, by alias."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return dict((alias, pool.get_stats()) for (alias, pool) in pools.items())
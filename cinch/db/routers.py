@@ -0,0 +1,168 @@
+"""
+Routing of reads to read replicas, declared with
+``DatabasesSetting.add_replica()``.
+
+ReplicaRouter sends writes to the primary, and reads to one of its
+healthy replicas, chosen at random by weight or ('lru', with the
+CINCH_REPLICA_SELECTION setting) the one least recently used. Once a
+thread has written, its reads go to the primary until it's unpinned, so
+a request reads its own writes; ReplicaPinningMiddleware (which the base
+settings add with ReplicaRouter) unpins at the start of each request, and can keep a client pinned for the following
+CINCH_REPLICA_PIN_SECONDS with a cookie (e.g. across a redirect).
+
+Replicas are checked every CINCH_REPLICA_CHECK_INTERVAL seconds when
+they're chosen, and those which can't run a query are left out for
+CINCH_REPLICA_EJECT_SECONDS.
+"""
+
+from __future__ import absolute_import
+import itertools
+import logging
+import random
+import threading
+import time
+
+
+__all__ = ['ReplicaRouter', 'pin', 'unpin', 'is_pinned', 'has_written']
+
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+def pin(write=True):
+    """Send this thread's reads to the primary, after a ``write``."""
+    _state.pinned = True
+    if write:
+        _state.written = True
+
+
+def unpin():
+    _state.pinned = _state.written = False
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def has_written():
+    """Return True if this thread has written since it was last unpinned."""
+    return getattr(_state, 'written', False)
+
+
+class ReplicaRouter(object):
+    """
+    Database router for the replicas in DATABASES, i.e. aliases with a
+    'REPLICA_OF' key naming their primary, of ``settings`` (or
+    django.conf.settings). Replicas with a WEIGHT of 0 aren't read from.
+    """
+    def __init__(self, settings=None):
+        if settings is None:
+            from django.conf import settings
+        from django.db import DEFAULT_DB_ALIAS
+        self.default = DEFAULT_DB_ALIAS
+        self.replicas = {}      # primary -> [(alias, weight), ...]
+        self.primary_of = {}    # alias -> its primary (primaries are their own)
+        for (alias, db_settings) in sorted(settings.DATABASES.items()):
+            primary = db_settings.get('REPLICA_OF')
+            if primary:
+                self.replicas.setdefault(primary, []).append(
+                    (alias, db_settings.get('WEIGHT', 1)))
+            self.primary_of[alias] = primary or alias
+        self.selection = getattr(settings, 'CINCH_REPLICA_SELECTION', 'weighted')
+        if self.selection not in ('weighted', 'lru'):
+            raise ValueError("CINCH_REPLICA_SELECTION must be 'weighted' or 'lru'")
+        self.check_interval = getattr(settings, 'CINCH_REPLICA_CHECK_INTERVAL', 10)
+        self.eject_seconds = getattr(settings, 'CINCH_REPLICA_EJECT_SECONDS', 30)
+        self._checked = {}      # alias -> when it was last checked
+        self._ejected = {}      # alias -> when it can be used again
+        self._last_used = {}    # alias -> the number of the choice it was last chosen by
+        self._choices = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _primary(self, hints):
+        instance = hints.get('instance')
+        db = getattr(getattr(instance, '_state', None), 'db', None)
+        return self.primary_of.get(db, self.default)
+
+    def db_for_read(self, model, **hints):
+        primary = self._primary(hints)
+        replicas = self.replicas.get(primary)
+        if not replicas or is_pinned():
+            return primary
+        now = time.time()
+        with self._lock:
+            candidates = [(alias, weight) for (alias, weight) in replicas
+                          if weight > 0 and self._ejected.get(alias, 0) <= now]
+        candidates = [(alias, weight) for (alias, weight) in candidates
+                      if self.healthy(alias, now)]
+        if not candidates:
+            return primary
+        with self._lock:
+            if self.selection == 'lru':
+                alias = min(candidates, key=lambda c: self._last_used.get(c[0], 0))[0]
+            else:
+                alias = self._choose_weighted(candidates)
+            self._last_used[alias] = next(self._choices)
+        return alias
+
+    def _choose_weighted(self, candidates):
+        # Replicas weighted 0 are drained, so never chosen (even at point 0).
+        candidates = [(alias, weight) for (alias, weight) in candidates if weight > 0]
+        point = random.uniform(0, sum(weight for (alias, weight) in candidates))
+        for (alias, weight) in candidates:
+            point -= weight
+            if point <= 0:
+                return alias
+        return candidates[-1][0]
+
+    def db_for_write(self, model, **hints):
+        pin()
+        return self._primary(hints)
+
+    def healthy(self, alias, now=None):
+        """
+        Return False, and eject the replica ``alias``, if it can't run a
+        query; only checked every check_interval seconds.
+        """
+        now = now or time.time()
+        with self._lock:
+            if now - self._checked.get(alias, 0) < self.check_interval:
+                return True
+            self._checked[alias] = now
+        try:
+            self.check(alias)
+        except Exception:
+            logger.warning("Ejecting unhealthy replica %s for %s seconds", alias,
+                           self.eject_seconds, exc_info=True)
+            self.eject(alias)
+            return False
+        return True
+
+    def check(self, alias):
+        """Run a query on the replica ``alias``; raise if it fails."""
+        from django.db import connections
+        cursor = connections[alias].cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    def eject(self, alias, seconds=None):
+        """Stop sending reads to ``alias`` for ``seconds``."""
+        with self._lock:
+            self._ejected[alias] = time.time() + (
+                seconds if seconds is not None else self.eject_seconds)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Objects in the same primary's databases may be related."""
+        if obj1._state.db in self.primary_of and obj2._state.db in self.primary_of:
+            return self.primary_of[obj1._state.db] == self.primary_of[obj2._state.db]
+        return None
+
+    def allow_migrate(self, db, *args, **hints):
+        """Only create tables on primaries; replicas get them by replication."""
+        return False if self.primary_of.get(db, db) != db else None
+    # Django < 1.7
+    allow_syncdb = allow_migrate
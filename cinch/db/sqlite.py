@@ -0,0 +1,107 @@
+"""
+A performance profile for SQLite databases: pragmas which let readers
+carry on while a writer commits (WAL), don't fsync on every commit
+(synchronous=NORMAL, which is still safe from corruption in WAL mode),
+and give each connection more memory, applied to every new connection.
+
+Enable it with ``DatabasesSetting.add(..., sqlite_profile=True)``, or a
+dict of pragmas to override, or CINCH_SQLITE_PROFILE for the default
+database in base.py. WAL needs the database to be on a local filesystem.
+
+``maintain()`` checkpoints the WAL and runs ``PRAGMA optimize``, and can
+be run periodically in each process (``start_maintenance()``, via
+``DatabasesSetting.add(..., sqlite_maintenance_interval=...)`` or
+CINCH_SQLITE_MAINTENANCE_INTERVAL for the default database) or from cron with
+the ``cinch_sqlite_maintain`` management command.
+"""
+
+from __future__ import absolute_import
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+__all__ = ['PRAGMA_DEFAULTS', 'apply_pragmas', 'maintain', 'start_maintenance']
+
+
+logger = logging.getLogger(__name__)
+
+# Applied in this order; journal_mode first, as it affects the others.
+PRAGMA_DEFAULTS = (
+    ('journal_mode', 'WAL'),        # Readers don't block writers, or vice versa.
+    ('synchronous', 'NORMAL'),      # fsync at checkpoints, not every commit.
+    ('mmap_size', 2 ** 28),         # Read through up to 256 MB of mmap,
+    ('cache_size', -64000),         # and keep 64 MB (-n is in kB) of pages.
+    ('temp_store', 'MEMORY'),       # Temporary tables and indices in memory.
+    ('busy_timeout', 5000),         # ms to wait for a lock before failing.
+)
+
+
+def get_pragmas(overrides=None):
+    """
+    Return PRAGMA_DEFAULTS, updated from the dict ``overrides``; pragmas
+    overridden with None are left out.
+    """
+    overrides = dict(overrides or {})
+    pragmas = [(name, overrides.pop(name, value)) for (name, value) in PRAGMA_DEFAULTS]
+    pragmas.extend(sorted(overrides.items()))
+    return [(name, value) for (name, value) in pragmas if value is not None]
+
+
+def apply_pragmas(connection, pragmas=None):
+    """Apply ``pragmas`` (by default PRAGMA_DEFAULTS) to a DB-API connection."""
+    cursor = connection.cursor()
+    try:
+        for (name, value) in (pragmas if pragmas is not None else PRAGMA_DEFAULTS):
+            cursor.execute('PRAGMA {} = {}'.format(name, value))
+    finally:
+        cursor.close()
+
+
+def maintain(connection, checkpoint='PASSIVE', optimize=True):
+    """
+    Checkpoint the WAL (in the mode ``checkpoint``, e.g. 'TRUNCATE' to also
+    empty it, or None not to), and update the query planner's statistics.
+    """
+    cursor = connection.cursor()
+    try:
+        if checkpoint:
+            cursor.execute('PRAGMA wal_checkpoint({})'.format(checkpoint))
+        if optimize:
+            cursor.execute('PRAGMA optimize')
+    finally:
+        cursor.close()
+
+
+# (pid, database path) of the maintenance threads running.
+_maintaining = set()
+_maintaining_lock = threading.Lock()
+
+
+def start_maintenance(db_path, interval=300, checkpoint='PASSIVE'):
+    """
+    Run maintain() on the database at ``db_path`` every ``interval``
+    seconds, in a thread of this process (once, however often it's called).
+    """
+    key = (os.getpid(), db_path)
+    with _maintaining_lock:
+        if key in _maintaining:
+            return
+        _maintaining.add(key)
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                connection = sqlite3.connect(db_path, timeout=30)
+                try:
+                    maintain(connection, checkpoint)
+                finally:
+                    connection.close()
+            except Exception:
+                logger.exception("Error maintaining SQLite database %s", db_path)
+    thread = threading.Thread(target=run, name='cinch-sqlite-maintenance')
+    thread.daemon = True
+    thread.start()
@@ -0,0 +1,12 @@
+import json
+from django.http import HttpResponse
+from cinch.db.pool import pool_stats
+
+
+def pool_stats_view(request):
+    """
+    This worker's connection pool stats, by alias, as JSON. Include it in
+    a project's (internal-only) URLs for monitoring.
+    """
+    return HttpResponse(json.dumps(pool_stats(), sort_keys=True),
+                        content_type='application/json')
@@ -0,0 +1,33 @@
+"""
+Defaults of cinch's own settings, shared by the base settings files, the
+settings mixins and the code which falls back on them when a setting
+isn't defined. Kept free of Django imports, so settings files can use it.
+"""
+
+__all__ = ['STATIC_DEFAULTS', 'MEDIA_DEFAULTS']
+
+
+# Static files collection and compression (see cinch.staticfiles).
+STATIC_DEFAULTS = {
+    'CINCH_COLLECTSTATIC_THREADS': 8,
+    'CINCH_STATIC_GZIP': True,
+    'CINCH_STATIC_GZIP_LEVEL': 9,
+    'CINCH_STATIC_BROTLI': False,               # Requires the brotli package
+    'CINCH_STATIC_BROTLI_QUALITY': 11,
+    'CINCH_STATIC_COMPRESS_MIN_SIZE': 1024,     # Bytes
+    'CINCH_STATIC_COMPRESS_THREADS': 8,
+}
+
+# Uploads and media files (see cinch.media); FILE_UPLOAD_TEMP_DIR, which
+# depends on TMP_DIR, is set along with them.
+MEDIA_DEFAULTS = {
+    'FILE_UPLOAD_MAX_MEMORY_SIZE': 1024 * 1024,     # Django's is 2.5MB
+    'FILE_UPLOAD_HANDLERS': (
+        'cinch.media.ChunkedMemoryFileUploadHandler',
+        'cinch.media.ChunkedTemporaryFileUploadHandler',
+    ),
+    'CINCH_UPLOAD_CHUNK_SIZE': 256 * 1024,
+    'CINCH_MEDIA_SENDFILE': None,
+    'CINCH_MEDIA_ACCEL_PREFIX': '/protected-media/',
+    'CINCH_MEDIA_CHUNK_SIZE': 64 * 1024,
+}
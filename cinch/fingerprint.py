@@ -0,0 +1,88 @@
+"""
+A stable fingerprint of resolved settings, which changes when (and only
+when) the settings do, e.g. between deploys.
+
+The fingerprint is exported as CINCH_SETTINGS_FINGERPRINT, and added to
+the KEY_PREFIX of caches built with CachesSetting (unless added with
+fingerprint=False), so entries cached under old settings are never read
+again and just age out, rather than the cache having to be flushed.
+
+Only settings which change what gets cached are included: those named
+in CINCH_FINGERPRINT_SETTINGS, if it's set, or else FINGERPRINT_SETTINGS,
+less any in CINCH_FINGERPRINT_EXCLUDE. It's computed once, when settings
+have finished loading (by the outermost include_settings(), or
+cinch_settings()).
+"""
+
+from __future__ import absolute_import
+import hashlib
+import json
+from numbers import Number
+from .layered import LayeredDict
+
+
+__all__ = ['settings_fingerprint', 'apply_fingerprint']
+
+
+# Settings which change what gets cached (rendered pages and fragments,
+# URLs, translations, model data), and so invalidate it when they change.
+FINGERPRINT_SETTINGS = (
+    'AUTH_USER_MODEL', 'DEFAULT_CHARSET', 'HOST_OVERLAYS', 'INSTALLED_APPS',
+    'LANGUAGE_CODE', 'LANGUAGES', 'MEDIA_URL', 'MIDDLEWARE_CLASSES', 'ROOT_URLCONF',
+    'SITE_ID', 'STATIC_URL', 'STATICFILES_STORAGE', 'TEMPLATE_CONTEXT_PROCESSORS',
+    'TEMPLATE_DIRS', 'TEMPLATE_LOADERS', 'TIME_ZONE', 'USE_I18N', 'USE_L10N', 'USE_TZ',
+)
+
+_text_types = (str, type(u''))
+
+
+def _dumps(value):
+    # Also a sort key, for mixed types which Python 3 won't compare.
+    return json.dumps(value, sort_keys=True)
+
+
+def _canonical(value):
+    """
+    Return ``value`` as something json can serialise the same way every
+    time, whatever the order of its dicts and sets.
+    """
+    if value is None or isinstance(value, (bool, Number) + _text_types):
+        return value
+    if isinstance(value, LayeredDict):
+        value = value.resolve()
+    if hasattr(value, 'items'):
+        return {'dict': sorted(([_canonical(key), _canonical(val)]
+                                for (key, val) in value.items()), key=_dumps)}
+    if isinstance(value, (set, frozenset)):
+        return {'set': sorted((_canonical(val) for val in value), key=_dumps)}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(val) for val in value]
+    if isinstance(value, type) or callable(value):
+        return {'object': '{}.{}'.format(getattr(value, '__module__', ''),
+                                         getattr(value, '__name__', type(value).__name__))}
+    # Anything else's repr may include its address; go by its type alone.
+    return {'object': '{}.{}'.format(type(value).__module__, type(value).__name__)}
+
+
+def settings_fingerprint(settings, names=FINGERPRINT_SETTINGS, exclude=()):
+    """
+    Return a 12-character hex fingerprint of the settings in the dict
+    ``settings`` named in ``names``, except those in ``exclude``.
+    """
+    canonical = [[name, _canonical(settings[name])] for name in sorted(set(names))
+                 if name in settings and name not in exclude]
+    return hashlib.sha1(_dumps(canonical).encode('utf-8')).hexdigest()[:12]
+
+
+def apply_fingerprint(settings):
+    """
+    Set CINCH_SETTINGS_FINGERPRINT in the dict ``settings``, and add it to
+    the KEY_PREFIX of its CACHES, if they're a CachesSetting. Return it.
+    """
+    fingerprint = settings_fingerprint(
+        settings, settings.get('CINCH_FINGERPRINT_SETTINGS') or FINGERPRINT_SETTINGS,
+        frozenset(settings.get('CINCH_FINGERPRINT_EXCLUDE') or ()))
+    settings['CINCH_SETTINGS_FINGERPRINT'] = fingerprint
+    if hasattr(settings.get('CACHES'), 'apply_fingerprint'):
+        settings['CACHES'].apply_fingerprint(fingerprint)
+    return fingerprint
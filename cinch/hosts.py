@@ -0,0 +1,146 @@
+"""
+Host validation for sites with many ALLOWED_HOSTS (e.g. a domain per
+tenant), which Django checks each request's Host against one by one.
+
+HostMatcher compiles a list of ALLOWED_HOSTS-style patterns into a set of
+exact hosts and a trie of the reversed labels of '.example.com'-style
+patterns, so a host is checked in time proportional to its number of
+labels, however many patterns there are.
+
+To use it, add HostValidationMiddleware to MIDDLEWARE_CLASSES (as base.py
+does): if there are at least CINCH_COMPILE_ALLOWED_HOSTS patterns in
+ALLOWED_HOSTS, it compiles them when it's first loaded, rejects requests
+whose Host doesn't match, and has ``request.get_host()`` return the Host
+of those which do, so Django doesn't check them against ALLOWED_HOSTS one
+by one again. Middleware which comes before it still calls Django's.
+"""
+
+from __future__ import absolute_import
+import re
+
+
+__all__ = ['HostMatcher', 'HostValidationMiddleware']
+
+
+# As Django's django.http.request.host_validation_re
+host_validation_re = re.compile(r"^([a-z0-9.-]+|\[[a-f0-9]*:[a-f0-9\.:]+\])(:\d+)?$")
+
+# Marks a trie node which ends a '.example.com' pattern.
+_END = None
+
+
+def split_domain(host):
+    """
+    Return the domain of ``host`` (a Host header), lower-cased, without
+    its port or a trailing dot, or '' if it isn't valid.
+    """
+    match = host_validation_re.match(host.lower())
+    if not match:
+        return ''
+    domain = match.group(1)
+    return domain[:-1] if domain.endswith('.') else domain
+
+
+class HostMatcher(object):
+    """
+    Matches domains against ALLOWED_HOSTS-style ``patterns``: exact hosts,
+    '.example.com' for example.com and its subdomains, or '*' for any.
+    """
+    def __init__(self, patterns):
+        self.match_all = False
+        self.exact = set()
+        self.suffixes = {}
+        for pattern in patterns:
+            pattern = pattern.lower()
+            if pattern == '*':
+                self.match_all = True
+            elif pattern.startswith('.'):
+                node = self.suffixes
+                for label in reversed(pattern[1:].split('.')):
+                    node = node.setdefault(label, {})
+                node[_END] = pattern
+            else:
+                self.exact.add(pattern)
+
+    def matches(self, domain):
+        """Return True if ``domain`` (lower-case, without a port) matches."""
+        if self.match_all or domain in self.exact:
+            return True
+        node = self.suffixes
+        for label in reversed(domain.split('.')):
+            node = node.get(label)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+    def match(self, domain):
+        """
+        Return the pattern matching ``domain`` (the most specific one, if
+        several do), or None.
+        """
+        if domain in self.exact:
+            return domain
+        node, pattern = self.suffixes, None
+        for label in reversed(domain.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            pattern = node.get(_END, pattern)
+        if pattern is None and self.match_all:
+            return '*'
+        return pattern
+
+    def validate(self, host):
+        """Return True if the Host header ``host`` matches."""
+        domain = split_domain(host)
+        return bool(domain) and self.matches(domain)
+
+
+def raw_host(request, use_x_forwarded_host=False):
+    """
+    Return the Host of ``request`` as Django's HttpRequest.get_host() does,
+    but without checking it against ALLOWED_HOSTS.
+    """
+    meta = request.META
+    if use_x_forwarded_host and 'HTTP_X_FORWARDED_HOST' in meta:
+        return meta['HTTP_X_FORWARDED_HOST']
+    if 'HTTP_HOST' in meta:
+        return meta['HTTP_HOST']
+    host, port = meta['SERVER_NAME'], str(meta['SERVER_PORT'])
+    if port != ('443' if request.is_secure() else '80'):
+        host = '{}:{}'.format(host, port)
+    return host
+
+
+class HostValidationMiddleware(object):
+    """
+    Reject requests whose Host doesn't match ALLOWED_HOSTS, if there are at
+    least CINCH_COMPILE_ALLOWED_HOSTS of them, as Django does (so also not
+    when DEBUG is True). It should come before any middleware which uses
+    the request's host.
+    """
+    def __init__(self):
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+        threshold = getattr(settings, 'CINCH_COMPILE_ALLOWED_HOSTS', 100)
+        allowed_hosts = settings.ALLOWED_HOSTS
+        if settings.DEBUG or threshold is None or len(allowed_hosts) < threshold or \
+                '*' in allowed_hosts:
+            raise MiddlewareNotUsed
+        self.matcher = HostMatcher(allowed_hosts)
+        self.use_x_forwarded_host = getattr(settings, 'USE_X_FORWARDED_HOST', False)
+
+    def process_request(self, request):
+        host = raw_host(request, self.use_x_forwarded_host)
+        if not self.matcher.validate(host):
+            try:
+                from django.core.exceptions import DisallowedHost
+            except ImportError:
+                # Django < 1.6
+                from django.core.exceptions import SuspiciousOperation as DisallowedHost
+            raise DisallowedHost("Invalid HTTP_HOST header: {!r}. You may need to add "
+                                 "{!r} to ALLOWED_HOSTS.".format(host, split_domain(host)))
+        # Validated, so Django needn't scan ALLOWED_HOSTS for it again.
+        request.get_host = lambda: host
@@ -0,0 +1,220 @@
+"""
+A layered, copy-on-write mapping, for building up nested configuration
+(like logging's dictConfig) from defaults and overlays without copying
+them, or modifying them.
+
+Lookups fall through a stack of layers, top first. Nested mappings in
+overlays are merged with those in the layers below them, and returned as
+views; writes only ever go to the top layer, in which just the nested
+dicts that are written to are created. Lists in the layers below are
+copied to the top layer when they're read, so changing them doesn't
+change the layer. ``resolve()`` returns the result as plain, nested
+dicts (and copies of lists).
+"""
+
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError:
+    from collections import Mapping, MutableMapping
+
+
+__all__ = ['LayeredDict']
+
+
+class _Deleted(object):
+    """Marks a key deleted in a write layer, hiding it in the layers below."""
+    def __reduce__(self):
+        # Unpickle as the same marker, not a copy of it.
+        return '_DELETED'
+
+
+_DELETED = _Deleted()
+
+
+class _Overlay(dict):
+    """
+    A dict created in a write layer by writing through a view, which is
+    merged with the mappings below it. Other mappings set in a write layer
+    replace anything below them, as with dict.update().
+    """
+
+
+class LayeredDict(MutableMapping):
+    """
+    A mapping of ``layers`` (the first being the bottom one) and any
+    overlays added with ``deep_update()``, written to through a layer of
+    its own, on top. E.g.:
+
+    >>> defaults = {'loggers': {'django': {'level': 'INFO'}}}
+    >>> conf = LayeredDict(defaults)
+    >>> conf['loggers']['django']['level'] = 'DEBUG'
+    >>> conf.deep_update({'loggers': {'my_app': {'level': 'ERROR'}}})
+    >>> sorted(conf['loggers'])
+    ['django', 'my_app']
+    >>> defaults['loggers']['django']['level']
+    'INFO'
+    """
+    def __init__(self, *layers):
+        # (mapping, deep, writable) tuples, top first. Mappings nested in
+        # 'deep' layers are merged with those below them.
+        self._layers = [(_Overlay(), False, True)] + \
+            [(layer, True, False) for layer in reversed(layers)]
+        self._parent = None
+        self._key = None
+
+    @staticmethod
+    def _view(parent, key):
+        # Views are plain LayeredDicts, whatever the class of the parent.
+        view = LayeredDict.__new__(LayeredDict)
+        view._parent = parent
+        view._key = key
+        return view
+
+    def _get_layers(self):
+        if self._parent is None:
+            return self._layers
+        # Views are worked out afresh, so they see writes made elsewhere.
+        value, layers = self._parent._lookup(self._key)
+        if layers is None:
+            if isinstance(value, Mapping):
+                # Replaced by a mapping set in the write layer.
+                return [(value, False, True)]
+            raise KeyError(self._key)
+        return layers
+
+    def _lookup(self, key):
+        return _lookup(self._get_layers(), key)
+
+    def _write_layer(self):
+        """Return the mapping written to, creating it if it doesn't exist."""
+        if self._parent is None:
+            return self._layers[0][0]
+        parent_layer = self._parent._write_layer()
+        layer = parent_layer.get(self._key)
+        if not isinstance(layer, Mapping):
+            layer = parent_layer[self._key] = _Overlay()
+        return layer
+
+    def __getitem__(self, key):
+        value, layers = self._lookup(key)
+        if layers is not None:
+            return self._view(self, key)
+        if isinstance(value, list) and not self._in_write_layer(key):
+            # Copied on read, as it can be written to without us knowing.
+            value = self._write_layer()[key] = _resolve(value)
+        return value
+
+    def _in_write_layer(self, key):
+        for (mapping, deep, writable) in self._get_layers():
+            if key in mapping:
+                return writable
+        return False
+
+    def __setitem__(self, key, value):
+        self._write_layer()[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._write_layer()[key] = _DELETED
+
+    def __contains__(self, key):
+        for (mapping, deep, writable) in self._get_layers():
+            if key in mapping:
+                return mapping[key] is not _DELETED
+        return False
+
+    def __iter__(self):
+        seen = set()
+        for (mapping, deep, writable) in self._get_layers():
+            for key in mapping:
+                if key not in seen:
+                    seen.add(key)
+                    if mapping[key] is not _DELETED:
+                        yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.resolve())
+
+    def deep_update(self, updated):
+        """
+        Update nested mappings without implicitly removing missing values;
+        ``updated`` is added as an overlay, without being copied.
+        """
+        if self._parent is None:
+            self._layers[0:1] = [(_Overlay(), False, True), (updated, True, False),
+                                 (self._layers[0][0], False, False)]
+            return
+        for (key, value) in updated.items():
+            current = self.get(key) if isinstance(value, Mapping) else None
+            if isinstance(current, LayeredDict):
+                current.deep_update(value)
+            else:
+                self[key] = value
+
+    def resolve(self):
+        """Return the contents of this mapping as plain, nested dicts."""
+        return _resolve_layers(self._get_layers())
+
+
+def _lookup(layers, key):
+    """
+    Return ``(value, None)`` if ``key`` is a plain value in ``layers`` (or
+    a mapping of the write layer, which can be returned as it is), or
+    ``(None, child_layers)``, the layers of the view of a nested mapping.
+    """
+    child_layers = []
+    for (mapping, deep, writable) in layers:
+        if key not in mapping:
+            continue
+        value = mapping[key]
+        if value is _DELETED:
+            break
+        if isinstance(value, _Overlay):
+            child_layers.append((value, False, writable))
+            continue
+        if isinstance(value, Mapping):
+            if not child_layers and writable:
+                return value, None
+            child_layers.append((value, True, False))
+            if deep:
+                continue
+        elif not child_layers:
+            return value, None
+        break
+    if not child_layers:
+        raise KeyError(key)
+    return None, child_layers
+
+
+def _resolve_layers(layers):
+    # Walks the layers directly, rather than through views of them.
+    resolved, seen = {}, set()
+    for (mapping, deep, writable) in layers:
+        for key in mapping:
+            if key in seen:
+                continue
+            seen.add(key)
+            if mapping[key] is _DELETED:
+                continue
+            value, child_layers = _lookup(layers, key)
+            resolved[key] = _resolve(value) if child_layers is None \
+                else _resolve_layers(child_layers)
+    return resolved
+
+
+def _resolve(value):
+    if isinstance(value, LayeredDict):
+        return value.resolve()
+    if isinstance(value, Mapping):
+        return dict((key, _resolve(val)) for (key, val) in value.items())
+    if isinstance(value, list):
+        return [_resolve(val) for val in value]
+    if type(value) is tuple:
+        return tuple(_resolve(val) for val in value)
+    if isinstance(value, set):
+        return set(value)
+    return value
@@ -0,0 +1,93 @@
+"""
+Lazily computed settings. A lazy setting is a function of the settings
+object which is only called the first time the setting is read, after
+which its value is memoised on the instance.
+
+Settings read while a lazy setting is being computed (whether they're
+lazy themselves or not) are recorded as its dependencies, so explicitly
+setting (say) ``VAR_DIR`` forgets the memoised ``LOG_DIR`` that was
+derived from it.
+"""
+
+
+__all__ = ['lazy_setting']
+
+
+def _state(obj, attr, factory):
+    """Get (or create) bookkeeping state, without invoking __setattr__."""
+    try:
+        return obj.__dict__[attr]
+    except KeyError:
+        value = obj.__dict__[attr] = factory()
+        return value
+
+
+def record_read(obj, name):
+    """
+    Record that the setting ``name`` was read, as a dependency of the lazy
+    setting being computed, if there is one.
+    """
+    stack = obj.__dict__.get('_lazy_stack')
+    if stack:
+        _state(obj, '_lazy_dependents', dict).setdefault(name, set()).add(stack[-1])
+
+
+def get_lazy(obj, name, func):
+    """
+    Return the memoised value of the lazy setting ``name`` on ``obj``,
+    computing it with ``func(obj)`` if it hasn't been read yet.
+    """
+    values = _state(obj, '_lazy_values', dict)
+    stack = _state(obj, '_lazy_stack', list)
+    record_read(obj, name)
+    if name in values:
+        return values[name]
+    if name in stack:
+        raise RuntimeError("Circular lazy setting: {}".format(
+            ' -> '.join(stack + [name])))
+    stack.append(name)
+    try:
+        value = func(obj)
+    finally:
+        stack.pop()
+    values[name] = value
+    return value
+
+
+def invalidate_lazy(obj, name):
+    """
+    Forget the memoised values of lazy settings which were computed from
+    ``name``, and of anything computed from those, so they're recomputed
+    when next read. Lazy settings which have been explicitly set are kept.
+    """
+    values = obj.__dict__.get('_lazy_values', {})
+    fixed = obj.__dict__.get('_lazy_fixed', ())
+    for dependent in obj.__dict__.get('_lazy_dependents', {}).get(name, ()):
+        if dependent in values and dependent not in fixed:
+            del values[dependent]
+            invalidate_lazy(obj, dependent)
+
+
+class lazy_setting(object):
+    """
+    Decorator for a method of a settings class which computes a setting,
+    named after the method, on first access. E.g.::
+
+        class Settings(CinchSettings):
+            @lazy_setting
+            def LOG_DIR(cnf):
+                return path.join(cnf.VAR_DIR, 'log')
+    """
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        return get_lazy(obj, self.name, self.func)
+
+    def __set__(self, obj, value):
+        _state(obj, '_lazy_values', dict)[self.name] = value
+        _state(obj, '_lazy_fixed', set).add(self.name)
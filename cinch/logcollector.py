@@ -0,0 +1,204 @@
+"""
+A per-host log collector: a single process which does all the writing
+(and rotation) for logfile handlers shared by many worker processes.
+
+Workers log through ``cinch.loghandlers.CollectorHandler``, which sends
+batches of records to the collector over a Unix socket, and starts the
+collector if it isn't running. It can also be started by hand::
+
+    python -m cinch.logcollector /path/to/var/log/cinch-logcollector.sock
+
+Only one collector runs per socket path; others exit immediately. The
+socket is only accessible to the user running the collector. The
+collector exits on SIGTERM or SIGINT, or once no worker has been
+connected for ``--idle-timeout`` seconds, after writing everything it
+has received.
+"""
+
+from __future__ import absolute_import
+import fcntl
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+from optparse import OptionParser
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+
+__all__ = ['LogCollector', 'send_message', 'recv_message']
+
+
+_header = struct.Struct('!I')
+
+
+def send_message(sock, message):
+    """
+    Send a message of JSON types, prefixed with its length. Messages are
+    only ever data, so a collector can't be made to run anything by them.
+    """
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(_header.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise EOFError
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock):
+    """Receive a message sent by send_message(); raise EOFError at the end."""
+    size = _header.unpack(_recv_exactly(sock, _header.size))[0]
+    return json.loads(_recv_exactly(sock, size).decode('utf-8'))
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """
+    Reads messages from one worker: ['handler', key, config] registers the
+    handler records for ``key`` are written by, and ['records', [[key,
+    record_dict], ...]] is a batch of records.
+    """
+    def handle(self):
+        collector = self.server.collector
+        collector.connected(1)
+        try:
+            while True:
+                try:
+                    message = recv_message(self.request)
+                except (EOFError, socket.error):
+                    break
+                if message[0] == 'handler':
+                    collector.register(message[1], message[2])
+                elif message[0] == 'records':
+                    collector.write(message[1])
+        finally:
+            collector.connected(-1)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class LogCollector(object):
+    """
+    Writes records received on the Unix socket ``socket_path`` to the
+    handlers registered by the workers which sent them.
+    """
+    def __init__(self, socket_path, idle_timeout=60):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.handlers = {}
+        self.written = 0
+        self._connections = 0
+        self._last_connected = time.time()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def connected(self, change):
+        with self._lock:
+            self._connections += change
+            self._last_connected = time.time()
+
+    def register(self, key, config):
+        from .loghandlers import build_handler
+        with self._lock:
+            if key not in self.handlers:
+                self.handlers[key] = build_handler(config)
+
+    def write(self, records):
+        for (key, record_dict) in records:
+            handler = self.handlers[key]
+            record = logging.makeLogRecord(record_dict)
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        with self._lock:
+            self.written += len(records)
+
+    def serve(self):
+        """
+        Serve until stopped, or until idle for idle_timeout seconds. Return
+        False without serving if another collector holds the socket.
+        """
+        lock_f = open(self.socket_path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            lock_f.close()
+            return False
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        # Only processes of the same user may connect to the socket.
+        old_umask = os.umask(0o177)
+        try:
+            self.server = _Server(self.socket_path, _ConnectionHandler)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.socket_path, 0o600)
+        self.server.collector = self
+        watcher = threading.Thread(target=self._watch_idle)
+        watcher.daemon = True
+        watcher.start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self._stopped.set()
+            self.close()
+            lock_f.close()
+        return True
+
+    def stop(self, *args):
+        # serve_forever() is waited on, so shut down from another thread.
+        if hasattr(self, 'server'):
+            threading.Thread(target=self.server.shutdown).start()
+
+    def close(self, wait=5):
+        """
+        Stop accepting connections, give connected workers ``wait``
+        seconds to send what they have, then flush and close the handlers.
+        """
+        self.server.server_close()
+        os.remove(self.socket_path)
+        deadline = time.time() + wait
+        while self._connections and time.time() < deadline:
+            time.sleep(0.05)
+        with self._lock:
+            for handler in self.handlers.values():
+                handler.flush()
+                handler.close()
+
+    def _watch_idle(self):
+        while not self._stopped.wait(1):
+            if not self._connections and \
+                    time.time() - self._last_connected > self.idle_timeout:
+                self.server.shutdown()
+                return
+
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options] SOCKET_PATH")
+    parser.add_option('--idle-timeout', type='float', default=60,
+                      help="Exit after this many seconds without workers.")
+    options, args = parser.parse_args(argv)
+    if len(args) != 1:
+        parser.error("A socket path is required.")
+    collector = LogCollector(args[0], idle_timeout=options.idle_timeout)
+    signal.signal(signal.SIGTERM, collector.stop)
+    signal.signal(signal.SIGINT, collector.stop)
+    collector.serve()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Logging filters which cut the number of records from noisy loggers before
+they're formatted or written, without losing track of what was dropped.
+
+``SamplingFilter`` keeps one in every N records of each logger and level,
+and ``RateLimitFilter`` allows records of each message template through
+at a limited rate. Both periodically log how many records they've
+suppressed to the 'cinch.logfilters' logger. Attach them to handlers or
+loggers with ``LoggingSetting.add_sampling_filter()`` and
+``LoggingSetting.add_rate_limit_filter()``.
+"""
+
+from __future__ import absolute_import
+import atexit
+import logging
+import os
+import threading
+import time
+import weakref
+
+
+__all__ = ['SuppressingFilter', 'SamplingFilter', 'RateLimitFilter']
+
+
+# Filters to close at exit, without keeping them alive until then.
+_filters = weakref.WeakSet()
+
+
+@atexit.register
+def _close_filters():
+    for log_filter in list(_filters):
+        log_filter.close()
+
+
+def _summarise_periodically(filter_ref, pid, interval):
+    """
+    Flush the filter every ``interval`` seconds, until it's closed,
+    restarted in another process or garbage collected.
+    """
+    while True:
+        time.sleep(interval)
+        log_filter = filter_ref()
+        if log_filter is None or log_filter._pid != pid:
+            return
+        log_filter.flush()
+        del log_filter
+
+
+class SuppressingFilter(logging.Filter):
+    """
+    Base class for filters which count the records they suppress, and log a
+    summary of the counts to ``summary_logger`` every ``summary_interval``
+    seconds (from a thread, started when a record is first suppressed), and
+    when closed (at exit, or by ``close()``).
+
+    Subclasses override ``allow()`` (which keeps everything here), and
+    ``key()`` if records shouldn't be counted by logger, level and message.
+    """
+    def __init__(self, summary_interval=60, summary_logger='cinch.logfilters'):
+        logging.Filter.__init__(self)
+        self.summary_interval = summary_interval
+        self.summary_logger = summary_logger
+        self.suppressed = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        _filters.add(self)
+
+    def key(self, record):
+        """The key records are counted (and suppressed) by."""
+        msg = record.msg
+        return (record.name, record.levelno,
+                msg if isinstance(msg, (str, type(u''))) else repr(msg))
+
+    def allow(self, key, record):
+        """Return True if the record should be kept. Called under a lock."""
+        return True
+
+    def filter(self, record):
+        if record.name == self.summary_logger:
+            return True
+        key = self.key(record)
+        with self._lock:
+            allowed = self.allow(key, record)
+            if not allowed:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                if self._pid != os.getpid():
+                    self._start()
+        return allowed
+
+    def _start(self):
+        """(Re)start the summary thread, in a new process after a fork."""
+        self._pid = os.getpid()
+        summariser = threading.Thread(
+            target=_summarise_periodically, name='cinch-log-summary',
+            args=(weakref.ref(self), self._pid, self.summary_interval))
+        summariser.daemon = True
+        summariser.start()
+
+    def flush(self):
+        """Log a summary of the records suppressed since the last one."""
+        with self._lock:
+            summary, self.suppressed = self.suppressed, {}
+        if summary:
+            self.summarise(summary)
+
+    def close(self):
+        """Stop the summary thread, and log what's been suppressed since."""
+        self._pid = None
+        self.flush()
+
+    def summarise(self, suppressed):
+        logging.getLogger(self.summary_logger).warning(
+            "%s suppressed %d records in the last %s seconds: %s",
+            self.__class__.__name__, sum(suppressed.values()), self.summary_interval,
+            ', '.join('{} x{}'.format(key, count)
+                      for (key, count) in sorted(suppressed.items())))
+
+
+class SamplingFilter(SuppressingFilter):
+    """Keep the first, and then every ``rate``th, record of each logger and level."""
+    def __init__(self, rate=10, **kwargs):
+        SuppressingFilter.__init__(self, **kwargs)
+        self.rate = rate
+        self.seen = {}
+
+    def key(self, record):
+        return (record.name, record.levelname)
+
+    def allow(self, key, record):
+        seen = self.seen.get(key, 0)
+        self.seen[key] = seen + 1
+        return seen % self.rate == 0
+
+
+class RateLimitFilter(SuppressingFilter):
+    """
+    Token bucket for each logger and message template (the message before
+    its arguments are merged in), which lets ``burst`` records through at
+    once and refills at ``rate`` records a second. At most ``max_keys``
+    buckets are kept; they're all forgotten when there'd be more.
+    """
+    def __init__(self, rate=1.0, burst=10, max_keys=10000, **kwargs):
+        SuppressingFilter.__init__(self, **kwargs)
+        self.rate = float(rate)
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets = {}
+
+    def key(self, record):
+        key = SuppressingFilter.key(self, record)
+        return (key[0], key[2])
+
+    def allow(self, key, record):
+        now = time.time()
+        if key in self.buckets:
+            tokens, updated = self.buckets[key]
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        else:
+            if len(self.buckets) >= self.max_keys:
+                self.buckets.clear()
+            tokens = self.burst
+        allowed = tokens >= 1
+        self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+        return allowed
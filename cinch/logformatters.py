@@ -0,0 +1,105 @@
+"""
+A JSON-lines log formatter: one JSON object per record, on one line, with
+a fixed set of fields. Only the fields asked for are computed, so (for
+example) the time isn't formatted unless 'asctime' is one of them.
+"""
+
+from __future__ import absolute_import
+import json
+import logging
+import time
+from collections import OrderedDict
+
+
+__all__ = ['JSONLinesFormatter']
+
+
+DEFAULT_FIELDS = ('asctime', 'levelname', 'name', 'message',
+                  'pathname', 'lineno', 'process', 'thread')
+
+
+# Reused, since json.dumps() creates an encoder per call given any options.
+_safe_dumps = json.JSONEncoder(default=repr).encode
+
+
+def get_serializer(serializer=None):
+    """
+    Return a function which serialises a dict to a JSON string: ``serializer``
+    itself if it's callable, the standard library's json for None or 'json',
+    or for 'fast' the fastest of orjson, ujson or simplejson installed.
+    Values the serialiser can't handle are serialised as their repr().
+    """
+    if callable(serializer):
+        dumps = serializer
+    elif serializer in (None, 'json'):
+        return _safe_dumps
+    elif serializer == 'fast':
+        dumps = None
+        try:
+            import orjson
+            dumps = lambda obj: orjson.dumps(obj).decode('utf-8')
+        except ImportError:
+            try:
+                import ujson
+                dumps = lambda obj: ujson.dumps(obj, ensure_ascii=False)
+            except ImportError:
+                try:
+                    import simplejson
+                    dumps = simplejson.dumps
+                except ImportError:
+                    return _safe_dumps
+    else:
+        raise ValueError("Unknown serializer: {!r}".format(serializer))
+
+    def fast_dumps(obj):
+        try:
+            return dumps(obj)
+        except (TypeError, ValueError, OverflowError):
+            return _safe_dumps(obj)
+    return fast_dumps
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """
+    Formats each record as a JSON object of ``fields``: 'message' (the
+    message with its arguments merged in), 'asctime' (formatted with
+    ``datefmt``), or any other attribute of the record (null if it's
+    missing). Exceptions are included as 'exc_info', when there is one.
+    """
+    def __init__(self, fields=DEFAULT_FIELDS, datefmt=None, serializer=None):
+        logging.Formatter.__init__(self, None, datefmt)
+        self.fields = tuple(fields)
+        self.dumps = get_serializer(serializer)
+        # Worked out once, rather than for every record.
+        self._message = 'message' in self.fields
+        self._asctime = 'asctime' in self.fields
+        self._time_cache = (None, None)
+
+    def format(self, record):
+        attrs = record.__dict__
+        # Every field is set here, so keys keep the order of self.fields
+        # (which a plain dict wouldn't, before Python 3.7).
+        data = OrderedDict([(field, attrs.get(field)) for field in self.fields])
+        if self._message:
+            data['message'] = record.getMessage()
+        if self._asctime:
+            data['asctime'] = self.formatTime(record, self.datefmt)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc_info'] = record.exc_text
+        return self.dumps(data)
+
+    def formatTime(self, record, datefmt=None):
+        """
+        Format the time as the base Formatter does, but only format each
+        second once, when there's no ``datefmt``.
+        """
+        if datefmt:
+            return logging.Formatter.formatTime(self, record, datefmt)
+        second = int(record.created)
+        cached_second, formatted = self._time_cache
+        if second != cached_second:
+            formatted = time.strftime('%Y-%m-%d %H:%M:%S', self.converter(record.created))
+            self._time_cache = (second, formatted)
+        return '%s,%03d' % (formatted, record.msecs)
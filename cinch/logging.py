@@ -1,7 +1,12 @@
 
+from __future__ import absolute_import
 import os
-from collections import Mapping
-from revkom.coll import EasyList, deep_update
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+from .layered import LayeredDict
+from .profiling import profiled
 
 
 ###
@@ -22,18 +27,43 @@ LOGFILE_DEFAULTS = {
     'maxBytes': (10 ** 7),                              # of 10 MB each.
     'formatter': 'verbose',     # Including all potentially useful information.
 }
+JSONLINES_FORMATTER_DEFAULTS = {
+    '()': 'cinch.logformatters.JSONLinesFormatter',
+    'serializer': 'fast',   # orjson, ujson or simplejson if installed.
+}
+QUEUE_DEFAULTS = {
+    'maxsize': 10000,       # Records waiting to be written, per process,
+    'overflow': 'block',    # beyond which logging waits for the writer.
+}
 
 
-class LoggingSetting(dict):
+def dict_config(config):
+    """
+    Configure logging from ``config``, as logging.config.dictConfig() does,
+    resolving LoggingSettings first; for use as Django's LOGGING_CONFIG.
+    """
+    from logging.config import dictConfig
+    if isinstance(config, LayeredDict):
+        config = config.resolve()
+    dictConfig(config)
+
+
+class LoggingSetting(LayeredDict):
     """
     A dictConfig manager class, for configuring logging.
     - https://docs.djangoproject.com/en/dev/topics/logging/\
         #django-s-default-logging-configuration
     - http://docs.python.org/2/library/logging.config.html
+
+    The defaults, and mappings passed in or deep_update()'d, are layered
+    underneath the changes made to an instance, rather than copied into it
+    (see cinch.layered), so they're never modified. Use ``resolve()`` to
+    get the plain dict dictConfig() needs, or ``dict_config()`` above.
     """
+    @profiled('LoggingSetting.__init__')
     def __init__(self, *args, **kwargs):
-        # Install the default keys/values, either passed in or defined above.
-        self.update(
+        # Layer on the default keys/values, either passed in or defined above.
+        super(LoggingSetting, self).__init__(
             kwargs.pop('defaults') if 'defaults' in kwargs
             else LOGGING_SETTINGS_DEFAULTS)
         # Update self with dicts passed to the constructor.
@@ -50,16 +80,24 @@ class LoggingSetting(dict):
         # Set the logfile_dir if one was specified.
         self.logfile_dir = kwargs.pop('logfile_dir') \
             if 'logfile_dir' in kwargs else None
+        # Whether logfile handlers write through a queue, and its size and
+        # overflow policy (see cinch.loghandlers).
+        self.queue = kwargs.pop('queue', False)
+        self.queue_maxsize = kwargs.pop('queue_maxsize', QUEUE_DEFAULTS['maxsize'])
+        self.queue_overflow = kwargs.pop('queue_overflow', QUEUE_DEFAULTS['overflow'])
+        # Whether logfile handlers write through a per-host log collector
+        # process; True, or the path of its Unix socket (see cinch.logcollector).
+        self.collector = kwargs.pop('collector', False)
+        self.collector_options = kwargs.pop('collector_options', {})
         # Apply any remaining keyword arguments as attributes on self.
-        for (key, val) in kwargs.iteritems():
+        for (key, val) in kwargs.items():
             self[key] = val
-        # We've processed all the constructor arguments, but should still let
-        # the super class do any initialisation it needs to without arguments.
-        super(LoggingSetting, self).__init__()
 
     def deep_update(self, updated):
         """
-        Update nested mappings without implicitly removing missing values. I.e.:
+        Update nested mappings without implicitly removing missing values.
+        ``updated`` is layered on top of self, not copied, so it shouldn't
+        be changed afterwards. I.e.:
 
         >>> log_conf = LoggingSetting({'loggers': {'django': 'log_conf'}})
         # deep_update() doesn't overwrite 'django' key in 'loggers' mapping
@@ -71,7 +109,7 @@ class LoggingSetting(dict):
         >>> log_conf['loggers']
         {'my_app': 'bar'}
         """
-        self = deep_update(self, updated)
+        super(LoggingSetting, self).deep_update(updated)
 
     def add_logfile_handler(self, handler_name=None, *prefixes, **kwargs):
         """
@@ -80,40 +118,137 @@ class LoggingSetting(dict):
         write to [prefix1.prefix2.etc.]handler_name.log, in the directory
         self.log_dir (a string to a writable directory you should set when
         initialising an instance of this class (or whenever)).
+
+        If self.queue, or the keyword argument ``queue``, is True, the file
+        is written by a QueueListener thread rather than the logging thread.
+        If self.collector, or the keyword argument ``collector``, is set, the
+        file is written by a log collector process shared by all workers.
+        If the keyword argument ``json_lines`` is True, records are written
+        as JSON objects, one per line, by the 'jsonlines' formatter.
         """
         # Get the full path to a logfile to be written or die trying.
         if 'file_path' in kwargs:
             file_path = kwargs.pop('file_path')
         else:
-            try:
-                logfile_dir = kwargs.get('logfile_dir', self.logfile_dir)
-            except KeyError:
+            logfile_dir = kwargs.pop('logfile_dir', self.logfile_dir)
+            if logfile_dir is None:
                 raise RuntimeError(
-                    "A logfile_dir attribute must be set on this class or" +
+                    "A logfile_dir attribute must be set on this class or " +
                     "passed to this function as a keyword argument.")
-        if logfile_dir[-1] != os.sep:
-            logfile_dir += os.sep
-        dot_prefix = ".".join(prefixes) + '.' if prefixes else ''
-        file_path = dot_prefix + handler_name + '.log'
+            dot_prefix = ".".join(prefixes) + '.' if prefixes else ''
+            file_path = os.path.join(logfile_dir, dot_prefix + handler_name + '.log')
         # Construct a name for the handler, which is set in the logger.
         dash_prefix = "-".join(prefixes) + '-' if prefixes else ''
         handler_name = dash_prefix + handler_name + '_logfile'
+        queue = kwargs.pop('queue', self.queue)
+        collector = kwargs.pop('collector', self.collector)
+        if kwargs.pop('json_lines', False):
+            self.add_jsonlines_formatter()
+            kwargs['formatter'] = 'jsonlines'
         # Set the properties of the handler from known defaults and kwargs.
-        self['handlers'][handler_name] = self.logfile_defaults.copy() \
+        handler = self.logfile_defaults.copy() \
             if 'defaults' not in kwargs else kwargs.pop('defaults')
-        self['handlers'][handler_name]['filename'] = file_path
+        handler['filename'] = file_path
         # Set any remaining keywoard arguments as attributes of the handler.
-        for (key, val) in kwargs.iteritems():
-            self['handlers'][handler_name][key] = val
+        for (key, val) in kwargs.items():
+            handler[key] = val
+        if collector and handler.get('formatter') in self['formatters']:
+            # The collector is sent the config of the formatter, as data.
+            formatter = self['formatters'][handler['formatter']]
+            handler['formatter'] = formatter.resolve() \
+                if isinstance(formatter, LayeredDict) else dict(formatter)
+        elif (queue or collector) and 'formatter' in handler:
+            # Handlers built by other handlers are given a formatter, not the
+            # name of one; refer to the Formatter dictConfig has built by then.
+            handler['formatter'] = 'cfg://formatters.' + handler['formatter']
+        if collector:
+            handler = self.collector_handler(handler, collector)
+        if queue:
+            handler = self.queue_handler(handler)
+        self['handlers'][handler_name] = handler
+
+    def queue_handler(self, target):
+        """
+        Return the config of a handler which queues records for ``target``,
+        the config of another handler, to handle in a separate thread.
+        """
+        return {
+            '()': 'cinch.loghandlers.QueueHandler',
+            'level': target.get('level', 'NOTSET'),
+            'target': target,
+            'maxsize': self.queue_maxsize,
+            'overflow': self.queue_overflow,
+        }
+
+    def collector_handler(self, target, collector=True):
+        """
+        Return the config of a handler which sends records to a log
+        collector process, listening on the Unix socket ``collector`` (or
+        in self.logfile_dir if it's True), to be handled by ``target``.
+        """
+        if collector is True:
+            if self.logfile_dir is None:
+                raise RuntimeError(
+                    "A logfile_dir attribute must be set on this class or a " +
+                    "socket path given to use a log collector.")
+            collector = os.path.join(self.logfile_dir, 'cinch-logcollector.sock')
+        config = {
+            '()': 'cinch.loghandlers.CollectorHandler',
+            'level': target.get('level', 'NOTSET'),
+            'target': target,
+            'socket_path': collector,
+        }
+        config.update(self.collector_options)
+        return config
+
+    def add_jsonlines_formatter(self, formatter_name='jsonlines', **kwargs):
+        """
+        Add a JSON-lines formatter (see cinch.logformatters), unless one by
+        ``formatter_name`` exists. Keyword arguments are passed to it.
+        """
+        if formatter_name not in self['formatters']:
+            self['formatters'][formatter_name] = dict(JSONLINES_FORMATTER_DEFAULTS, **kwargs)
+
+    def add_filter(self, filter_name, filter_config, handlers=(), loggers=()):
+        """
+        Add a filter, and attach it to each of the named handlers and loggers.
+        Loggers which haven't been configured yet are added.
+        """
+        self['filters'][filter_name] = filter_config
+        # Lists may belong to a layer underneath, so replace, don't append.
+        for handler_name in handlers:
+            handler = self['handlers'][handler_name]
+            handler['filters'] = list(handler.get('filters', ())) + [filter_name]
+        for logger_name in loggers:
+            logger = self['loggers'].setdefault(logger_name, {})
+            logger['filters'] = list(logger.get('filters', ())) + [filter_name]
+
+    def add_sampling_filter(self, filter_name, rate, handlers=(), loggers=(), **kwargs):
+        """
+        Add a filter which keeps one in every ``rate`` records of each logger
+        and level (see cinch.logfilters.SamplingFilter for other arguments).
+        """
+        kwargs.update({'()': 'cinch.logfilters.SamplingFilter', 'rate': rate})
+        self.add_filter(filter_name, kwargs, handlers, loggers)
+
+    def add_rate_limit_filter(self, filter_name, rate, burst=10, handlers=(), loggers=(),
+                              **kwargs):
+        """
+        Add a filter which lets ``burst`` records of each message template
+        through at once, and ``rate`` a second after that (see
+        cinch.logfilters.RateLimitFilter for other arguments).
+        """
+        kwargs.update({'()': 'cinch.logfilters.RateLimitFilter', 'rate': rate, 'burst': burst})
+        self.add_filter(filter_name, kwargs, handlers, loggers)
 
     def add_logfile_handlers_for_apps(self, *apps, **kwargs):
         """
         Convenience for setting logfile handlers for multiple apps
-        simultaneously. Same as add_logfile_handler_for_app, but *prefixes can
+        simultaneously. Same as add_logfile_handler, but *prefixes can
         be supplied as a list, or a single prefix as a string, via the keyword
         arguments prefixes or prefix, respectively.
         """
         prefixes = kwargs.pop('prefixes') if 'prefixes' in kwargs \
-            else [kwargs.pop('prefix', '')]
+            else [kwargs.pop('prefix')] if 'prefix' in kwargs else []
         for app in apps:
-            self.add_logfile_handler_for_app(app, prefixes, **kwargs)
+            self.add_logfile_handler(app, *prefixes, **dict(kwargs))
@@ -0,0 +1,462 @@
+"""
+Logging handlers which take slow I/O out of the threads doing the logging.
+
+``QueueHandler`` puts records on a bounded, per-process queue, from which
+a ``QueueListener`` thread (one per maxsize and overflow policy) passes
+them on to the real (e.g. file) handlers. ``CollectorHandler`` sends batches of records to a single
+per-host process, which does the writing for every worker (see
+``cinch.logcollector``). Use them via ``LoggingSetting(queue=True)`` or
+``LoggingSetting(collector=True)``, or by hand in a dictConfig::
+
+    'handlers': {
+        'app_logfile': {
+            '()': 'cinch.loghandlers.QueueHandler',
+            'target': {
+                'class': 'logging.handlers.RotatingFileHandler',
+                'filename': '/path/to/app.log',
+                'formatter': 'cfg://formatters.verbose',
+            },
+            'maxsize': 10000,
+            'overflow': 'drop-new',
+        },
+    }
+"""
+
+from __future__ import absolute_import
+import atexit
+import copy
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from .logcollector import send_message
+
+
+__all__ = ['QueueHandler', 'QueueListener', 'get_listener', 'release_listener',
+           'CollectorHandler', 'build_handler']
+
+
+# What QueueHandlers do with a record when the queue is full: wait for
+# space, discard the oldest queued record to make space, or discard the
+# new record. Discarded records are counted in QueueListener.dropped.
+OVERFLOW_POLICIES = ('block', 'drop-oldest', 'drop-new')
+
+
+def _resolve(name):
+    """Import and return an object from its dotted path."""
+    module_name, _, attr = str(name).rpartition('.')
+    module = __import__(module_name, fromlist=[attr])
+    return getattr(module, attr)
+
+
+def build_formatter(config):
+    """
+    Return a Formatter from a Formatter, or the config of one as would be
+    given in a dictConfig's 'formatters'.
+    """
+    if isinstance(config, logging.Formatter):
+        return config
+    config = dict((key, config[key]) for key in config)
+    if '()' in config:
+        factory = config.pop('()')
+        factory = _resolve(factory) if not callable(factory) else factory
+        return factory(**dict((str(key), val) for (key, val) in config.items()))
+    return logging.Formatter(config.get('format'), config.get('datefmt'))
+
+
+def build_handler(config):
+    """
+    Return a Handler from a dict in the form of a dictConfig handler, where
+    'formatter' is a Formatter or the config of one, rather than a name.
+    """
+    # Index rather than copy, so dictConfig's ConvertingDicts resolve values.
+    config = dict((key, config[key]) for key in config)
+    factory = config.pop('()', None) or config.pop('class')
+    factory = _resolve(factory) if not callable(factory) else factory
+    level = config.pop('level', None)
+    formatter = config.pop('formatter', None)
+    handler = factory(**dict((str(key), val) for (key, val) in config.items()))
+    if level is not None:
+        handler.setLevel(level)
+    if formatter is not None:
+        handler.setFormatter(build_formatter(formatter))
+    return handler
+
+
+class QueueListener(object):
+    """
+    A thread which takes (handler, record) pairs off a bounded queue and
+    has each handler handle its record. Use ``get_listener()`` for the
+    process's listener with given options, rather than creating new ones.
+    """
+    def __init__(self, maxsize=10000, overflow='block'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("overflow must be one of: " + ', '.join(OVERFLOW_POLICIES))
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stopped = False
+
+    def start(self):
+        """
+        Start the listener's thread in this process. Records queued in a
+        parent process before a fork are the parent's to write.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.maxsize)
+            self._thread = threading.Thread(target=self._monitor, name='cinch-log-listener')
+            self._thread.daemon = True
+            self._thread.start()
+            self._pid = os.getpid()
+            self._stopped = False
+
+    def stop(self):
+        """Handle everything that's been queued, then stop the thread."""
+        with self._lock:
+            if self._pid != os.getpid() or self._stopped:
+                return
+            self._stopped = True
+        self.queue.put((None, None))
+        self._thread.join()
+
+    def enqueue(self, handler, record):
+        if self._pid != os.getpid():
+            self.start()
+        if self._stopped:
+            # Logging during shutdown; there's no thread left to wait for.
+            self._handle(handler, record)
+        elif self.overflow == 'block':
+            self.queue.put((handler, record))
+        elif self.overflow == 'drop-new':
+            try:
+                self.queue.put_nowait((handler, record))
+            except queue.Full:
+                self._count_dropped()
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait((handler, record))
+                    break
+                except queue.Full:
+                    try:
+                        oldest = self.queue.get_nowait()
+                    except queue.Empty:
+                        continue
+                    if oldest[0] is None:
+                        # stop()'s sentinel; put it back, for the listener to
+                        # stop at, and drop this record instead.
+                        self.queue.put(oldest)
+                        self._count_dropped()
+                        break
+                    self._count_dropped()
+
+    def _count_dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    def _handle(self, handler, record):
+        if record.levelno >= handler.level:
+            handler.handle(record)
+
+    def _monitor(self):
+        while True:
+            handler, record = self.queue.get()
+            if handler is None:
+                break
+            try:
+                self._handle(handler, record)
+            except Exception:
+                handler.handleError(record)
+
+
+# (maxsize, overflow) -> [QueueListener, number of handlers using it]
+_listeners = {}
+_listener_lock = threading.Lock()
+
+
+def get_listener(maxsize=10000, overflow='block'):
+    """
+    Return this process's QueueListener with ``maxsize`` and ``overflow``,
+    creating it if it doesn't exist yet. Each call should be matched by a
+    call of ``release_listener()``, once the listener is no longer used.
+    """
+    with _listener_lock:
+        entry = _listeners.get((maxsize, overflow))
+        if entry is None:
+            entry = _listeners[(maxsize, overflow)] = [QueueListener(maxsize, overflow), 0]
+        entry[1] += 1
+    return entry[0]
+
+
+def release_listener(listener):
+    """
+    Stop ``listener``, from ``get_listener()``, once nothing else which
+    got it is using it.
+    """
+    key = (listener.maxsize, listener.overflow)
+    with _listener_lock:
+        entry = _listeners.get(key)
+        if entry is None or entry[0] is not listener:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _listeners[key]
+    listener.stop()
+
+
+@atexit.register
+def _stop_listeners():
+    with _listener_lock:
+        listeners = [entry[0] for entry in _listeners.values()]
+    for listener in listeners:
+        listener.stop()
+
+
+class QueueHandler(logging.Handler):
+    """
+    Handler which queues records for the process's QueueListener to pass
+    on to ``target``, a Handler or the config of one (see build_handler).
+    """
+    def __init__(self, target, maxsize=10000, overflow='block'):
+        logging.Handler.__init__(self)
+        self.target = build_handler(target) if isinstance(target, Mapping) else target
+        self.listener = get_listener(maxsize, overflow)
+
+    def prepare(self, record):
+        """
+        Return a copy of the record with its arguments merged into its
+        message and any exception rendered, as neither may be the same by
+        the time it's handled. The record itself is left as it is, for the
+        logger's other handlers (e.g. to mail the exception to ADMINS).
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            listener = self.listener
+            if listener is None:
+                # Closed; there's no listener left to queue for.
+                self.target.handle(record)
+            else:
+                listener.enqueue(self.target, self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        # Closed more than once at exit, by logging.shutdown() and dictConfig.
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            release_listener(listener)
+        self.target.close()
+        logging.Handler.close(self)
+
+
+# Record attributes of these types are sent to the collector as they are;
+# anything else (e.g. the request Django logs with) is sent as its repr().
+_plain_types = (str, type(u''), int, float, bool, type(None))
+
+
+def _config_data(config):
+    """
+    Return a handler's config as data (for the collector): with classes and
+    factories as dotted paths, and a Formatter as the config of one.
+    """
+    if isinstance(config, Mapping):
+        return dict((key, _config_data(config[key])) for key in config)
+    if isinstance(config, (list, tuple)):
+        return [_config_data(val) for val in config]
+    if isinstance(config, logging.Formatter):
+        if type(config) is not logging.Formatter:
+            raise TypeError("Give CollectorHandler targets the config of a {}, "
+                            "rather than one.".format(type(config).__name__))
+        return {'format': config._fmt, 'datefmt': config.datefmt}
+    if isinstance(config, type) or callable(config):
+        return config.__module__ + '.' + config.__name__
+    return config
+
+
+class CollectorHandler(logging.Handler):
+    """
+    Handler which sends records in batches over the Unix socket
+    ``socket_path`` to a log collector process, which handles them with
+    ``target``, the config of another handler (see build_handler). The
+    collector is started if it isn't running and ``spawn`` is True.
+
+    Batches are sent when ``batch_size`` records are waiting, every
+    ``flush_interval`` seconds, and when the handler is flushed or closed.
+    If the collector can't be reached, records are written by ``target``
+    in this process instead.
+    """
+    SPAWN_INTERVAL = 5
+
+    def __init__(self, target, socket_path, batch_size=100, flush_interval=1.0,
+                 spawn=True, idle_timeout=60):
+        logging.Handler.__init__(self)
+        self.target = _config_data(target)
+        # Fail now, rather than when logging, if it can't be sent.
+        json.dumps(self.target)
+        self.key = str(self.target.get('filename', id(self)))
+        self.socket_path = socket_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spawn = spawn
+        self.idle_timeout = idle_timeout
+        self.buffer = []
+        self._sock = None
+        self._pid = None
+        self._fallback = None
+        self._spawned = None
+        # Held while sending, so batches are sent in order, without holding
+        # the handler's lock (and so blocking logging) meanwhile.
+        self._send_lock = threading.Lock()
+
+    def _start(self):
+        """(Re)start the flushing thread, in a new process after a fork."""
+        self.buffer = []
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._pid = os.getpid()
+        flusher = threading.Thread(target=self._flush_periodically, name='cinch-log-flusher')
+        flusher.daemon = True
+        flusher.start()
+
+    def _flush_periodically(self):
+        pid = self._pid
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def prepare(self, record):
+        """
+        Return (a copy of) the record as a dict that can be sent to the
+        collector, with its message merged and any exception rendered.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return dict((key, val if isinstance(val, _plain_types) else repr(val))
+                    for (key, val) in record.__dict__.items())
+
+    def emit(self, record):
+        try:
+            self.acquire()
+            try:
+                if self._pid != os.getpid():
+                    self._start()
+                self.buffer.append((self.key, self.prepare(record)))
+                full = len(self.buffer) >= self.batch_size
+            finally:
+                self.release()
+            if full:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except socket.error:
+            sock.close()
+            raise
+        send_message(sock, ['handler', self.key, self.target])
+        return sock
+
+    def _spawn_collector(self):
+        """Start the collector, and return its Popen."""
+        # Make sure the collector can import the same cinch we're using.
+        env = dict(os.environ)
+        cinch_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [cinch_path, env.get('PYTHONPATH')]))
+        with open(os.devnull, 'r+') as devnull:
+            collector = subprocess.Popen(
+                [sys.executable, '-m', 'cinch.logcollector', self.socket_path,
+                 '--idle-timeout', str(self.idle_timeout)],
+                stdin=devnull, stdout=devnull, stderr=devnull, env=env,
+                close_fds=True, preexec_fn=os.setsid)
+        # Reap it once it exits (e.g. when idle), so it isn't left a zombie.
+        reaper = threading.Thread(target=collector.wait, name='cinch-collector-reaper')
+        reaper.daemon = True
+        reaper.start()
+        return collector
+
+    def _send(self, records):
+        """
+        Send records to the collector, connecting first if need be, and
+        return True; or return False if it can't be reached, starting it
+        (at most every SPAWN_INTERVAL seconds) for the next batch.
+        """
+        try:
+            if self._sock is None:
+                self._sock = self._connect()
+            send_message(self._sock, ['records', records])
+            return True
+        except socket.error:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+        except (TypeError, ValueError):
+            # A record which can't be encoded; write the batch here.
+            return False
+        if self.spawn and (self._spawned is None or
+                           time.time() - self._spawned > self.SPAWN_INTERVAL):
+            self._spawned = time.time()
+            self._spawn_collector()
+        return False
+
+    def flush(self):
+        with self._send_lock:
+            self.acquire()
+            try:
+                records, self.buffer = self.buffer, []
+                send = records and self._pid == os.getpid()
+            finally:
+                self.release()
+            if send and not self._send(records):
+                if self._fallback is None:
+                    self._fallback = build_handler(self.target)
+                for (key, record_dict) in records:
+                    self._fallback.handle(logging.makeLogRecord(record_dict))
+
+    def close(self):
+        self.flush()
+        with self._send_lock:
+            self.acquire()
+            try:
+                self._pid = None
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+                if self._fallback is not None:
+                    self._fallback.close()
+            finally:
+                self.release()
+        logging.Handler.close(self)
@@ -0,0 +1,23 @@
+from optparse import make_option
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from cinch.performance import check_production_profile
+
+
+class Command(BaseCommand):
+    help = "Report where the settings differ from cinch's production " \
+        "performance profile (see cinch.performance)."
+    option_list = BaseCommand.option_list + (
+        make_option('--strict', action='store_true', default=False,
+                    help="Exit with an error if the settings differ at all."),
+    )
+
+    def handle(self, *args, **options):
+        problems = check_production_profile(settings)
+        for (name, problem) in problems:
+            self.stdout.write("{}: {}".format(name, problem))
+        if not problems:
+            self.stdout.write("The settings match the production profile.")
+        elif options['strict']:
+            raise CommandError("{} setting(s) differ from the production profile.".format(
+                len(problems)))
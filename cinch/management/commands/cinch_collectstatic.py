@@ -0,0 +1,27 @@
+from optparse import make_option
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from cinch.defaults import STATIC_DEFAULTS
+from cinch.staticfiles import IGNORE_PATTERNS, collect, format_collect_report
+
+
+class Command(BaseCommand):
+    help = "Collect static files into STATIC_ROOT in parallel, skipping " \
+        "files unchanged since the last collection."
+    option_list = BaseCommand.option_list + (
+        make_option('--threads', type='int',
+                    default=getattr(settings, 'CINCH_COLLECTSTATIC_THREADS',
+                                    STATIC_DEFAULTS['CINCH_COLLECTSTATIC_THREADS']),
+                    help="Find and copy files in this many threads [default: %default]."),
+        make_option('--force', action='store_true', default=False,
+                    help="Copy every file, ignoring the manifest of the last collection."),
+        make_option('-n', '--dry-run', action='store_true', dest='dry_run', default=False,
+                    help="Report what would be copied, without copying anything."),
+        make_option('-i', '--ignore', action='append', dest='ignore_patterns', default=[],
+                    metavar='PATTERN', help="Also ignore files matching this glob pattern."),
+    )
+
+    def handle(self, *args, **options):
+        report = collect(options['threads'], dry_run=options['dry_run'], force=options['force'],
+                         ignore_patterns=IGNORE_PATTERNS + options['ignore_patterns'])
+        self.stdout.write(format_collect_report(report))
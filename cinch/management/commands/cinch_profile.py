@@ -0,0 +1,22 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from cinch import profiling
+
+
+class Command(BaseCommand):
+    help = "Report the time spent resolving this process's settings, slowest " \
+        "steps first. Requires the CINCH_PROFILE environment variable to be set."
+    option_list = BaseCommand.option_list + (
+        make_option('--json', dest='json_path', default=None,
+                    help="Also write the report as JSON to this file."),
+        make_option('--limit', dest='limit', type='int', default=None,
+                    help="Only show this many of the slowest steps."),
+    )
+
+    def handle(self, *args, **options):
+        if not profiling.enabled:
+            raise CommandError("Settings weren't profiled; set the {} environment "
+                               "variable and try again.".format(profiling.PROFILE_ENV_VAR))
+        self.stdout.write(profiling.format_report(options['limit']))
+        if options['json_path']:
+            profiling.dump_json(options['json_path'])
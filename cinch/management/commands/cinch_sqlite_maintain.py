@@ -0,0 +1,26 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from cinch.db.sqlite import maintain
+
+
+class Command(BaseCommand):
+    args = '[alias ...]'
+    help = "Checkpoint the write-ahead log of, and optimise, the given (or " \
+        "all) SQLite databases. Suitable for running from cron."
+    option_list = BaseCommand.option_list + (
+        make_option('--checkpoint', default='TRUNCATE',
+                    help="wal_checkpoint mode: PASSIVE, FULL, RESTART or TRUNCATE."),
+    )
+
+    def handle(self, *aliases, **options):
+        for alias in aliases or list(connections):
+            connection = connections[alias]
+            if connection.vendor != 'sqlite':
+                if aliases:
+                    raise CommandError("{} isn't a SQLite database".format(alias))
+                continue
+            # Make sure there's a DB-API connection to work with.
+            connection.cursor().close()
+            maintain(connection.connection, options['checkpoint'])
+            self.stdout.write("Checkpointed and optimised {}".format(alias))
@@ -0,0 +1,26 @@
+from optparse import make_option
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from cinch.templates import format_warm_report, warm_templates
+
+
+class Command(BaseCommand):
+    args = '[template name ...]'
+    help = "Compile the given (or all) templates, and report those which " \
+        "fail to compile and the slowest to."
+    option_list = BaseCommand.option_list + (
+        make_option('--threads', type='int',
+                    default=getattr(settings, 'CINCH_WARM_TEMPLATE_THREADS', 4),
+                    help="Compile templates in this many threads [default: %default]."),
+        make_option('--slowest', type='int', default=10,
+                    help="Show this many of the slowest templates [default: %default]."),
+        make_option('--strict', action='store_true', default=False,
+                    help="Exit with an error if any template fails to compile."),
+    )
+
+    def handle(self, *names, **options):
+        report = warm_templates(list(names) or None, options['threads'])
+        self.stdout.write(format_warm_report(report, options['slowest']))
+        if report['failures'] and options['strict']:
+            raise CommandError("{} template(s) failed to compile.".format(
+                len(report['failures'])))
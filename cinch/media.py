@@ -0,0 +1,153 @@
+"""
+Uploads and media files, without tying up workers.
+
+Uploads up to FILE_UPLOAD_MAX_MEMORY_SIZE are kept in memory, and larger
+ones are streamed to FILE_UPLOAD_TEMP_DIR (TMP_DIR), in chunks of
+CINCH_UPLOAD_CHUNK_SIZE bytes, by the handlers in FILE_UPLOAD_HANDLERS
+(as set by base.py and MediaMixin).
+
+``media_response()`` returns a response for a file under MEDIA_ROOT. With
+CINCH_MEDIA_SENDFILE set, the front-end server sends the file itself:
+
+- 'x-sendfile' (Apache's mod_xsendfile, lighttpd): by its path;
+- 'x-accel-redirect' (nginx): by its path under CINCH_MEDIA_ACCEL_PREFIX,
+  an internal location aliased to MEDIA_ROOT, e.g.::
+
+    location /protected-media/ { internal; alias /srv/project/var/media/; }
+
+Otherwise, the file is streamed by Python, in chunks of
+CINCH_MEDIA_CHUNK_SIZE bytes. ``serve_media`` is a view for it.
+"""
+
+from __future__ import absolute_import
+import mimetypes
+import os
+import posixpath
+from wsgiref.util import FileWrapper
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, urlquote
+from django.views.static import was_modified_since
+from .defaults import MEDIA_DEFAULTS
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Django < 1.5
+    StreamingHttpResponse = HttpResponse
+try:
+    from django.utils.encoding import force_text
+except ImportError:
+    # Django < 1.5
+    from django.utils.encoding import force_unicode as force_text
+
+
+__all__ = ['ChunkedMemoryFileUploadHandler', 'ChunkedTemporaryFileUploadHandler',
+           'media_path', 'content_disposition', 'media_response', 'serve_media']
+
+
+def _setting(name):
+    return getattr(settings, name, MEDIA_DEFAULTS[name])
+
+
+class _ChunkSizeMixin(object):
+    # Django reads uploads in chunks of the smallest of its handlers'.
+    def __init__(self, *args, **kwargs):
+        super(_ChunkSizeMixin, self).__init__(*args, **kwargs)
+        self.chunk_size = _setting('CINCH_UPLOAD_CHUNK_SIZE')
+
+
+class ChunkedMemoryFileUploadHandler(_ChunkSizeMixin, MemoryFileUploadHandler):
+    """Keeps uploads up to FILE_UPLOAD_MAX_MEMORY_SIZE in memory."""
+
+
+class ChunkedTemporaryFileUploadHandler(_ChunkSizeMixin, TemporaryFileUploadHandler):
+    """Streams uploads to FILE_UPLOAD_TEMP_DIR, creating it if need be."""
+    def new_file(self, *args, **kwargs):
+        temp_dir = getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None)
+        if temp_dir and not os.path.isdir(temp_dir):
+            try:
+                os.makedirs(temp_dir)
+            except OSError:
+                # Made by another process, meanwhile.
+                if not os.path.isdir(temp_dir):
+                    raise
+        return super(ChunkedTemporaryFileUploadHandler, self).new_file(*args, **kwargs)
+
+
+def media_path(name):
+    """
+    Return the absolute path of the file ``name`` under MEDIA_ROOT, or
+    raise Http404 if it isn't one (including if it's outside MEDIA_ROOT,
+    e.g. by '..' or a symlink).
+    """
+    if not getattr(settings, 'MEDIA_ROOT', None):
+        # Or every file would be looked for under the working directory.
+        raise ImproperlyConfigured("MEDIA_ROOT must be set to serve media files.")
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    file_path = os.path.realpath(os.path.join(root, posixpath.normpath(name).lstrip('/')))
+    if not file_path.startswith(root + os.sep) or not os.path.isfile(file_path):
+        raise Http404("No media file {!r}".format(name))
+    return file_path
+
+
+def content_disposition(disposition, filename):
+    """
+    Return a Content-Disposition header of ``disposition`` ('inline' or
+    'attachment') for ``filename``, encoded per RFC 5987 (RFC 6266), with
+    an ASCII-only filename for clients which don't understand it.
+    """
+    filename = force_text(filename)
+    fallback = filename.encode('ascii', 'replace').decode('ascii')
+    fallback = fallback.replace('\\', '').replace('"', '')
+    return "{}; filename=\"{}\"; filename*=UTF-8''{}".format(
+        disposition, fallback, urlquote(filename, safe=''))
+
+
+def media_response(name, request=None, as_attachment=False, filename=None, content_type=None):
+    """
+    Return a response of the file ``name`` under MEDIA_ROOT, to be sent by
+    the front-end server if CINCH_MEDIA_SENDFILE is set, or else streamed.
+    With ``request``, it's a 304 if the client's copy is up to date.
+    """
+    file_path = media_path(name)
+    if content_type is None:
+        content_type, encoding = mimetypes.guess_type(file_path)
+    else:
+        encoding = None
+    content_type = content_type or 'application/octet-stream'
+    stat = os.stat(file_path)
+    if request is not None and not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+    sendfile = (_setting('CINCH_MEDIA_SENDFILE') or '').lower()
+    if sendfile == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = file_path
+    elif sendfile == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        relative = os.path.relpath(file_path, os.path.realpath(settings.MEDIA_ROOT))
+        response['X-Accel-Redirect'] = _setting('CINCH_MEDIA_ACCEL_PREFIX').rstrip('/') + \
+            '/' + urlquote(relative.replace(os.sep, '/'))
+    else:
+        chunk_size = _setting('CINCH_MEDIA_CHUNK_SIZE')
+        response = StreamingHttpResponse(FileWrapper(open(file_path, 'rb'), chunk_size),
+                                         content_type=content_type)
+        response['Content-Length'] = str(stat.st_size)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if as_attachment or filename:
+        response['Content-Disposition'] = content_disposition(
+            'attachment' if as_attachment else 'inline',
+            filename or os.path.basename(file_path))
+    return response
+
+
+def serve_media(request, path):
+    """
+    View of the media file ``path``, e.g. for a URL pattern like
+    ``url(r'^media/(?P<path>.*)$', 'cinch.media.serve_media')``.
+    """
+    return media_response(path, request)
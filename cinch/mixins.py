@@ -1,33 +1,104 @@
 
+from itertools import chain
 from os import path
+from .defaults import MEDIA_DEFAULTS, STATIC_DEFAULTS
+from .lazy import _state, get_lazy, invalidate_lazy, record_read
+from .profiling import profile_setup_methods, profiled
 
 
-class SetDefaultMixin(object):
+def is_setting_name(name):
+    """Settings are public, upper-case attributes."""
+    return name.isupper() and not name.startswith('_')
+
+
+class SettingsMeta(type):
     """
-    Adds ``setdefault()`` and ``explicit()`` methods to the class TODOLipsum.
+    Metaclass which records the names of the settings declared by each
+    class, when the class is defined, in ``_declared_settings``, and the
+    names of all settings declared along its MRO in ``_setting_names``
+    (and, for quick membership tests, ``_setting_names_set``).
     """
-    # Names of attributes which have only been set with SetDefaultMixin.setdefault()
-    _setdefault_defaults = set()
+    def __init__(cls, name, bases, namespace):
+        super(SettingsMeta, cls).__init__(name, bases, namespace)
+        cls._declared_settings = tuple(att for att in namespace if is_setting_name(att))
+        names = []
+        for klass in reversed(cls.__mro__):
+            declared = klass.__dict__.get('_declared_settings')
+            if declared is None:
+                # Mixins which aren't settings classes themselves
+                declared = [att for att in vars(klass) if is_setting_name(att)]
+            names.extend(att for att in declared if att not in names)
+        cls._setting_names = tuple(names)
+        cls._setting_names_set = frozenset(names)
+        profile_setup_methods(cls)
+
+    def __setattr__(cls, name, value):
+        """Register settings set on the class after it's been defined."""
+        super(SettingsMeta, cls).__setattr__(name, value)
+        if is_setting_name(name) and name not in cls._setting_names_set:
+            type.__setattr__(cls, '_declared_settings', cls._declared_settings + (name,))
+            subclasses = [cls]
+            while subclasses:
+                klass = subclasses.pop()
+                if name not in klass._setting_names_set:
+                    type.__setattr__(klass, '_setting_names', klass._setting_names + (name,))
+                    type.__setattr__(klass, '_setting_names_set',
+                                     klass._setting_names_set | frozenset([name]))
+                subclasses.extend(klass.__subclasses__())
+
+
+# Works as a base class with a metaclass in both Python 2 and 3.
+_SettingsBase = SettingsMeta('_SettingsBase', (object,), {})
 
-    def __setattribute__(self, name, value):
+
+class SetDefaultMixin(_SettingsBase):
+    """
+    Adds ``setdefault()`` and ``explicit()`` methods to the class TODOLipsum.
+    """
+    def __setattr__(self, name, value):
         """
         Set an attribute on the class, removing its name from the set of attributes
-        which have been attached to the class using CinchSettings.setdefault().
+        which have been attached to the class using CinchSettings.setdefault(), and
+        forgetting any lazy settings which were computed from its old value.
         """
         # If this attribute was previously set with setdefault(), we can safely
-        # discard it from the set of _defaults. If it hasn't, and the attribute
-        # is being set by self.setdefault() itself, setdefault() will add its name
-        # to self._setdefault_defaults right after this function.
-        self._defaults.discard(name)
-        super(SetDefaultMixin, self).__setattribute__(name, value)
+        # discard it from the instance's set of _defaults. If it hasn't, and the
+        # attribute is being set by self.setdefault() itself, setdefault() will
+        # add its name to self._setdefault_defaults right after this function.
+        _state(self, '_setdefault_defaults', set).discard(name)
+        super(SetDefaultMixin, self).__setattr__(name, value)
+        self.__dict__.get('_lazy_funcs', {}).pop(name, None)
+        invalidate_lazy(self, name)
+
+    def __getattribute__(self, name):
+        """
+        Record settings read while a lazy setting is being computed as its
+        dependencies, including plain ones, so setting them forgets it.
+        """
+        if is_setting_name(name):
+            # Even if it's missing, as it may be set later.
+            record_read(self, name)
+        return object.__getattribute__(self, name)
+
+    def __getattr__(self, name):
+        """
+        Compute lazy defaults, set with ``setdefault_lazy()``, on first access.
+        """
+        lazy_funcs = self.__dict__.get('_lazy_funcs', {})
+        if name not in lazy_funcs:
+            raise AttributeError("{!r} object has no attribute {!r}".format(
+                self.__class__.__name__, name))
+        return get_lazy(self, name, lazy_funcs[name])
 
     def explicit(self, name):
         """
         Return True if the attribute ``name`` has been explicitely set on this
         class, i.e. not with setdefault(). Otherwise, return False.
         """
-        return True if hasattr(self, name) and name not in self._setdefault_defaults else False
+        return True if name not in _state(self, '_setdefault_defaults', set) \
+            and hasattr(self, name) else False
 
+    @profiled('SetDefaultMixin.setdefault')
     def setdefault(self, key, *default):
         """
         If ``key`` is an attribute of this instance, return its value. If not,
@@ -43,10 +114,33 @@ class SetDefaultMixin(object):
         except AttributeError:
             if default:
                 setattr(self, key, default[0])
-                self._setdefault_defaults.add(key)
+                _state(self, '_setdefault_defaults', set).add(key)
                 return default[0]
             raise
 
+    def setting_names(self):
+        """
+        Return the names of all settings on this instance: those declared
+        on its class and bases, followed by any set on the instance itself.
+        """
+        names = list(self._setting_names)
+        names.extend(att for att in chain(self.__dict__, self.__dict__.get('_lazy_funcs', ()))
+                     if is_setting_name(att) and att not in self._setting_names_set)
+        return names
+
+    @profiled('SetDefaultMixin.setdefault_lazy')
+    def setdefault_lazy(self, key, func):
+        """
+        Like ``setdefault()``, but if ``key`` isn't already an attribute of
+        this instance, ``func(self)`` is only called to compute its value
+        the first time the attribute is read.
+        """
+        lazy_funcs = _state(self, '_lazy_funcs', dict)
+        if key in self.__dict__ or key in lazy_funcs or hasattr(type(self), key):
+            return
+        lazy_funcs[key] = func
+        _state(self, '_setdefault_defaults', set).add(key)
+
 
 class FHSDirsMixin(SetDefaultMixin):
     _fhsdirs_altered = set()
@@ -76,25 +170,26 @@ class FHSDirsMixin(SetDefaultMixin):
         kwargs['force'] = kwargs.get('force', False)
 
         #@staticmethod
-        def set_default(name, val):
+        def set_default(name, func):
             # Only setdefault() on self if the directory hasn't been
-            # explicitly set, or setup(force=True).
+            # explicitly set, or setup(force=True). Directories are
+            # computed lazily, the first time they're read.
             if name not in self._fhsdirs_altered or kwargs['force']:
-                self.setdefault(name, val)
-
-        set_default('ETC_DIR', path.join(self.PROJECT_PATH, 'etc'))               # etc/
-        set_default('ETC_LOCAL_DIR', path.join(self.ETC_DIR, 'local'))         # etc/local/
-        set_default('LIB_DIR', path.join(self.PROJECT_PATH, 'lib'))               # lib/
-        set_default('SRC_DIR', path.join(self.PROJECT_PATH, 'src'))               # src/
-        set_default('TEMPLATE_DIRS', [path.join(self.SRC_DIR, 'templates')])  # src/templates/
-        set_default('USR_DIR', path.join(self.PROJECT_PATH, 'src'))               # src/
-        set_default('VAR_DIR', path.join(self.PROJECT_PATH, 'var'))               # var/
-        #set_default('ENV_DIR', path.join(self.VAR_DIR, 'var', 'env'))        # var/env
-        set_default('DB_DIR', path.join(self.VAR_DIR, 'db'))                  # var/db/
-        set_default('FIXTURES_DIRS', [path.join(self.VAR_DIR, 'fixtures')])   # var/fixtures/
-        set_default('LOG_DIR', path.join(self.VAR_DIR, 'log'))                # var/log/
-        set_default('MEDIA_ROOT', path.join(self.VAR_DIR, 'media'))           # var/media/
-        set_default('STATIC_ROOT', path.join(self.VAR_DIR, 'static'))         # var/static/
+                self.setdefault_lazy(name, func)
+
+        set_default('ETC_DIR', lambda s: path.join(s.PROJECT_PATH, 'etc'))            # etc/
+        set_default('ETC_LOCAL_DIR', lambda s: path.join(s.ETC_DIR, 'local'))      # etc/local/
+        set_default('LIB_DIR', lambda s: path.join(s.PROJECT_PATH, 'lib'))            # lib/
+        set_default('SRC_DIR', lambda s: path.join(s.PROJECT_PATH, 'src'))            # src/
+        set_default('TEMPLATE_DIRS', lambda s: [path.join(s.SRC_DIR, 'templates')])  # src/templates/
+        set_default('USR_DIR', lambda s: path.join(s.PROJECT_PATH, 'src'))            # src/
+        set_default('VAR_DIR', lambda s: path.join(s.PROJECT_PATH, 'var'))            # var/
+        #set_default('ENV_DIR', lambda s: path.join(s.VAR_DIR, 'var', 'env'))     # var/env
+        set_default('DB_DIR', lambda s: path.join(s.VAR_DIR, 'db'))               # var/db/
+        set_default('FIXTURES_DIRS', lambda s: [path.join(s.VAR_DIR, 'fixtures')])  # var/fixtures/
+        set_default('LOG_DIR', lambda s: path.join(s.VAR_DIR, 'log'))             # var/log/
+        set_default('MEDIA_ROOT', lambda s: path.join(s.VAR_DIR, 'media'))        # var/media/
+        set_default('STATIC_ROOT', lambda s: path.join(s.VAR_DIR, 'static'))      # var/static/
 
         self._fhsdirs_altered = set()
         sup = super(FHSDirsMixin, self)
@@ -102,6 +197,62 @@ class FHSDirsMixin(SetDefaultMixin):
             sup.setup(*args, **kwargs)
 
 
+class StaticFilesMixin(SetDefaultMixin):
+    """
+    Collect static files with content-hashed names and precompressed
+    copies (see cinch.staticfiles), with the compression settings of this
+    class, if it sets them.
+    """
+    def setup(self, *args, **kwargs):
+        self.setdefault('STATICFILES_STORAGE', 'cinch.staticfiles.HashedStorage')
+        for (name, value) in STATIC_DEFAULTS.items():
+            self.setdefault(name, value)
+        sup = super(StaticFilesMixin, self)
+        if hasattr(sup, 'setup'):
+            sup.setup(*args, **kwargs)
+
+
+class MediaMixin(SetDefaultMixin):
+    """
+    Stream large uploads to FILE_UPLOAD_TEMP_DIR (TMP_DIR, or var/tmp/),
+    and serve media files with cinch.media.media_response() through the
+    front-end server, if CINCH_MEDIA_SENDFILE is set (see cinch.media).
+    """
+    def setup(self, *args, **kwargs):
+        self.setdefault_lazy('FILE_UPLOAD_TEMP_DIR', lambda s: getattr(s, 'TMP_DIR', None) or
+                             path.join(s.VAR_DIR, 'tmp'))
+        for (name, value) in MEDIA_DEFAULTS.items():
+            self.setdefault(name, value)
+        sup = super(MediaMixin, self)
+        if hasattr(sup, 'setup'):
+            sup.setup(*args, **kwargs)
+
+
+class TieredCacheMixin(SetDefaultMixin):
+    """
+    Make the default cache a per-process LocMem cache in front of a
+    file-based one in CACHE_DIR (var/cache/), shared by all processes (see
+    CachesSetting.add_tiered()), unless the class sets CACHES itself.
+    """
+    def setup(self, *args, **kwargs):
+        self.setdefault('CINCH_CACHE_L1_MAX_ENTRIES', 1000)
+        self.setdefault('CINCH_CACHE_L1_TIMEOUT', 30)
+        self.setdefault_lazy('CACHE_DIR', lambda s: path.join(s.VAR_DIR, 'cache'))
+        self.setdefault_lazy('CACHES', _tiered_caches)
+        sup = super(TieredCacheMixin, self)
+        if hasattr(sup, 'setup'):
+            sup.setup(*args, **kwargs)
+
+
+def _tiered_caches(cnf):
+    from .caches import CachesSetting
+    caches = CachesSetting()
+    caches.add_tiered('default', 'file', cnf.CACHE_DIR,
+                      l1_max_entries=cnf.CINCH_CACHE_L1_MAX_ENTRIES,
+                      l1_timeout=cnf.CINCH_CACHE_L1_TIMEOUT)
+    return caches
+
+
 #def fhs_dirs(project_path):
 #    class FHSDirs(FHSDirsMixin):
 #        PROJECT_PATH = project_path
@@ -0,0 +1,213 @@
+"""
+Per-host settings overlays, so one process (and one pool of workers) can
+serve many sites. HOST_OVERLAYS maps ALLOWED_HOSTS-style patterns (e.g.
+'example.com' or '.example.org') to the settings which differ for them::
+
+    HOST_OVERLAYS = {
+        'example.com': {'ROOT_URLCONF': 'example.urls', 'SITE_ID': 2},
+        '.example.org': {
+            'TEMPLATE_DIRS': ['/srv/example.org/templates'],
+            'CACHES': {'default': {'KEY_PREFIX': 'example.org'}},
+        },
+    }
+
+Each pattern's settings are resolved once, into a read-only HostSettings
+view of the overlay over the base settings (with dicts merged, as with
+CACHES above), shared by every host the pattern matches, and kept in an
+LRU cache of CINCH_HOST_OVERLAY_CACHE_SIZE patterns, so requests for a
+pattern's hosts seen recently look its view up in a dict.
+
+HostOverlayMiddleware selects the view for each request, which it sets
+as ``request.host_settings`` and returns from ``host_settings()``
+while the request is handled, and uses its ROOT_URLCONF. The template
+loader cinch.template_loaders.HostTemplateLoader looks for templates in
+its TEMPLATE_DIRS (and caches them in the view), and ``host_cache()``
+returns the default (or another) cache with its CACHES settings.
+"""
+
+from __future__ import absolute_import
+import threading
+from collections import OrderedDict
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+from .hosts import HostMatcher, split_domain
+from .layered import LayeredDict
+
+
+__all__ = ['HostSettings', 'HostOverlays', 'host_settings', 'host_cache',
+           'HostOverlayMiddleware', 'HostOverlaysMixin']
+
+
+MIDDLEWARE = 'cinch.overlays.HostOverlayMiddleware'
+TEMPLATE_LOADER = 'cinch.template_loaders.HostTemplateLoader'
+
+_local = threading.local()
+
+
+class HostSettings(object):
+    """
+    A read-only view of the settings ``overlay`` on top of ``base`` (e.g.
+    django.conf.settings), for the hosts matching ``pattern``.
+    """
+    def __init__(self, base, overlay=None, pattern=None):
+        resolved = {}
+        for (name, value) in (overlay or {}).items():
+            base_value = getattr(base, name, None)
+            if isinstance(value, Mapping) and isinstance(base_value, Mapping):
+                value = LayeredDict(base_value, value).resolve()
+            resolved[name] = value
+        set_attr = super(HostSettings, self).__setattr__
+        set_attr('_base', base)
+        set_attr('overlay', resolved)
+        set_attr('pattern', pattern)
+        # Per-pattern state, which lives as long as the view: compiled
+        # templates and caches.
+        set_attr('templates', {})
+        set_attr('caches', {})
+
+    def __getattr__(self, name):
+        try:
+            return self.overlay[name]
+        except KeyError:
+            return getattr(self._base, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HostSettings are read-only")
+
+    def __repr__(self):
+        return '<HostSettings {}>'.format(self.pattern or '(base)')
+
+
+class HostOverlays(object):
+    """
+    Selects the HostSettings of HOST_OVERLAYS-style ``overlays`` over
+    ``base`` by host, keeping those of the ``max_size`` most recently used
+    patterns.
+    """
+    def __init__(self, overlays, base, max_size=256):
+        self.overlays = dict((pattern.lower(), overlay) for (pattern, overlay) in overlays.items())
+        self.base = base
+        self.max_size = max_size
+        self.matcher = HostMatcher(self.overlays)
+        self.base_view = HostSettings(base)
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        """Return the HostSettings for the Host header ``host``."""
+        domain = split_domain(host)
+        pattern = self.matcher.match(domain) if domain else None
+        if pattern is None:
+            return self.base_view
+        with self._lock:
+            view = self._views.pop(pattern, None)
+            if view is not None:
+                # Most recently used last.
+                self._views[pattern] = view
+                return view
+        view = HostSettings(self.base, self.overlays[pattern], pattern)
+        with self._lock:
+            view = self._views.setdefault(pattern, view)
+            while len(self._views) > self.max_size:
+                self._views.popitem(last=False)
+        return view
+
+
+def host_settings():
+    """
+    Return the HostSettings of the request being handled in this thread,
+    or django.conf.settings, outside of a request (or HostOverlayMiddleware).
+    """
+    view = getattr(_local, 'settings', None)
+    if view is None:
+        from django.conf import settings
+        return settings
+    return view
+
+
+def host_cache(alias='default'):
+    """
+    Return the cache ``alias``, with the settings of the current host
+    (e.g. its own KEY_PREFIX), if its overlay changes them.
+    """
+    view = host_settings()
+    overlay = getattr(view, 'overlay', {})
+    if alias not in overlay.get('CACHES', {}):
+        try:
+            from django.core.cache import caches
+        except ImportError:
+            # Django < 1.7
+            from django.core.cache import get_cache
+            return get_cache(alias)
+        return caches[alias]
+    cache = view.caches.get(alias)
+    if cache is None:
+        params = dict(overlay['CACHES'][alias])
+        try:
+            from django.core.cache import get_cache
+        except ImportError:
+            # Django >= 1.9
+            from django.core.cache import _create_cache
+            cache = _create_cache(params.pop('BACKEND'), **params)
+        else:
+            cache = get_cache(params.pop('BACKEND'), **params)
+        cache = view.caches.setdefault(alias, cache)
+    return cache
+
+
+class HostOverlayMiddleware(object):
+    """
+    Select the HostSettings of each request's host, from HOST_OVERLAYS.
+    It should come before any middleware which uses the request's urlconf.
+    """
+    def __init__(self):
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+        if not getattr(settings, 'HOST_OVERLAYS', None):
+            raise MiddlewareNotUsed
+        self.overlays = HostOverlays(settings.HOST_OVERLAYS, settings,
+                                     getattr(settings, 'CINCH_HOST_OVERLAY_CACHE_SIZE', 256))
+
+    def process_request(self, request):
+        view = self.overlays.get(request.get_host())
+        _local.settings = request.host_settings = view
+        if 'ROOT_URLCONF' in view.overlay:
+            request.urlconf = view.ROOT_URLCONF
+
+    def process_response(self, request, response):
+        _local.settings = None
+        return response
+
+
+def add_host_overlays(middleware, loaders):
+    """
+    Return ``middleware`` and ``loaders`` (MIDDLEWARE_CLASSES and
+    TEMPLATE_LOADERS) with HostOverlayMiddleware and HostTemplateLoader.
+    """
+    middleware = list(middleware)
+    if MIDDLEWARE not in middleware:
+        # After the middleware which must come first (see cinch.hosts).
+        position = max([middleware.index(name) + 1 for name in (
+            'cinch.reload.SettingsReloadMiddleware', 'cinch.hosts.HostValidationMiddleware')
+            if name in middleware] or [0])
+        middleware.insert(position, MIDDLEWARE)
+    loaders = list(loaders)
+    if TEMPLATE_LOADER not in loaders:
+        loaders.insert(0, TEMPLATE_LOADER)
+    return middleware, loaders
+
+
+class HostOverlaysMixin(object):
+    """
+    Mixin to serve the HOST_OVERLAYS of a CinchSettings class, adding
+    HostOverlayMiddleware and HostTemplateLoader if it has any.
+    """
+    def setup(cnf, *args, **kwargs):
+        super(HostOverlaysMixin, cnf).setup(*args, **kwargs)
+        cnf.setdefault('CINCH_HOST_OVERLAY_CACHE_SIZE', 256)
+        if cnf.setdefault('HOST_OVERLAYS', {}):
+            cnf.MIDDLEWARE_CLASSES, cnf.TEMPLATE_LOADERS = add_host_overlays(
+                cnf.setdefault('MIDDLEWARE_CLASSES', ()),
+                cnf.setdefault('TEMPLATE_LOADERS', ()))
@@ -0,0 +1,196 @@
+"""
+A production performance profile: the settings which make the most
+difference to a production site's speed, applied together.
+
+- Templates are compiled once per process (the cached template loader).
+- Sessions are read from the cache, falling back to the database, if the
+  cache is shared between processes (so a logout is seen by all of them).
+- Database connections persist between requests (unless pooled).
+- Responses are compressed, and conditional GETs answered with a 304.
+- Development-only apps and middleware are removed.
+
+``apply_production_profile()`` applies it to the globals of a settings
+file (as cinch.settings.prod does), and ProductionPerformanceMixin to a
+settings class. ``check_production_profile()`` (and the
+cinch_check_performance command) reports where the settings differ from
+the profile, e.g. where a project has overridden it.
+"""
+
+__all__ = ['apply_production_profile', 'check_production_profile', 'shared_session_cache',
+           'ProductionPerformanceMixin']
+
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+HOST_TEMPLATE_LOADER = 'cinch.template_loaders.HostTemplateLoader'
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+CACHED_SESSION_ENGINES = (SESSION_ENGINE, 'django.contrib.sessions.backends.cache')
+# Parts of the names of cache backends shared by every process, which
+# sessions can be cached in.
+SHARED_CACHE_BACKENDS = ('memcached', 'redis', 'django.core.cache.backends.db.')
+CONN_MAX_AGE = 600
+
+GZIP_MIDDLEWARE = 'django.middleware.gzip.GZipMiddleware'
+CONDITIONAL_GET_MIDDLEWARE = 'django.middleware.http.ConditionalGetMiddleware'
+# Middleware which must process requests before (and so responses after)
+# GZip and ConditionalGet: response caching, so pages are cached compressed.
+OUTER_MIDDLEWARE = (
+    'cinch.reload.SettingsReloadMiddleware',
+    'cinch.hosts.HostValidationMiddleware',
+    'django.middleware.cache.UpdateCacheMiddleware',
+)
+
+DEV_APPS = (
+    'debug_toolbar',
+    'django.contrib.admindocs',
+    'django_extensions',
+)
+DEV_MIDDLEWARE = (
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'django.contrib.admindocs.middleware.XViewMiddleware',
+)
+
+DEFAULT_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def _is_cached(loaders):
+    return any(loader == CACHED_LOADER or
+               isinstance(loader, (list, tuple)) and loader and loader[0] == CACHED_LOADER
+               for loader in loaders)
+
+
+def cached_template_loaders(loaders):
+    """
+    Return ``loaders`` wrapped in the cached loader, if they aren't already,
+    except for the per-host loader (see cinch.overlays), which caches its own.
+    """
+    loaders = list(loaders)
+    if _is_cached(loaders):
+        return loaders
+    outside = [loader for loader in loaders if loader == HOST_TEMPLATE_LOADER]
+    return outside + [(CACHED_LOADER, [loader for loader in loaders if loader not in outside])]
+
+
+def production_middleware(middleware):
+    """
+    Return ``middleware`` without development middleware, and with GZip
+    then ConditionalGet as early as they can be: after OUTER_MIDDLEWARE,
+    so they see (and compress) the response of everything else.
+    """
+    middleware = [name for name in middleware if name not in DEV_MIDDLEWARE and
+                  name not in (GZIP_MIDDLEWARE, CONDITIONAL_GET_MIDDLEWARE)]
+    position = max([middleware.index(name) + 1 for name in OUTER_MIDDLEWARE
+                    if name in middleware] or [0])
+    middleware[position:position] = [GZIP_MIDDLEWARE, CONDITIONAL_GET_MIDDLEWARE]
+    return middleware
+
+
+def production_apps(apps):
+    """Return ``apps`` without development apps."""
+    return [app for app in apps if app not in DEV_APPS]
+
+
+def persist_connections(databases, conn_max_age=CONN_MAX_AGE):
+    """
+    Set CONN_MAX_AGE to ``conn_max_age`` in ``databases`` which close
+    connections after each request, unless they're pooled instead.
+    """
+    for settings in databases.values():
+        if 'POOL' not in settings and not settings.get('CONN_MAX_AGE'):
+            settings['CONN_MAX_AGE'] = conn_max_age
+    return databases
+
+
+def _get(settings, name, default=None):
+    if hasattr(settings, 'items'):
+        return settings.get(name, default)
+    return getattr(settings, name, default)
+
+
+def shared_session_cache(settings):
+    """
+    Return True if the cache which ``settings`` would cache sessions in
+    (SESSION_CACHE_ALIAS) is shared by every process, e.g. memcached, not
+    Django's default, per-process LocMemCache.
+    """
+    alias = _get(settings, 'SESSION_CACHE_ALIAS', 'default')
+    backend = ((_get(settings, 'CACHES') or {}).get(alias) or {}).get('BACKEND', '')
+    return any(name in backend.lower() for name in SHARED_CACHE_BACKENDS)
+
+
+def apply_production_profile(settings):
+    """Apply the production profile to the dict ``settings``, e.g. globals()."""
+    settings['TEMPLATE_LOADERS'] = cached_template_loaders(
+        settings.get('TEMPLATE_LOADERS', DEFAULT_LOADERS))
+    if shared_session_cache(settings):
+        settings.setdefault('SESSION_ENGINE', SESSION_ENGINE)
+    if 'DATABASES' in settings:
+        persist_connections(settings['DATABASES'])
+    settings['MIDDLEWARE_CLASSES'] = production_middleware(
+        settings.get('MIDDLEWARE_CLASSES', ()))
+    settings['INSTALLED_APPS'] = production_apps(settings.get('INSTALLED_APPS', ()))
+
+
+def check_production_profile(settings):
+    """
+    Return a list of (setting name, problem) where ``settings`` (a dict,
+    or e.g. django.conf.settings) differ from the production profile.
+    """
+    problems = []
+    if _get(settings, 'DEBUG'):
+        problems.append(('DEBUG', "is True"))
+    if _get(settings, 'TEMPLATE_DEBUG'):
+        problems.append(('TEMPLATE_DEBUG', "is True"))
+    if not _is_cached(_get(settings, 'TEMPLATE_LOADERS', DEFAULT_LOADERS)):
+        problems.append(('TEMPLATE_LOADERS', "templates aren't cached (use {})".format(
+            CACHED_LOADER)))
+    session_engine = _get(settings, 'SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+    if not shared_session_cache(settings):
+        if session_engine in CACHED_SESSION_ENGINES:
+            problems.append(('SESSION_ENGINE', "sessions are cached per process ({}), so "
+                             "other processes don't see logouts".format(session_engine)))
+        else:
+            problems.append(('SESSION_ENGINE', "sessions aren't cached: use {} with a "
+                             "shared cache (e.g. memcached)".format(SESSION_ENGINE)))
+    elif session_engine not in CACHED_SESSION_ENGINES:
+        problems.append(('SESSION_ENGINE', "sessions aren't cached ({}, not {})".format(
+            session_engine, SESSION_ENGINE)))
+    for (alias, database) in sorted((_get(settings, 'DATABASES') or {}).items()):
+        if 'POOL' not in database and not database.get('CONN_MAX_AGE'):
+            problems.append(('DATABASES', "{} connects for every request "
+                             "(CONN_MAX_AGE is 0)".format(alias)))
+    middleware = list(_get(settings, 'MIDDLEWARE_CLASSES', ()))
+    if middleware != production_middleware(middleware):
+        for name in (GZIP_MIDDLEWARE, CONDITIONAL_GET_MIDDLEWARE):
+            if name not in middleware:
+                problems.append(('MIDDLEWARE_CLASSES', "{} is missing".format(name)))
+        for name in DEV_MIDDLEWARE:
+            if name in middleware:
+                problems.append(('MIDDLEWARE_CLASSES', "{} is for development".format(name)))
+        if not any(problem[0] == 'MIDDLEWARE_CLASSES' for problem in problems):
+            problems.append(('MIDDLEWARE_CLASSES', "{} and {} should come first, after "
+                             "any of {}".format(GZIP_MIDDLEWARE, CONDITIONAL_GET_MIDDLEWARE,
+                                                ', '.join(OUTER_MIDDLEWARE))))
+    for app in _get(settings, 'INSTALLED_APPS', ()):
+        if app in DEV_APPS:
+            problems.append(('INSTALLED_APPS', "{} is for development".format(app)))
+    return problems
+
+
+class ProductionPerformanceMixin(object):
+    """
+    Mixin to apply the production profile to a CinchSettings class, after
+    the settings of the other classes in its bases.
+    """
+    def setup(cnf, *args, **kwargs):
+        super(ProductionPerformanceMixin, cnf).setup(*args, **kwargs)
+        cnf.TEMPLATE_LOADERS = cached_template_loaders(
+            cnf.setdefault('TEMPLATE_LOADERS', DEFAULT_LOADERS))
+        if shared_session_cache(cnf):
+            cnf.setdefault('SESSION_ENGINE', SESSION_ENGINE)
+        if hasattr(cnf, 'DATABASES'):
+            persist_connections(cnf.DATABASES)
+        cnf.MIDDLEWARE_CLASSES = production_middleware(cnf.setdefault('MIDDLEWARE_CLASSES', ()))
+        cnf.INSTALLED_APPS = production_apps(cnf.setdefault('INSTALLED_APPS', ()))
@@ -0,0 +1,208 @@
+"""
+Preloading for prefork servers (gunicorn, uWSGI, ...): do everything
+every worker would otherwise do for itself, once, in the master process,
+so that workers share the memory it takes rather than each having a copy.
+
+``preload()`` resolves the settings, imports and readies the installed
+apps, loads middleware and template loaders (and compiles every template,
+if CINCH_WARM_TEMPLATES is True; see cinch.templates), and then moves every object
+there is into the garbage collector's permanent generation with
+``gc.freeze()`` (Python 3.7+), so collections in the workers don't write
+to (and so copy) the pages they're on. Use it as the WSGI application
+of a server which loads its application before forking, e.g.::
+
+    # wsgi.py, with gunicorn --preload
+    from cinch.preload import preload
+    application = preload()
+
+    # gunicorn.conf.py
+    from cinch.preload import when_ready, post_fork
+
+The memory shared by, and private to, each process can be reported with::
+
+    python -m cinch.preload report [--master PID | PID ...] [--save FILE] [--compare FILE]
+"""
+
+from __future__ import absolute_import
+import gc
+import json
+import logging
+import os
+import sys
+from optparse import OptionParser
+
+
+__all__ = ['preload', 'memory_usage', 'worker_pids', 'format_memory_report',
+           'when_ready', 'post_fork']
+
+
+logger = logging.getLogger(__name__)
+
+
+def _ready_apps(settings):
+    import django
+    if hasattr(django, 'setup'):
+        django.setup()
+        return
+    # Django < 1.7: import each app and its models.
+    from importlib import import_module
+    from django.db.models.loading import get_models
+    for app in settings.INSTALLED_APPS:
+        import_module(app)
+    get_models()
+
+
+def _warm_template_loaders():
+    try:
+        from django.template import engines
+    except ImportError:
+        # Django < 1.8: loaders are instantiated on the first lookup.
+        from django.template import TemplateDoesNotExist
+        from django.template.loader import find_template
+        try:
+            find_template('cinch/preload/does-not-exist.html')
+        except TemplateDoesNotExist:
+            pass
+    else:
+        for engine in engines.all():
+            getattr(engine, 'engine', engine).template_loaders
+
+
+def preload(settings_module=None, freeze=True):
+    """
+    Prepare this process to be forked into workers, and return the WSGI
+    application for them to use. ``settings_module`` is used if the
+    DJANGO_SETTINGS_MODULE environment variable isn't set.
+    """
+    if settings_module is not None:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    # Resolve the settings, then get everything they point to imported.
+    settings.INSTALLED_APPS
+    _ready_apps(settings)
+    application = get_wsgi_application()
+    if getattr(application, '_request_middleware', None) is None:
+        application.load_middleware()
+    _warm_template_loaders()
+    if getattr(settings, 'CINCH_WARM_TEMPLATES', False):
+        from .templates import format_warm_report, warm_templates
+        report = warm_templates(threads=getattr(settings, 'CINCH_WARM_TEMPLATE_THREADS', 4))
+        log = logger.warning if report['failures'] else logger.info
+        log("Warmed templates: %s", format_warm_report(report, slowest=5))
+    gc.collect()
+    if freeze and hasattr(gc, 'freeze'):
+        gc.freeze()
+    logger.info("Preloaded %s: %s", settings.SETTINGS_MODULE,
+                format_memory_report({os.getpid(): memory_usage()}))
+    return application
+
+
+def memory_usage(pid='self'):
+    """
+    Return a dict of the memory used by process ``pid`` in kB: its 'rss',
+    'pss' (its proportional share of memory), and the 'shared' and
+    'private' parts of its RSS, read from /proc/``pid``/smaps.
+    """
+    usage = dict.fromkeys(('rss', 'pss', 'shared', 'private'), 0)
+    fields = {
+        'Rss:': 'rss', 'Pss:': 'pss',
+        'Shared_Clean:': 'shared', 'Shared_Dirty:': 'shared',
+        'Private_Clean:': 'private', 'Private_Dirty:': 'private',
+    }
+    smaps = '/proc/{}/smaps_rollup'.format(pid)
+    if not os.path.exists(smaps):
+        smaps = '/proc/{}/smaps'.format(pid)
+    with open(smaps) as smaps_f:
+        for line in smaps_f:
+            parts = line.split()
+            if parts and parts[0] in fields:
+                usage[fields[parts[0]]] += int(parts[1])
+    return usage
+
+
+def worker_pids(master_pid):
+    """Return the pids of the children of ``master_pid``."""
+    children = []
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open('/proc/{}/stat'.format(pid)) as stat_f:
+                # The command (field 2) may contain spaces, so split after it.
+                ppid = int(stat_f.read().rsplit(')', 1)[1].split()[1])
+        except (IOError, OSError, IndexError, ValueError):
+            continue
+        if ppid == int(master_pid):
+            children.append(int(pid))
+    return sorted(children)
+
+
+def format_memory_report(usages, previous=None):
+    """
+    Format ``usages``, a dict of pids to memory_usage() dicts, as a table,
+    with the changes since ``previous`` (a dict of the same) if given.
+    """
+    columns = ('rss', 'pss', 'shared', 'private')
+    lines = ['{:>8} '.format('pid') + ' '.join('{:>16}'.format(col + ' kB') for col in columns)]
+    totals = dict.fromkeys(columns, 0)
+    for pid in sorted(usages):
+        usage = usages[pid]
+        before = (previous or {}).get(pid)
+        cells = []
+        for col in columns:
+            totals[col] += usage[col]
+            cell = str(usage[col])
+            if before is not None:
+                cell += ' ({:+d})'.format(usage[col] - before[col])
+            cells.append('{:>16}'.format(cell))
+        lines.append('{:>8} '.format(pid) + ' '.join(cells))
+    lines.append('{:>8} '.format('total') + ' '.join('{:>16}'.format(totals[col]) for col in columns))
+    return '\n'.join(lines)
+
+
+def when_ready(server):
+    """gunicorn hook: report the master's memory once it's preloaded."""
+    server.log.info("Master memory:\n%s", format_memory_report({os.getpid(): memory_usage()}))
+
+
+def post_fork(server, worker):
+    """gunicorn hook: report each worker's memory as it starts."""
+    server.log.info("Worker memory after fork:\n%s",
+                    format_memory_report({os.getpid(): memory_usage()}))
+
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog report [options] [PID ...]")
+    parser.add_option('--master', type='int', default=None,
+                      help="Report on the master process with this pid and its workers.")
+    parser.add_option('--save', default=None,
+                      help="Save the report as JSON to this file.")
+    parser.add_option('--compare', default=None,
+                      help="Show changes since the report saved to this file.")
+    options, args = parser.parse_args(argv)
+    if not args or args[0] != 'report':
+        parser.error("Unknown command; only 'report' is supported.")
+    pids = [int(pid) for pid in args[1:]]
+    if options.master is not None:
+        pids = [options.master] + worker_pids(options.master)
+    if not pids:
+        parser.error("Give pids to report on, or a --master pid.")
+    usages = {}
+    for pid in pids:
+        try:
+            usages[pid] = memory_usage(pid)
+        except (IOError, OSError):
+            sys.stderr.write("Couldn't read the memory of process {}\n".format(pid))
+    previous = None
+    if options.compare:
+        with open(options.compare) as compare_f:
+            previous = dict((int(pid), usage) for (pid, usage) in json.load(compare_f).items())
+    print(format_memory_report(usages, previous))
+    if options.save:
+        with open(options.save, 'w') as save_f:
+            json.dump(usages, save_f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
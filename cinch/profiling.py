@@ -0,0 +1,117 @@
+"""
+Opt-in instrumentation of settings resolution. With the CINCH_PROFILE
+environment variable set, cinch records the wall time and number of
+calls of each step in resolving settings: every ``setup()`` in a settings
+class's MRO, ``setdefault()``, filesystem access in the settings files,
+``LoggingSetting`` construction, and so on.
+
+The results are available from ``report()``, the ``cinch_profile``
+management command, and are dumped as JSON to the path in the
+CINCH_PROFILE_OUTPUT environment variable when the process exits.
+"""
+
+from __future__ import absolute_import
+import atexit
+import os
+from contextlib import contextmanager
+from functools import wraps
+from timeit import default_timer
+
+
+__all__ = ['enabled', 'timed', 'profiled', 'report', 'format_report', 'dump_json']
+
+
+PROFILE_ENV_VAR = 'CINCH_PROFILE'
+PROFILE_OUTPUT_ENV_VAR = 'CINCH_PROFILE_OUTPUT'
+
+# Checked once, at import, so disabled instrumentation costs nothing.
+enabled = os.environ.get(PROFILE_ENV_VAR, '').lower() not in ('', '0', 'false', 'no')
+
+# Step name -> [number of calls, total seconds]
+_timings = {}
+
+
+def record(step, seconds):
+    timing = _timings.setdefault(step, [0, 0.0])
+    timing[0] += 1
+    timing[1] += seconds
+
+
+@contextmanager
+def timed(step):
+    """Context manager recording the time taken by its block as ``step``."""
+    if not enabled:
+        yield
+        return
+    start = default_timer()
+    try:
+        yield
+    finally:
+        record(step, default_timer() - start)
+
+
+def profiled(step):
+    """
+    Decorator recording the time taken by each call of a function as
+    ``step``. The function is returned untouched if profiling is disabled.
+    """
+    def decorator(func):
+        if not enabled:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(step, default_timer() - start)
+        wrapper._cinch_profiled = True
+        return wrapper
+    return decorator
+
+
+def profile_setup_methods(cls):
+    """
+    Wrap the ``setup()`` method of each class in the MRO of ``cls`` which
+    defines one, so every mixin's setup is recorded separately. Note that
+    times include the super().setup() calls made by each method.
+    """
+    if not enabled:
+        return
+    for klass in cls.__mro__:
+        setup = klass.__dict__.get('setup')
+        if setup is not None and not getattr(setup, '_cinch_profiled', False):
+            setattr(klass, 'setup', profiled(klass.__name__ + '.setup')(setup))
+
+
+def report():
+    """
+    Return a list of recorded steps, slowest first, as dicts of 'step',
+    'calls', 'total' and 'mean' (in seconds).
+    """
+    steps = [{'step': step, 'calls': calls, 'total': total, 'mean': total / calls}
+             for (step, (calls, total)) in _timings.items()]
+    return sorted(steps, key=lambda step: (-step['total'], step['step']))
+
+
+def format_report(limit=None):
+    """Return report() as a table of text."""
+    lines = ["{:>10} {:>7} {:>10}  {}".format('total ms', 'calls', 'mean ms', 'step')]
+    for step in report()[:limit]:
+        lines.append("{:>10.3f} {:>7} {:>10.3f}  {}".format(
+            step['total'] * 1000, step['calls'], step['mean'] * 1000, step['step']))
+    return '\n'.join(lines)
+
+
+def dump_json(file_path):
+    """Write report() to ``file_path`` as JSON."""
+    import json
+    with open(file_path, 'w') as report_f:
+        json.dump(report(), report_f, indent=2, sort_keys=True)
+
+
+@atexit.register
+def _dump_on_exit():
+    if enabled and os.environ.get(PROFILE_OUTPUT_ENV_VAR):
+        dump_json(os.environ[PROFILE_OUTPUT_ENV_VAR])
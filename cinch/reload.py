@@ -0,0 +1,207 @@
+"""
+Opt-in reloading of selected settings from ``etc/cinch.json``, without
+restarting workers.
+
+With the CINCH_RELOAD setting True, each process polls the stat() of
+``cinch.json`` and the files it reads (see ``cinch_json_dependencies``),
+every CINCH_RELOAD_INTERVAL seconds. When they change, the settings named
+in CINCH_RELOADABLE_SETTINGS are read again, and any that differ (or have
+been removed from cinch.json, and so are reverted to their defaults) are
+swapped into ``django.conf.settings`` at once, after which the
+``cinch.signals.settings_reloaded`` signal is sent with the changes.
+
+CINCH_LOG_LEVELS, a mapping of logger names to level names, is
+reloadable by default; changes to it are applied to the loggers.
+
+Polling is started in each worker process by SettingsReloadMiddleware,
+which is installed by the base settings. Tests can create a
+SettingsReloader and call its ``poll()`` directly instead.
+"""
+
+from __future__ import absolute_import
+import copy
+import logging
+import os
+import threading
+import time
+from .cinchjson import cinch_json_dependencies, read_cinch_json
+from .snapshot import fingerprint
+
+
+__all__ = ['read_cinch_json', 'SettingsReloader', 'SettingsReloadMiddleware']
+
+
+logger = logging.getLogger(__name__)
+
+# Held while reloaded settings are being applied.
+reload_lock = threading.Lock()
+
+_missing = object()
+
+
+def apply_log_levels(log_levels, previous=None):
+    """
+    Set the level of each logger in ``log_levels``, and reset loggers only
+    in ``previous`` (the mapping it replaces) to NOTSET.
+    """
+    for name in set(previous or ()) - set(log_levels):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for (name, level) in log_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def swap_settings(settings, values):
+    """
+    Set ``values`` (or delete those which are _missing) on ``settings``
+    all at once: on a copy of the object django.conf.settings wraps, which
+    then replaces it, so other threads see all of the new values or none.
+    """
+    wrapped = settings.__dict__.get('_wrapped')
+    holder = wrapped if hasattr(wrapped, '__dict__') else settings
+    attrs = dict(holder.__dict__)
+    for (name, val) in values.items():
+        if val is _missing:
+            attrs.pop(name, None)
+        else:
+            attrs[name] = val
+    if holder is settings:
+        settings.__dict__ = attrs
+    else:
+        replacement = copy.copy(wrapped)
+        replacement.__dict__ = attrs
+        settings._wrapped = replacement
+
+
+class SettingsReloader(object):
+    """
+    Reloads the ``reloadable`` settings (or the CINCH_RELOADABLE_SETTINGS
+    setting) defined by ``etc_dir``/cinch.json on to ``settings`` (or
+    django.conf.settings) when cinch.json or the files it reads change.
+    Settings which are no longer in cinch.json are reverted to the values
+    they had before it set them: those in ``defaults`` (or the
+    CINCH_RELOAD_DEFAULTS setting, recorded by the base settings before
+    they read cinch.json) if it did from the start, or else unset.
+    """
+    def __init__(self, etc_dir, settings=None, reloadable=None, interval=2.0,
+                 defaults=None):
+        if settings is None:
+            from django.conf import settings
+        self.etc_dir = etc_dir
+        self.settings = settings
+        self.reloadable = frozenset(
+            reloadable if reloadable is not None
+            else getattr(settings, 'CINCH_RELOADABLE_SETTINGS', ()))
+        self.defaults = dict(
+            defaults if defaults is not None
+            else getattr(settings, 'CINCH_RELOAD_DEFAULTS', {}))
+        self.interval = interval
+        self._fingerprint = self._current_fingerprint()
+        try:
+            self._loaded = self._read()
+        except (IOError, OSError, ValueError):
+            self._loaded = {}
+        # Values of settings from before cinch.json was reloaded with them;
+        # those it defined from the start revert to their defaults.
+        self._originals = dict((name, self.defaults.get(name, _missing))
+                               for name in self._loaded)
+        self._pid = None
+
+    def _current_fingerprint(self):
+        return fingerprint(*cinch_json_dependencies(self.etc_dir))
+
+    def _read(self):
+        return dict((name, val) for (name, val) in read_cinch_json(self.etc_dir).items()
+                    if name in self.reloadable)
+
+    def poll(self):
+        """
+        Reload settings if their files have changed since the last poll.
+        Return a dict of the settings which changed, and their new values
+        (None for those which have been unset).
+        """
+        current = self._current_fingerprint()
+        if current == self._fingerprint:
+            return {}
+        self._fingerprint = current
+        try:
+            loaded = self._read()
+        except (IOError, OSError, ValueError):
+            # Probably caught mid-write; try again once it's changed again.
+            logger.exception("Couldn't reload settings from %s", self.etc_dir)
+            self._fingerprint = None
+            return {}
+        changed = {}
+        for (name, val) in loaded.items():
+            if name not in self._loaded:
+                self._originals[name] = getattr(self.settings, name, _missing)
+            if getattr(self.settings, name, _missing) != val:
+                changed[name] = val
+        for name in set(self._loaded) - set(loaded):
+            original = self._originals.pop(name)
+            if getattr(self.settings, name, _missing) != original:
+                changed[name] = original
+        self._loaded = loaded
+        return self.apply(changed)
+
+    def apply(self, changed):
+        """
+        Set each of the ``changed`` settings (or unset those which are
+        _missing) together, then announce them.
+        """
+        if not changed:
+            return changed
+        with reload_lock:
+            previous_levels = getattr(self.settings, 'CINCH_LOG_LEVELS', None)
+            swap_settings(self.settings, changed)
+            if 'CINCH_LOG_LEVELS' in changed:
+                apply_log_levels(getattr(self.settings, 'CINCH_LOG_LEVELS', None) or {},
+                                 previous_levels)
+        changed = dict((name, None if val is _missing else val)
+                       for (name, val) in changed.items())
+        logger.info("Reloaded settings: %s", ', '.join(sorted(changed)))
+        from .signals import settings_reloaded
+        settings_reloaded.send(sender=self.__class__, changed=changed)
+        return changed
+
+    def start(self):
+        """Poll in a thread of this process, unless one's already polling."""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        poller = threading.Thread(target=self._poll_periodically, name='cinch-reloader')
+        poller.daemon = True
+        poller.start()
+
+    def _poll_periodically(self):
+        pid = self._pid
+        while self._pid == pid:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Error reloading settings")
+
+
+_reloader = None
+
+
+class SettingsReloadMiddleware(object):
+    """
+    Starts a SettingsReloader in each worker process, if the CINCH_RELOAD
+    setting is True, so each ends up with a polling thread of its own
+    (even if the middleware was loaded before the workers forked).
+    """
+    def __init__(self):
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+        global _reloader
+        if not getattr(settings, 'CINCH_RELOAD', False):
+            raise MiddlewareNotUsed
+        if _reloader is None:
+            _reloader = SettingsReloader(
+                settings.ETC_DIR, settings,
+                interval=getattr(settings, 'CINCH_RELOAD_INTERVAL', 2.0))
+        _reloader.start()
+
+    def process_request(self, request):
+        _reloader.start()
@@ -10,12 +10,9 @@ files, while setting defaults based on the value of attributes.
 """
 
 import os
-import json
 import sys
-from unipath import Path
-from django.core.exceptions import ImproperlyConfigured
 #from cinch.common import SettingList
-from cinch.logging import LoggingSetting
+from cinch.profiling import enabled as profiling_enabled, timed
 
 
 # Shortcuts for checking and setting default settings.
@@ -29,6 +26,7 @@ S('TESTING', True if 'test' in sys.argv else False)
 # Check for settings which must be defined before this file is execfile()'d
 S('CINCH_REQUIRED_SETTINGS', set(['PROJECT_DIR', 'PROJECT_NAME', 'ADMINS']))
 if not g['CINCH_REQUIRED_SETTINGS'].issubset(g):
+    from django.core.exceptions import ImproperlyConfigured
     raise ImproperlyConfigured(
         "Missing expected setting(s): %s" %
         list(g['CINCH_REQUIRED_SETTINGS'].difference(g)))
@@ -60,6 +58,19 @@ S('STATICFILES_DIRS', [g['SRC_DIR'].child('static')])   # src/static/
 S('TEMPLATE_DIRS', [g['SRC_DIR'].child('templates')])   # src/templates/
 sys.path.insert(0, g['SRC_DIR'].child('apps'))           # src/apps/
 
+###
+# Uploads and media
+###
+# Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE are streamed to TMP_DIR,
+# read in chunks of CINCH_UPLOAD_CHUNK_SIZE bytes (see cinch.media).
+# Files from cinch.media.media_response() are sent by the front-end server
+# if CINCH_MEDIA_SENDFILE is 'x-sendfile' or 'x-accel-redirect' (under
+# CINCH_MEDIA_ACCEL_PREFIX, an internal nginx location), or else streamed.
+S('FILE_UPLOAD_TEMP_DIR', g['TMP_DIR'])
+from cinch.defaults import MEDIA_DEFAULTS
+for (name, value) in MEDIA_DEFAULTS.items():
+    S(name, value)
+
 ###
 # Security
 ###
@@ -70,30 +81,29 @@ ALLOWED_HOSTS = list(set(g.get('ALLOWED_HOSTS', [])) | set(['localhost', '127.0.
 # https://docs.djangoproject.com/en/dev/ref/settings/#internal-ips
 INTERNAL_IPS = tuple(set(g.get('INTERNAL_IPS', [])) | set(['127.0.0.1']))
 
-# Load configuration variables from a Cinch JSON file if they exist
-# TODO: Use the object_pairs_hook kwarg of json.load to load settings
-# in the order in which they're defined. Also, break this apart.
-if g['ETC_DIR'].child('cinch.json').exists():
-    with open(g['ETC_DIR'].child('cinch.json')) as conf_f:
-        conf_s = conf_f.read()
-    conf = json.loads(conf_s)
-    # Read settings directly from anything in a 'settings' object
-    if 'settings' in conf:
-        for key, val in conf['settings'].items():
-            g[key.upper()] = val
-    # Parse files listed in a 'read_files' array as settings
-    if 'read_files' in conf:
-        for file_name in conf['read_files']:
-            file_path = Path(g['ETC_DIR'], file_name)
-            with open(file_path) as setting_f:
-                g[file_name.upper()] = setting_f.read()
-    # Read settings from environment variables listed in an 'env_vars' array
-    if 'env_vars' in conf:
-        for env_var in conf['env_vars']:
-            g[env_var.upper()] = os.getenv(env_var.upper())
-
-#import pdb; pdb.set_trace() 
-    
+# Settings cinch.json can change in running processes, without restarting
+# them (see cinch.reload); only polled for changes if CINCH_RELOAD is True.
+S('CINCH_RELOAD', False)
+S('CINCH_RELOAD_INTERVAL', 2.0)
+S('CINCH_RELOADABLE_SETTINGS', set(['CINCH_LOG_LEVELS']))
+# Levels of loggers, by name, applied over LOGGING (and when reloaded).
+S('CINCH_LOG_LEVELS', {})
+
+# Load configuration variables from a Cinch JSON file if they exist: its
+# 'settings', the contents of its 'read_files' and its 'env_vars' (see
+# cinch.cinchjson).
+with timed('base.py: read cinch.json'):
+    from cinch.cinchjson import read_cinch_json
+    _cinch_json = read_cinch_json(g['ETC_DIR'])
+# What reloadable settings revert to when they're removed from cinch.json
+# (those without a default here are unset).
+CINCH_RELOAD_DEFAULTS = dict(
+    (name, g[name]) for name in (set(g['CINCH_RELOADABLE_SETTINGS']) |
+                                 set(_cinch_json.get('CINCH_RELOADABLE_SETTINGS', ())))
+    if name in g)
+g.update(_cinch_json)
+del _cinch_json
+
 
 # By default we look for a secret key in var/SECRET_KEY. New secret keys
 # can be generated by running `scripts/make_secret_key.py'
@@ -101,10 +111,11 @@ if g['ETC_DIR'].child('cinch.json').exists():
 # TODO: Get rid of. Use cinch.json
 S('SECRET_KEY_FILE', g['ETC_DIR'].child('SECRET_KEY'))
 if 'SECRET_KEY' not in g:
-    if 'SECRET_KEY_FILE' in g and Path(g['SECRET_KEY_FILE']).exists():
-        SECRET_KEY = g['SECRET_KEY_FILE'].read_file()
-    elif g['ETC_DIR'].child('SECRET_KEY').exists():
-        SECRET_KEY = g['ETC_DIR'].child('SECRET_KEY').read_file()
+    with timed('base.py: SECRET_KEY_FILE'):
+        if 'SECRET_KEY_FILE' in g and os.path.exists(g['SECRET_KEY_FILE']):
+            SECRET_KEY = g['SECRET_KEY_FILE'].read_file()
+        elif g['ETC_DIR'].child('SECRET_KEY').exists():
+            SECRET_KEY = g['ETC_DIR'].child('SECRET_KEY').read_file()
 
 ###
 # Debugging and development modes
@@ -115,56 +126,83 @@ S('DEBUG', False)
 # Logging
 ###
 # http://docs.djangoproject.com/en/dev/topics/logging
-S('LOGGING', LoggingSetting({
-    'formatters': {
-        'verbose': {
-            'format': "\n%(levelname)s [%(asctime)s][%(pathname)s:%(lineno)s]" +
-                      "[p/t:%(process)d/%(thread)d]\n%(message)s"
+# Only imported (and built) if the including file hasn't set LOGGING.
+if 'LOGGING' not in g:
+    from cinch.logging import LoggingSetting
+    LOGGING = LoggingSetting({
+        'formatters': {
+            'verbose': {
+                'format': "\n%(levelname)s [%(asctime)s][%(pathname)s:%(lineno)s]" +
+                          "[p/t:%(process)d/%(thread)d]\n%(message)s"
+            },
+            'simple': {
+                'format': '%(levelname)s [%(module)s:%(lineno)s] %(message)s'
+            },
         },
-        'simple': {
-            'format': '%(levelname)s [%(module)s:%(lineno)s] %(message)s'
+        'filters': {
+            'require_debug_false': {
+                '()': 'django.utils.log.RequireDebugFalse',
+            },
         },
-    },
-    'filters': {
-        'require_debug_false': {
-            '()': 'django.utils.log.RequireDebugFalse',
+        'handlers': {
+            'mail_admins': {
+                'level': 'ERROR',
+                'filters': ['require_debug_false'],
+                'class': 'django.utils.log.AdminEmailHandler',
+            },
         },
-    },
-    'handlers': {
-        'mail_admins': {
-            'level': 'ERROR',
-            'filters': ['require_debug_false'],
-            'class': 'django.utils.log.AdminEmailHandler',
+        'loggers': {
+            'django.request': {
+                'handlers': ['mail_admins'],
+                'level': 'ERROR',
+                'propagate': True,
+            },
         },
-    },
-    'loggers': {
-        'django.request': {
-            'handlers': ['mail_admins'],
-            'level': 'ERROR',
-            'propagate': True,
-        },
-    },
-}, logfile_dir=g['LOG_DIR']))
+    }, logfile_dir=g['LOG_DIR'])
+for (logger_name, level) in g['CINCH_LOG_LEVELS'].items():
+    g['LOGGING'].setdefault('loggers', {}).setdefault(logger_name, {})['level'] = level
+# LoggingSettings are layered; Django is given the plain dict they resolve to.
+from cinch.layered import LayeredDict
+if isinstance(g['LOGGING'], LayeredDict):
+    LOGGING = g['LOGGING'].resolve()
 
 ###
 # Databases
-### TODO
-#if 'DATABASES' not in G:
-#    DATABASES = DatabasesSetting()['default'] = \
-#        db_setting(engine='sqlite3', name=g['DB_DIR'].child('default.db'))
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': g['DB_DIR'].child('default.db'),
-    }
-}
+###
+# https://docs.djangoproject.com/en/dev/ref/settings/#databases
+# Connections are kept open for a minute; see DatabasesSetting.add() for
+# pooling them instead.
+# The default sqlite database can use cinch's SQLite profile (True, or a
+# dict of pragmas to override; see cinch.db.sqlite), and/or be checkpointed
+# and optimised every CINCH_SQLITE_MAINTENANCE_INTERVAL seconds; either
+# switches it to cinch's sqlite3 backend.
+S('CINCH_SQLITE_PROFILE', False)
+S('CINCH_SQLITE_MAINTENANCE_INTERVAL', None)
+if 'DATABASES' not in g:
+    from cinch.databases import DatabasesSetting
+    DATABASES = DatabasesSetting()
+    DATABASES.add('default', 'sqlite3', g['DB_DIR'].child('default.db'),
+                  sqlite_profile=g['CINCH_SQLITE_PROFILE'],
+                  sqlite_maintenance_interval=g['CINCH_SQLITE_MAINTENANCE_INTERVAL'])
+# Replicas added with DATABASES.add_replica() need ReplicaRouter, and
+# ReplicaPinningMiddleware, which is added to MIDDLEWARE_CLASSES below.
+if 'DATABASE_ROUTERS' not in g and hasattr(g['DATABASES'], 'routers'):
+    DATABASE_ROUTERS = g['DATABASES'].routers()
+S('CINCH_REPLICA_SELECTION', 'weighted')    # Or 'lru'
+S('CINCH_REPLICA_CHECK_INTERVAL', 10)       # Seconds between health checks,
+S('CINCH_REPLICA_EJECT_SECONDS', 30)        # and unhealthy replicas ejected for.
+S('CINCH_REPLICA_PIN_SECONDS', 0)           # Read a client's writes for this long.
 
 ###
 # Caching
-### TODO
+###
+# https://docs.djangoproject.com/en/dev/topics/cache/
 #S('CACHE_MIDDLEWARE_ANONYMOUS_ONLY', True)
-#if 'CACHES' not in G:
-#    CACHES = CachesSetting()['default'] = {'backend': 'LocMemCache'}
+# Django's default cache is kept. For a per-process cache in front of a
+# shared one, set CACHES before including this file, e.g.:
+#   CACHES = CachesSetting()
+#   CACHES.add_tiered('default', 'memcached', '127.0.0.1:11211')
+# (see cinch.caches), or use cinch.mixins.TieredCacheMixin.
 
 ###
 # URLs
@@ -187,14 +225,31 @@ S('USE_TZ', True)       # Timezone support for dates
 S('STATICFILES_FINDERS', [
     'django.contrib.staticfiles.finders.FileSystemFinder',
     'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    # Finds REVKOM_STATICFILES from an index, built once.
+    'cinch.staticfiles.IndexedFinder',
 ])
+# Used by the cinch_collectstatic command, which skips files unchanged
+# since the collection recorded in its manifest.
+S('CINCH_STATIC_MANIFEST', g['VAR_DIR'].child('cinch-static-manifest.json'))
+# Its threads, and the compressed copies of static files written by
+# cinch.staticfiles.HashedStorage, if it's the STATICFILES_STORAGE.
+from cinch.defaults import STATIC_DEFAULTS
+for (name, value) in STATIC_DEFAULTS.items():
+    S(name, value)
 
 # List of callables that know how to import templates.
 S('TEMPLATE_LOADERS', [
     'django.template.loaders.filesystem.Loader',
     'django.template.loaders.app_directories.Loader',
 ])
-# Used by Revkom's CustomFileFinder, for cherry-picking static files
+# Compile every template (with these extensions) when preloading, in this
+# many threads, so they're cached before a request needs them; see
+# cinch.templates and the cinch_warm_templates command.
+S('CINCH_WARM_TEMPLATES', False)
+S('CINCH_WARM_TEMPLATE_THREADS', 4)
+S('CINCH_TEMPLATE_EXTENSIONS', ['.html', '.txt', '.xml'])
+# Used by cinch.staticfiles.IndexedFinder (or Revkom's CustomFileFinder), for
+# cherry-picking static files.
 # A dictionary of the form { static_path: filesystem_path, ... }
 S('REVKOM_STATICFILES', {})
 
@@ -203,6 +258,12 @@ S('REVKOM_STATICFILES', {})
 ###
 # https://docs.djangoproject.com/en/dev/topics/http/middleware/
 S('MIDDLEWARE_CLASSES', [
+    # Reloads settings from cinch.json, if CINCH_RELOAD is True.
+    'cinch.reload.SettingsReloadMiddleware',
+    # Checks the Host of requests against long ALLOWED_HOSTS lists, quickly.
+    'cinch.hosts.HostValidationMiddleware',
+    # Selects the settings overlay of each request's host, if HOST_OVERLAYS.
+    'cinch.overlays.HostOverlayMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -210,6 +271,11 @@ S('MIDDLEWARE_CLASSES', [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ])
+# ReplicaRouter pins a thread to the primary once it's written, until
+# ReplicaPinningMiddleware unpins it at the start of the next request.
+if 'cinch.db.routers.ReplicaRouter' in g.get('DATABASE_ROUTERS', ()):
+    from cinch.db.middleware import add_pinning_middleware
+    MIDDLEWARE_CLASSES = add_pinning_middleware(g['MIDDLEWARE_CLASSES'])
 
 ###
 # Django - Installed apps
@@ -233,3 +299,39 @@ S('INSTALLED_APPS', [
     'django.contrib.staticfiles',
     'django.contrib.sites',
 ])
+# Projects using cinch's management commands add 'cinch' themselves; it's
+# only added here when profiling, for the cinch_profile command.
+if profiling_enabled and 'cinch' not in g['INSTALLED_APPS']:
+    INSTALLED_APPS = list(g['INSTALLED_APPS']) + ['cinch']
+
+###
+# Per-host settings overlays
+###
+# Settings which differ by host, for serving many sites from one process,
+# e.g. {'.example.com': {'ROOT_URLCONF': ..., 'TEMPLATE_DIRS': [...]}}
+# (see cinch.overlays), and the number of patterns' settings to keep resolved.
+S('HOST_OVERLAYS', {})
+S('CINCH_HOST_OVERLAY_CACHE_SIZE', 256)
+if g['HOST_OVERLAYS']:
+    from cinch.overlays import add_host_overlays
+    MIDDLEWARE_CLASSES, TEMPLATE_LOADERS = add_host_overlays(
+        g['MIDDLEWARE_CLASSES'], g['TEMPLATE_LOADERS'])
+
+###
+# Host validation
+###
+# HostValidationMiddleware compiles ALLOWED_HOSTS to reject requests for
+# other hosts quickly, if there are at least this many (see cinch.hosts).
+# None to leave them to Django alone.
+S('CINCH_COMPILE_ALLOWED_HOSTS', 100)
+
+###
+# Settings fingerprint
+###
+# A hash of the settings which change what's cached, added to the KEY_PREFIX
+# of CACHES built by CachesSetting, so a deploy with new settings doesn't
+# read stale entries. It's computed once every settings file has been
+# included (see cinch.fingerprint).
+S('CINCH_FINGERPRINT_SETTINGS', None)       # Names of settings to hash (None for
+                                            # cinch.fingerprint.FINGERPRINT_SETTINGS)
+S('CINCH_FINGERPRINT_EXCLUDE', [])          # ...less these
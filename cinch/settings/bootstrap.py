@@ -3,7 +3,7 @@ Base settings that exist solely to enable the creation of a SECRET_KEY
 file, via a Django management command, before one has been created.
 """
 
-from cinch import cinch_settings
+from cinch import include_settings
 
 
 g = globals()
@@ -14,4 +14,4 @@ SECRET_KEY = '12345'
 
 
 # Include our sibling default settings
-g.update(cinch_settings(g, 'default'))
+include_settings(g, 'default')
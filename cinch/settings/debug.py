@@ -2,7 +2,7 @@
 Base debug settings for a project to include via execfile().
 """
 
-from cinch import cinch_settings
+from cinch import include_settings
 
 
 g = globals()
@@ -15,7 +15,7 @@ S('TEMPLATE_DEBUG', g['DEBUG'])
 S('TEMPLATE_STRING_IF_INVALID', 'INVALID_CONTEXT[%s]')
 
 # Include our sibling base settings
-g.update(cinch_settings(g, 'base'))
+include_settings(g, 'base')
 
 # Directory structure
 S('MEDIA_ROOT', g['TMP_DIR'].child('media'))
@@ -7,7 +7,7 @@ DJANGO_SETTINGS_MODULE environment variable should be set. The author
 suggests a postactivate hook in the project's virtual environment.
 """
 
-from cinch import cinch_settings
+from cinch import include_settings
 
 
 g = globals()
@@ -18,4 +18,4 @@ S('ADMINS', ())
 S('PROJECT_NAME', 'cinch')
 
 # Include our sibling debug settings
-g.update(cinch_settings(g, 'debug'))
+include_settings(g, 'debug')
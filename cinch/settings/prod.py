@@ -2,7 +2,7 @@
 Base production settings for a project to include via execfile().
 """
 
-from cinch import cinch_settings
+from cinch import include_settings
 
 
 g = globals()
@@ -11,6 +11,17 @@ S = g.setdefault
 
 # Debugging and development modes
 S('DEBUG', False)
+# Compile (and cache) every template when preloading (see cinch.preload).
+S('CINCH_WARM_TEMPLATES', True)
 
 # Include our sibling debug settings
-g.update(cinch_settings(g, 'base'))
+include_settings(g, 'base')
+
+# Production performance profile: cached templates (and sessions, if the
+# default cache is shared between processes), persistent database
+# connections, GZip and ConditionalGet middleware, and no development apps
+# (see cinch.performance; check it with the cinch_check_performance command).
+S('CINCH_PRODUCTION_PROFILE', True)
+if g['CINCH_PRODUCTION_PROFILE']:
+    from cinch.performance import apply_production_profile
+    apply_production_profile(g)
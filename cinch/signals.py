@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+
+__all__ = ['settings_reloaded']
+
+
+# Sent when settings have been reloaded from cinch.json, with a dict of
+# the settings that changed and their new values as ``changed``.
+settings_reloaded = Signal(providing_args=['changed'])
@@ -0,0 +1,158 @@
+"""
+Snapshots of fully resolved settings. A snapshot is a pickle of every
+setting produced by including a settings file, saved under ``VAR_DIR``
+along with the files and environment variables those settings were
+derived from. Later processes reuse the snapshot, skipping the whole
+include chain, until one of those dependencies changes.
+"""
+
+from __future__ import absolute_import
+import hashlib
+import inspect
+import json
+import os
+import sys
+import warnings
+from .cinchjson import cinch_json_dependencies
+
+
+__all__ = ['SettingsSnapshot', 'snapshot_enabled', 'snapshot_settings', 'settings_seed',
+           'cinch_json_dependencies']
+
+
+# Environment variable which turns snapshots on, unless a CINCH_SNAPSHOT
+# setting has already been defined before the include.
+SNAPSHOT_ENV_VAR = 'CINCH_SNAPSHOT'
+# Bumped whenever the layout of a saved snapshot changes.
+SNAPSHOT_FORMAT = 1
+
+
+def snapshot_enabled(settings_globals):
+    """
+    Return True if settings snapshots should be used, via a CINCH_SNAPSHOT
+    setting or, failing that, the CINCH_SNAPSHOT environment variable.
+    """
+    if 'CINCH_SNAPSHOT' in settings_globals:
+        return bool(settings_globals['CINCH_SNAPSHOT'])
+    return os.environ.get(SNAPSHOT_ENV_VAR, '').lower() not in ('', '0', 'false', 'no')
+
+
+def fingerprint(files, env_vars, seed=''):
+    """
+    Hash the stat() of each file (modification time and size, or None if
+    it's missing) and the value of each environment variable.
+    """
+    digest = hashlib.sha1(seed.encode('utf-8'))
+    for file_path in files:
+        try:
+            stat = os.stat(file_path)
+            stamp = (stat.st_mtime, stat.st_size)
+        except OSError:
+            stamp = None
+        digest.update(repr((file_path, stamp)).encode('utf-8'))
+    for env_var in env_vars:
+        digest.update(repr((env_var, os.environ.get(env_var))).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _serialise_set(val):
+    if isinstance(val, (set, frozenset)):
+        return sorted(val)
+    raise TypeError("{!r} can't be serialised".format(val))
+
+
+def snapshot_settings(settings_globals):
+    """
+    Return the settings in ``settings_globals`` which go in a snapshot:
+    those with upper-case names, other than modules and functions (e.g.
+    ``S = g.setdefault``), which aren't settings.
+    """
+    return dict((key, val) for (key, val) in settings_globals.items()
+                if key == key.upper() and not
+                (inspect.ismodule(val) or inspect.isroutine(val)))
+
+
+def settings_seed(settings_globals, *extra):
+    """
+    Return a hash of the settings in ``settings_globals`` (and of
+    ``extra``), serialised as JSON, so it's the same in every process
+    given the same settings; or None if one of them can't be serialised.
+    """
+    try:
+        serialised = json.dumps([extra, snapshot_settings(settings_globals)],
+                                sort_keys=True, default=_serialise_set)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(serialised.encode('utf-8')).hexdigest()
+
+
+def _pickle():
+    # Imported when needed, to keep importing cinch cheap.
+    try:
+        import cPickle as pickle
+    except ImportError:
+        import pickle
+    return pickle
+
+
+class SettingsSnapshot(object):
+    """
+    A snapshot file of resolved settings. ``seed`` should identify
+    everything that went in to the settings which isn't a file or an
+    environment variable (e.g. the settings defined before the include).
+    """
+    def __init__(self, path, seed=''):
+        self.path = path
+        self.seed = seed
+
+    def load(self):
+        """
+        Return the saved settings dict if the snapshot exists and its
+        dependencies are unchanged, otherwise None. Paths the snapshot's
+        settings added to ``sys.path`` are restored.
+        """
+        pickle = _pickle()
+        try:
+            with open(self.path, 'rb') as snapshot_f:
+                data = pickle.load(snapshot_f)
+        except Exception:
+            # Missing, truncated or unpicklable; just rebuild it.
+            return None
+        if data.get('format') != SNAPSHOT_FORMAT or data['fingerprint'] != \
+                fingerprint(data['files'], data['env_vars'], self.seed):
+            return None
+        for sys_path in reversed(data['sys_path']):
+            if sys_path not in sys.path:
+                sys.path.insert(0, sys_path)
+        return data['settings']
+
+    def save(self, settings, files=(), env_vars=(), sys_path=()):
+        """
+        Atomically write ``settings`` to the snapshot file, recording the
+        ``files`` and ``env_vars`` they depend on, and any ``sys_path``
+        entries which should be restored when the snapshot is loaded.
+        """
+        data = {
+            'format': SNAPSHOT_FORMAT,
+            'fingerprint': fingerprint(files, env_vars, self.seed),
+            'files': list(files),
+            'env_vars': list(env_vars),
+            'sys_path': list(sys_path),
+            'settings': settings,
+        }
+        snapshot_dir = os.path.dirname(self.path)
+        if snapshot_dir and not os.path.isdir(snapshot_dir):
+            try:
+                os.makedirs(snapshot_dir)
+            except OSError:
+                pass
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        pickle = _pickle()
+        try:
+            with open(tmp_path, 'wb') as snapshot_f:
+                pickle.dump(data, snapshot_f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, self.path)
+        except Exception as exc:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            warnings.warn("Couldn't save settings snapshot {}: {}".format(self.path, exc))
@@ -0,0 +1,403 @@
+"""
+Faster static files collection, for large asset trees.
+
+``collect()`` (the cinch_collectstatic command) finds static files with
+the STATICFILES_FINDERS and copies them to STATIC_ROOT, in a pool of
+threads. A manifest of what was collected (each file's source, size,
+modification time and content hash) is kept in CINCH_STATIC_MANIFEST, so
+files which haven't changed since are skipped: without reading them if
+their size and modification time are the same, and without copying them
+if their content is. Files collected before which no longer are (e.g.
+deleted from the project) are removed from STATIC_ROOT.
+
+IndexedFinder finds the files in REVKOM_STATICFILES (a dict of static
+paths to files or directories) by looking them up in an index, built
+once, rather than checking the filesystem for each one. Where several
+entries provide the same path, the first (by static path) is used.
+
+HashedStorage (a STATICFILES_STORAGE, which StaticFilesMixin sets) gives
+collected files content-hashed names, kept in a manifest (or, before
+Django 1.7, the cache), so they can be served with far-future expiry. It
+also writes .gz (and, with CINCH_STATIC_BROTLI, .br) copies of them
+alongside, in parallel, for the front-end server to serve instead (e.g.
+nginx's gzip_static), skipping files which are already compressed or
+smaller than CINCH_STATIC_COMPRESS_MIN_SIZE (and removing any copies
+they had).
+"""
+
+from __future__ import absolute_import
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import time
+from multiprocessing.pool import ThreadPool
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder, get_finders
+from django.contrib.staticfiles.utils import matches_patterns
+from django.core.files.storage import FileSystemStorage
+from .defaults import STATIC_DEFAULTS
+
+
+__all__ = ['IndexedFinder', 'HashedStorage', 'find_files', 'collect', 'compress_files',
+           'format_collect_report']
+
+
+logger = logging.getLogger(__name__)
+
+# As collectstatic's default --ignore patterns.
+IGNORE_PATTERNS = ['CVS', '.*', '*~']
+
+
+def index_staticfiles(staticfiles):
+    """
+    Return a dict of static paths to lists of the files of ``staticfiles``,
+    a dict of static paths to files, or directories of them, providing them.
+    """
+    index = {}
+    for (static_path, file_path) in sorted(staticfiles.items()):
+        static_path = static_path.strip('/')
+        if not os.path.isdir(file_path):
+            index.setdefault(static_path, []).append(file_path)
+            continue
+        for (dir_path, dir_names, file_names) in os.walk(file_path, followlinks=True):
+            for file_name in file_names:
+                source = os.path.join(dir_path, file_name)
+                name = os.path.relpath(source, file_path).replace(os.sep, '/')
+                index.setdefault('/'.join((static_path, name)) if static_path else name,
+                                 []).append(source)
+    return index
+
+
+class _IndexStorage(FileSystemStorage):
+    """Storage of the files in an index, as listed by IndexedFinder."""
+    def __init__(self, index):
+        super(_IndexStorage, self).__init__(location='/')
+        self.index = index
+
+    def path(self, name):
+        return self.index[name][0]
+
+
+class IndexedFinder(BaseFinder):
+    """Static files finder for REVKOM_STATICFILES, from an index of them."""
+    def __init__(self, *args, **kwargs):
+        super(IndexedFinder, self).__init__(*args, **kwargs)
+        self.index = index_staticfiles(getattr(settings, 'REVKOM_STATICFILES', {}))
+        self.storage = _IndexStorage(self.index)
+
+    def find(self, path, all=False):
+        matches = self.index.get(path.replace(os.sep, '/'), [])
+        if all:
+            return list(matches)
+        return matches[0] if matches else []
+
+    def list(self, ignore_patterns):
+        for path in sorted(self.index):
+            if not matches_patterns(path, ignore_patterns):
+                yield path, self.storage
+
+
+def find_files(pool, ignore_patterns=IGNORE_PATTERNS):
+    """
+    Return a list of (static path, source file) of the files found by
+    the STATICFILES_FINDERS, each listed in a thread of ``pool``. Only the
+    first file found for each path is included, as with collectstatic.
+    """
+    def list_files(finder):
+        files = []
+        for (path, storage) in finder.list(ignore_patterns):
+            prefix = getattr(storage, 'prefix', None)
+            static_path = os.path.join(prefix, path) if prefix else path
+            files.append((static_path.replace(os.sep, '/'), storage.path(path)))
+        return files
+    found = pool.map(list_files, list(get_finders()))
+    files, seen = [], set()
+    for finder_files in found:
+        for (static_path, source) in finder_files:
+            if static_path not in seen:
+                seen.add(static_path)
+                files.append((static_path, source))
+    return files
+
+
+def _file_hash(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file_f:
+        for chunk in iter(lambda: file_f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _makedirs(dir_path):
+    try:
+        os.makedirs(dir_path)
+    except OSError:
+        # Made by another thread, or already there.
+        if not os.path.isdir(dir_path):
+            raise
+
+
+# Not worth compressing again.
+COMPRESSED_EXTENSIONS = (
+    '.7z', '.avif', '.br', '.bz2', '.gif', '.gz', '.jpeg', '.jpg', '.mp3', '.mp4',
+    '.ogg', '.pdf', '.png', '.webm', '.webp', '.woff', '.woff2', '.xz', '.zip',
+)
+
+
+def _gzip(data, level):
+    buf = io.BytesIO()
+    # With no mtime, so the same file compresses to the same bytes.
+    with gzip.GzipFile(filename='', mode='wb', compresslevel=level, fileobj=buf,
+                       mtime=0) as gzip_f:
+        gzip_f.write(data)
+    return buf.getvalue()
+
+
+def _setting(name):
+    return getattr(settings, name, STATIC_DEFAULTS[name])
+
+
+def _compressors(gzip_level, brotli_quality):
+    """Return a list of (suffix, compress function), by settings."""
+    compressors = []
+    if _setting('CINCH_STATIC_GZIP'):
+        compressors.append(('.gz', lambda data: _gzip(data, gzip_level)))
+    if _setting('CINCH_STATIC_BROTLI'):
+        try:
+            import brotli
+        except ImportError:
+            logger.warning("CINCH_STATIC_BROTLI is set, but brotli isn't installed.")
+        else:
+            compressors.append(('.br', lambda data: brotli.compress(data, quality=brotli_quality)))
+    return compressors
+
+
+def _remove(file_path):
+    try:
+        os.remove(file_path)
+    except OSError:
+        # Not there.
+        pass
+
+
+def _compress_file(file_path, compressors, min_size):
+    """
+    Write compressed copies of ``file_path``, removing any left from when
+    it was worth compressing; return how many were written.
+    """
+    if file_path.lower().endswith(COMPRESSED_EXTENSIONS):
+        return 0
+    stat = os.stat(file_path)
+    if stat.st_size < min_size:
+        for (suffix, compress) in compressors:
+            _remove(file_path + suffix)
+        return 0
+    data, written = None, 0
+    for (suffix, compress) in compressors:
+        target = file_path + suffix
+        # (In whole seconds, as os.utime() may not keep any more.)
+        if os.path.exists(target) and int(os.stat(target).st_mtime) == int(stat.st_mtime):
+            continue
+        if data is None:
+            with open(file_path, 'rb') as file_f:
+                data = file_f.read()
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            _remove(target)
+            continue
+        tmp_path = '{}.{}.tmp'.format(target, os.getpid())
+        with open(tmp_path, 'wb') as target_f:
+            target_f.write(compressed)
+        # Dated as the original, so it's only compressed again if that changes.
+        os.utime(tmp_path, (stat.st_atime, stat.st_mtime))
+        os.rename(tmp_path, target)
+        written += 1
+    return written
+
+
+def compress_files(root, names, threads=None, gzip_level=None, brotli_quality=None,
+                   min_size=None):
+    """
+    Write compressed copies of the files ``names`` in ``root``, in
+    ``threads`` threads; the other arguments default to the settings
+    CINCH_STATIC_COMPRESS_THREADS, CINCH_STATIC_GZIP_LEVEL,
+    CINCH_STATIC_BROTLI_QUALITY and CINCH_STATIC_COMPRESS_MIN_SIZE.
+    Return the number written.
+    """
+    def setting(value, name):
+        return _setting(name) if value is None else value
+    compressors = _compressors(setting(gzip_level, 'CINCH_STATIC_GZIP_LEVEL'),
+                               setting(brotli_quality, 'CINCH_STATIC_BROTLI_QUALITY'))
+    min_size = setting(min_size, 'CINCH_STATIC_COMPRESS_MIN_SIZE')
+    if not compressors or not names:
+        return 0
+    pool = ThreadPool(max(1, setting(threads, 'CINCH_STATIC_COMPRESS_THREADS')))
+    try:
+        return sum(pool.map(
+            lambda name: _compress_file(os.path.join(root, *name.split('/')), compressors,
+                                        min_size),
+            sorted(set(names))))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _hashed_storage_base():
+    try:
+        from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+    except ImportError:
+        # Django < 1.7: hashed names are kept in the cache.
+        from django.contrib.staticfiles.storage import CachedStaticFilesStorage
+        return CachedStaticFilesStorage
+    return ManifestStaticFilesStorage
+
+
+class HashedStorage(_hashed_storage_base()):
+    """
+    Static files storage with content-hashed names, which also writes
+    compressed copies of the files it post-processes (see compress_files()).
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        names = list(paths)
+        for (name, hashed_name, processed) in super(HashedStorage, self).post_process(
+                paths, dry_run, **options):
+            if processed and not isinstance(processed, Exception):
+                names.append(hashed_name)
+            yield name, hashed_name, processed
+        if not dry_run:
+            compress_files(self.location, names)
+
+
+def _collect_file(static_path, source, root, previous, dry_run):
+    """Return (static_path, manifest entry, whether it was copied)."""
+    stat = os.stat(source)
+    target = os.path.join(root, *static_path.split('/'))
+    entry = previous.get(static_path)
+    if entry and entry['source'] == source and entry['size'] == stat.st_size and \
+            entry['mtime'] == stat.st_mtime and os.path.exists(target):
+        return static_path, entry, False
+    new_entry = {'source': source, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                 'hash': _file_hash(source)}
+    if entry and entry['hash'] == new_entry['hash'] and os.path.exists(target):
+        return static_path, new_entry, False
+    if not dry_run:
+        _makedirs(os.path.dirname(target))
+        # Replaced in one step, so it's never served half-copied.
+        tmp_path = '{}.{}.tmp'.format(target, os.getpid())
+        shutil.copy2(source, tmp_path)
+        os.rename(tmp_path, target)
+    return static_path, new_entry, True
+
+
+def _remove_files(root, static_paths):
+    """
+    Remove the files ``static_paths`` from ``root``, and their compressed
+    copies. Return the number removed.
+    """
+    removed = 0
+    for static_path in static_paths:
+        target = os.path.join(root, *static_path.split('/'))
+        for path in (target, target + '.gz', target + '.br'):
+            try:
+                os.remove(path)
+            except OSError:
+                # Already gone (or never compressed).
+                continue
+            if path == target:
+                removed += 1
+    return removed
+
+
+def _load_manifest(manifest_path):
+    try:
+        with open(manifest_path) as manifest_f:
+            return json.load(manifest_f).get('files', {})
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest_path, files):
+    _makedirs(os.path.dirname(manifest_path))
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as manifest_f:
+        json.dump({'files': files}, manifest_f, indent=1, sort_keys=True)
+    os.rename(tmp_path, manifest_path)
+
+
+def collect(threads=8, manifest_path=None, root=None, dry_run=False, force=False,
+            ignore_patterns=IGNORE_PATTERNS):
+    """
+    Collect static files into ``root`` (STATIC_ROOT), in ``threads`` threads,
+    skipping those unchanged since the collection recorded in
+    ``manifest_path`` (CINCH_STATIC_MANIFEST), unless ``force``. Return a
+    dict of the numbers of 'files', 'copied', 'skipped' and 'removed' (as
+    no longer found), the 'seconds' it took and the 'files_per_sec'.
+    """
+    root = root or settings.STATIC_ROOT
+    manifest_path = manifest_path or getattr(settings, 'CINCH_STATIC_MANIFEST', None) or \
+        os.path.join(settings.VAR_DIR, 'cinch-static-manifest.json')
+    start = time.time()
+    collected = _load_manifest(manifest_path)
+    previous = {} if force else collected
+    pool = ThreadPool(max(1, threads))
+    try:
+        files = find_files(pool, ignore_patterns)
+        results = pool.map(lambda args: _collect_file(*args),
+                           [(static_path, source, root, previous, dry_run)
+                            for (static_path, source) in files])
+    finally:
+        pool.close()
+        pool.join()
+    manifest = dict((static_path, entry) for (static_path, entry, copied) in results)
+    stale = [static_path for static_path in collected if static_path not in manifest]
+    removed, post_processed = len(stale), 0
+    if not dry_run:
+        removed = _remove_files(root, stale)
+        _save_manifest(manifest_path, manifest)
+        post_processed = _post_process(root, [static_path for (static_path, source) in files])
+    seconds = time.time() - start
+    copied = sum(1 for result in results if result[2])
+    return {
+        'files': len(results),
+        'copied': copied,
+        'skipped': len(results) - copied,
+        'removed': removed,
+        'post_processed': post_processed,
+        'seconds': seconds,
+        'files_per_sec': len(results) / seconds if seconds else 0,
+    }
+
+
+def _post_process(root, static_paths):
+    """
+    Post-process the collected files, as collectstatic does, if the
+    STATICFILES_STORAGE (in ``root``) does, e.g. to hash their names.
+    Return the number processed.
+    """
+    from django.contrib.staticfiles.storage import staticfiles_storage
+    if not hasattr(staticfiles_storage, 'post_process'):
+        return 0
+    if os.path.abspath(getattr(staticfiles_storage, 'location', '')) != os.path.abspath(root):
+        logger.warning("Not post-processing static files: STATICFILES_STORAGE isn't in %s.",
+                       root)
+        return 0
+    # The files are read from where they were collected to.
+    paths = dict((static_path, (staticfiles_storage, static_path))
+                 for static_path in static_paths)
+    processed_count = 0
+    for (name, hashed_name, processed) in staticfiles_storage.post_process(paths):
+        if isinstance(processed, Exception):
+            raise processed
+        if processed:
+            processed_count += 1
+    return processed_count
+
+
+def format_collect_report(report):
+    return "{copied} copied, {skipped} unchanged, of {files} files, {removed} removed, " \
+        "{post_processed} post-processed, in {seconds:.2f}s " \
+        "({files_per_sec:.0f} files/s).".format(**report)
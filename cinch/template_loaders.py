@@ -0,0 +1,62 @@
+"""
+Template loaders. HostTemplateLoader loads templates from the TEMPLATE_DIRS
+of the current host's overlay (see cinch.overlays).
+"""
+
+from __future__ import absolute_import
+from django.template import TemplateDoesNotExist
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from .overlays import host_settings
+
+
+__all__ = ['HostTemplateLoader']
+
+
+def _base_loader():
+    try:
+        from django.template.loader import BaseLoader
+    except ImportError:
+        # Django >= 1.8
+        from django.template.loaders.base import Loader as BaseLoader
+    return BaseLoader
+
+
+class HostTemplateLoader(_base_loader()):
+    """
+    Template loader for the TEMPLATE_DIRS of the current host's overlay,
+    if it has any, which caches templates per overlay. It should come before
+    other loaders, and not inside the cached loader, which would share
+    templates between hosts.
+    """
+    is_usable = True
+    _filesystem_loader = None
+
+    @property
+    def filesystem_loader(self):
+        if self._filesystem_loader is None:
+            engine = getattr(self, 'engine', None)
+            if engine is None:
+                # Django < 1.8
+                self._filesystem_loader = FilesystemLoader()
+            else:
+                self._filesystem_loader = FilesystemLoader(engine)
+        return self._filesystem_loader
+
+    def _dirs(self):
+        return getattr(host_settings(), 'overlay', {}).get('TEMPLATE_DIRS')
+
+    def load_template_source(self, template_name, template_dirs=None):
+        dirs = self._dirs()
+        if not dirs:
+            raise TemplateDoesNotExist(template_name)
+        return self.filesystem_loader.load_template_source(template_name, dirs)
+
+    def load_template(self, template_name, template_dirs=None):
+        view = host_settings()
+        if not self._dirs():
+            raise TemplateDoesNotExist(template_name)
+        try:
+            return view.templates[template_name]
+        except KeyError:
+            template = super(HostTemplateLoader, self).load_template(template_name, template_dirs)
+            return view.templates.setdefault(template_name, template)
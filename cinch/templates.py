@@ -0,0 +1,115 @@
+"""
+Template warm-up: compile every template under TEMPLATE_DIRS and the
+installed apps' template directories, in a few threads, so the cached
+template loader has them all before the process serves a request (and,
+when preloading, before it forks; see cinch.preload).
+
+Without the cached loader, templates are still compiled, which finds any
+that fail to. Run it with::
+
+    python manage.py cinch_warm_templates [--threads N] [--slowest N] [name ...]
+"""
+
+from __future__ import absolute_import
+import logging
+import os
+import time
+from multiprocessing.pool import ThreadPool
+
+
+__all__ = ['template_dirs', 'template_names', 'warm_templates', 'format_warm_report']
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def template_dirs():
+    """Return TEMPLATE_DIRS, then the installed apps' template directories."""
+    from django.conf import settings
+    dirs = list(getattr(settings, 'TEMPLATE_DIRS', ()))
+    try:
+        from django.template.utils import get_app_template_dirs
+    except ImportError:
+        # Django < 1.8
+        from django.template.loaders.app_directories import app_template_dirs
+    else:
+        app_template_dirs = get_app_template_dirs('templates')
+    dirs.extend(app_template_dirs)
+    return dirs
+
+
+def template_names(dirs, extensions=TEMPLATE_EXTENSIONS):
+    """
+    Return the names of the templates in ``dirs`` with one of ``extensions``,
+    relative to their directory, each once (as the loaders find them).
+    """
+    names, seen = [], set()
+    for template_dir in dirs:
+        for (dir_path, dir_names, file_names) in os.walk(template_dir, followlinks=True):
+            dir_names[:] = sorted(name for name in dir_names if not name.startswith('.'))
+            for file_name in sorted(file_names):
+                if file_name.startswith('.') or not file_name.endswith(tuple(extensions)):
+                    continue
+                name = os.path.relpath(os.path.join(dir_path, file_name), template_dir)
+                name = name.replace(os.sep, '/')
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+    return names
+
+
+def _compile(name):
+    from django.template.loader import get_template
+    start = time.time()
+    try:
+        get_template(name)
+    except Exception as e:
+        return (name, time.time() - start, '{}: {}'.format(type(e).__name__, e))
+    return (name, time.time() - start, None)
+
+
+def warm_templates(names=None, threads=4):
+    """
+    Compile (and cache) the templates ``names``, or all those found under
+    template_dirs(), in ``threads`` threads. Return a dict of the number of
+    'templates', the 'seconds' it took, the 'failures' as (name, error),
+    and the 'timings' as (seconds, name), slowest first.
+    """
+    from django.conf import settings
+    if names is None:
+        names = template_names(template_dirs(), getattr(
+            settings, 'CINCH_TEMPLATE_EXTENSIONS', TEMPLATE_EXTENSIONS))
+    start = time.time()
+    results = []
+    if names:
+        # The first lookup sets up the template loaders; don't race to.
+        results.append(_compile(names[0]))
+    if len(names) > 1:
+        pool = ThreadPool(max(1, threads))
+        try:
+            results.extend(pool.map(_compile, names[1:]))
+        finally:
+            pool.close()
+            pool.join()
+    return {
+        'templates': len(names),
+        'seconds': time.time() - start,
+        'failures': [(name, error) for (name, seconds, error) in results if error],
+        'timings': sorted(((seconds, name) for (name, seconds, error) in results),
+                          reverse=True),
+    }
+
+
+def format_warm_report(report, slowest=10):
+    """Format a warm_templates() report, with the ``slowest`` templates."""
+    lines = ["Compiled {} templates in {:.2f}s, {} failed.".format(
+        report['templates'], report['seconds'], len(report['failures']))]
+    for (name, error) in report['failures']:
+        lines.append("  Failed: {}: {}".format(name, error))
+    if slowest and report['timings']:
+        lines.append("Slowest:")
+        lines.extend("  {:8.1f}ms  {}".format(seconds * 1000, name)
+                     for (seconds, name) in report['timings'][:slowest])
+    return '\n'.join(lines)
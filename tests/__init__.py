@@ -0,0 +1,14 @@
+try:
+    import django
+except ImportError:
+    django = None
+
+
+def setup_django():
+    """Configure Django's settings, once, for the tests which need them."""
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(DEBUG=False)
+        if hasattr(django, 'setup'):
+            # Django >= 1.7
+            django.setup()
@@ -0,0 +1,88 @@
+from __future__ import absolute_import
+import unittest
+from . import django, setup_django
+
+
+@unittest.skipIf(django is None, "Django isn't installed")
+class TieredCacheTestCase(unittest.TestCase):
+    """Two processes' TieredCaches, with their own L1s, sharing an L2."""
+    def setUp(self):
+        from django.core.cache.backends.locmem import LocMemCache
+        from cinch import cache_backends
+        setup_django()
+        self.module = cache_backends
+        self.saved_generations = cache_backends._generations
+        self.l2 = LocMemCache('cinch-tests-l2', {})
+        self.l2.clear()
+        self.processes = [self.process(LocMemCache('cinch-tests-l1-{}'.format(i), {}))
+                          for i in range(2)]
+
+    def tearDown(self):
+        self.module._generations = self.saved_generations
+
+    def process(self, l1):
+        l1.clear()
+        cache = self.module.TieredCache('cinch-tests', {'OPTIONS': {
+            'L1': 'l1', 'L2': 'l2', 'L1_TIMEOUT': 60, 'GENERATION_INTERVAL': 0}})
+        cache._l1, cache._l2 = l1, self.l2
+        return cache, {}
+
+    def in_process(self, number):
+        """Return process ``number``'s cache, with its generations."""
+        cache, generations = self.processes[number]
+        self.module._generations = generations
+        return cache
+
+    def cache_in_both(self, key, value):
+        self.in_process(0).set(key, value)
+        self.assertEqual(self.in_process(1).get(key), value)
+        l1_hits = self.in_process(1).stats['l1_hits']
+        self.assertEqual(self.in_process(1).get(key), value)
+        self.assertEqual(self.in_process(1).stats['l1_hits'], l1_hits + 1)
+
+    def test_delete_reaches_other_processes(self):
+        self.cache_in_both('a', 1)
+        self.cache_in_both('b', 2)
+        self.in_process(0).delete('a')
+        self.assertIsNone(self.in_process(1).get('a'))
+        self.assertEqual(self.in_process(1).get('b'), 2)
+
+    def test_delete_many_reaches_other_processes(self):
+        self.cache_in_both('a', 1)
+        self.cache_in_both('b', 2)
+        self.in_process(0).delete_many(['a', 'b'])
+        self.assertEqual(self.in_process(1).get_many(['a', 'b']), {})
+
+    def test_incr_reaches_other_processes(self):
+        self.cache_in_both('count', 1)
+        self.assertEqual(self.in_process(0).incr('count'), 2)
+        self.assertEqual(self.in_process(1).get('count'), 2)
+
+    def test_versions(self):
+        self.in_process(0).set('a', 'v1', version=1)
+        self.in_process(0).set('a', 'v2', version=2)
+        self.in_process(1).get('a', version=1)
+        self.in_process(1).get('a', version=2)
+        self.in_process(0).delete('a', version=2)
+        self.assertEqual(self.in_process(1).get('a', version=1), 'v1')
+        self.assertIsNone(self.in_process(1).get('a', version=2))
+
+    def test_missed_tombstone_drops_l1(self):
+        self.cache_in_both('a', 1)
+        self.cache_in_both('b', 2)
+        cache = self.in_process(0)
+        cache.delete('a')
+        self.l2.delete(cache._tombstone_key(1))
+        self.l2.set('a', 'changed')
+        cache = self.in_process(1)
+        self.assertEqual(cache.get('a'), 'changed')
+        # Dropped from L1 too, so read from L2.
+        l2_hits = cache.stats['l2_hits']
+        self.assertEqual(cache.get('b'), 2)
+        self.assertEqual(cache.stats['l2_hits'], l2_hits + 1)
+
+    def test_invalidate(self):
+        self.cache_in_both('a', 1)
+        self.l2.set('a', 'changed')
+        self.in_process(0).invalidate()
+        self.assertEqual(self.in_process(1).get('a'), 'changed')
@@ -0,0 +1,22 @@
+from __future__ import absolute_import
+import unittest
+from cinch.databases import DatabasesSetting
+
+
+class DatabasesSettingTestCase(unittest.TestCase):
+    def test_plain_sqlite(self):
+        settings = DatabasesSetting().add('default', 'sqlite3', 'default.db')
+        self.assertEqual(settings['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertNotIn('SQLITE_MAINTENANCE_INTERVAL', settings)
+
+    def test_maintenance_interval_uses_cinch_backend(self):
+        settings = DatabasesSetting().add('default', 'sqlite3', 'default.db',
+                                          sqlite_maintenance_interval=300)
+        self.assertEqual((settings['ENGINE'], settings['SQLITE_MAINTENANCE_INTERVAL']),
+                         ('cinch.db.backends.sqlite3', 300))
+        self.assertNotIn('PRAGMAS', settings)
+
+    def test_maintenance_interval_is_only_for_sqlite(self):
+        with self.assertRaises(ValueError):
+            DatabasesSetting().add('default', 'postgresql_psycopg2', 'db',
+                                   sqlite_maintenance_interval=300)
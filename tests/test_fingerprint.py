@@ -0,0 +1,70 @@
+from __future__ import absolute_import
+import unittest
+from cinch.caches import CachesSetting
+from cinch.fingerprint import apply_fingerprint, settings_fingerprint
+from cinch.layered import LayeredDict
+
+
+class Thing(object):
+    pass
+
+
+class SettingsFingerprintTestCase(unittest.TestCase):
+    settings = {
+        'INSTALLED_APPS': ['django.contrib.auth', 'cinch'],
+        'LANGUAGES': (('en', 'English'), ('fr', 'French')),
+        'TEMPLATE_DIRS': set(['/b', '/a']),
+        'SITE_ID': 1,
+        'SECRET_KEY': 'secret',
+    }
+
+    def test_stable_whatever_the_order(self):
+        reordered = dict(self.settings, TEMPLATE_DIRS=set(['/a', '/b']))
+        self.assertEqual(settings_fingerprint(self.settings), settings_fingerprint(reordered))
+        self.assertEqual(len(settings_fingerprint(self.settings)), 12)
+
+    def test_changes_with_fingerprinted_settings(self):
+        changed = dict(self.settings, SITE_ID=2)
+        self.assertNotEqual(settings_fingerprint(self.settings), settings_fingerprint(changed))
+
+    def test_ignores_other_and_excluded_settings(self):
+        changed = dict(self.settings, SECRET_KEY='another secret', SITE_ID=2)
+        self.assertEqual(settings_fingerprint(self.settings, exclude=['SITE_ID']),
+                         settings_fingerprint(changed, exclude=['SITE_ID']))
+
+    def test_objects_go_by_their_type(self):
+        # Whose repr() includes their address, which differs between processes.
+        first = dict(self.settings, HOST_OVERLAYS=Thing())
+        second = dict(self.settings, HOST_OVERLAYS=Thing())
+        self.assertEqual(settings_fingerprint(first), settings_fingerprint(second))
+
+    def test_layered_settings_go_by_their_values(self):
+        base = LayeredDict({'a': 1})
+        first = dict(self.settings, HOST_OVERLAYS=base)
+        second = dict(self.settings, HOST_OVERLAYS={'a': 1})
+        self.assertEqual(settings_fingerprint(first), settings_fingerprint(second))
+
+
+class ApplyFingerprintTestCase(unittest.TestCase):
+    def test_fingerprint_is_added_to_cache_key_prefixes(self):
+        caches = CachesSetting()
+        caches.add('default', key_prefix='site')
+        caches.add('sessions', fingerprint=False)
+        settings = {'SITE_ID': 1, 'CACHES': caches}
+        fingerprint = apply_fingerprint(settings)
+        self.assertEqual(settings['CINCH_SETTINGS_FINGERPRINT'], fingerprint)
+        self.assertEqual(caches['default']['KEY_PREFIX'], 'site:' + fingerprint)
+        self.assertNotIn('KEY_PREFIX', caches['sessions'])
+        # Applied again, the new fingerprint replaces the old.
+        settings['SITE_ID'] = 2
+        new_fingerprint = apply_fingerprint(settings)
+        self.assertNotEqual(new_fingerprint, fingerprint)
+        self.assertEqual(caches['default']['KEY_PREFIX'], 'site:' + new_fingerprint)
+
+    def test_chosen_settings(self):
+        settings = {'SITE_ID': 1, 'CINCH_FINGERPRINT_SETTINGS': ['DEBUG'], 'DEBUG': False}
+        fingerprint = apply_fingerprint(settings)
+        settings['SITE_ID'] = 2
+        self.assertEqual(apply_fingerprint(settings), fingerprint)
+        settings['DEBUG'] = True
+        self.assertNotEqual(apply_fingerprint(settings), fingerprint)
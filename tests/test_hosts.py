@@ -0,0 +1,100 @@
+from __future__ import absolute_import
+import unittest
+from cinch.hosts import HostMatcher, split_domain
+from . import django, setup_django
+
+
+PATTERNS = ['example.com', '.example.org', 'Mixed.Example.net', '[::1]'] + \
+    ['tenant{}.example.com'.format(i) for i in range(200)]
+
+HOSTS = [
+    'example.com', 'EXAMPLE.com', 'example.com:8000', 'example.com.', 'www.example.com',
+    'example.org', 'www.example.org', 'a.b.example.org:443', 'badexample.org',
+    'example.org.evil.com', 'mixed.example.net', 'www.mixed.example.net', '[::1]', '[::1]:80',
+    'tenant7.example.com', 'tenant7.example.com.evil.com', 'tenant200.example.com',
+    '', 'example.com:bad', 'exa mple.com', 'example.com/path', '.example.org',
+]
+
+
+class HostMatcherTestCase(unittest.TestCase):
+    def test_matches(self):
+        matcher = HostMatcher(PATTERNS)
+        self.assertEqual([host for host in HOSTS if matcher.validate(host)], [
+            'example.com', 'EXAMPLE.com', 'example.com:8000', 'example.com.', 'example.org',
+            'www.example.org', 'a.b.example.org:443', 'mixed.example.net', '[::1]', '[::1]:80',
+            'tenant7.example.com', '.example.org'])
+
+    def test_match_all(self):
+        matcher = HostMatcher(['*'])
+        self.assertTrue(matcher.validate('anything.example.com'))
+        self.assertFalse(matcher.validate('not a host'))
+
+    def test_most_specific_pattern(self):
+        matcher = HostMatcher(['.example.org', '.www.example.org', 'example.com'])
+        self.assertEqual(matcher.match('a.www.example.org'), '.www.example.org')
+        self.assertEqual(matcher.match('a.example.org'), '.example.org')
+        self.assertEqual(matcher.match('example.com'), 'example.com')
+        self.assertIsNone(matcher.match('www.example.com'))
+
+    @unittest.skipIf(django is None, "Django isn't installed")
+    def test_as_django(self):
+        from django.http.request import validate_host
+        matcher = HostMatcher(PATTERNS)
+        for host in HOSTS:
+            domain = split_domain(host)
+            self.assertEqual(matcher.validate(host),
+                             bool(domain) and validate_host(domain, PATTERNS), host)
+
+
+@unittest.skipIf(django is None, "Django isn't installed")
+class HostValidationMiddlewareTestCase(unittest.TestCase):
+    def setUp(self):
+        from django.http import request as request_module
+        from django.test.utils import override_settings
+        setup_django()
+        self.override = override_settings(ALLOWED_HOSTS=PATTERNS, DEBUG=False,
+                                          CINCH_COMPILE_ALLOWED_HOSTS=100)
+        self.override.enable()
+        # Count Django's own checks of ALLOWED_HOSTS.
+        self.scans = []
+        self.validate_host = request_module.validate_host
+        request_module.validate_host = lambda *args: (self.scans.append(args) or
+                                                      self.validate_host(*args))
+
+    def tearDown(self):
+        from django.http import request as request_module
+        request_module.validate_host = self.validate_host
+        self.override.disable()
+
+    def request(self, host):
+        from django.http import HttpRequest
+        request = HttpRequest()
+        request.META = {'HTTP_HOST': host, 'SERVER_NAME': 'testserver', 'SERVER_PORT': '80'}
+        return request
+
+    def test_allowed_host_skips_scan(self):
+        from cinch.hosts import HostValidationMiddleware
+        middleware = HostValidationMiddleware()
+        request = self.request('tenant150.example.com:8000')
+        self.assertIsNone(middleware.process_request(request))
+        self.assertEqual(request.get_host(), 'tenant150.example.com:8000')
+        self.assertEqual(self.scans, [])
+        # Without the middleware, Django scans them.
+        self.assertEqual(self.request('tenant150.example.com').get_host(),
+                         'tenant150.example.com')
+        self.assertEqual(len(self.scans), 1)
+
+    def test_disallowed_host(self):
+        from django.core.exceptions import SuspiciousOperation
+        from cinch.hosts import HostValidationMiddleware
+        middleware = HostValidationMiddleware()
+        self.assertRaises(SuspiciousOperation, middleware.process_request,
+                          self.request('tenant150.example.com.evil.com'))
+        self.assertEqual(self.scans, [])
+
+    def test_unused_for_short_lists(self):
+        from django.core.exceptions import MiddlewareNotUsed
+        from django.test.utils import override_settings
+        from cinch.hosts import HostValidationMiddleware
+        with override_settings(ALLOWED_HOSTS=PATTERNS[:10]):
+            self.assertRaises(MiddlewareNotUsed, HostValidationMiddleware)
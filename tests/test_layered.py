@@ -0,0 +1,71 @@
+from __future__ import absolute_import
+import copy
+import pickle
+import unittest
+from cinch.layered import LayeredDict
+
+
+def defaults():
+    return {
+        'version': 1,
+        'handlers': {
+            'console': {'class': 'logging.StreamHandler', 'filters': ['require_debug']},
+        },
+        'loggers': {
+            'django': {'handlers': ['console'], 'level': 'INFO'},
+        },
+    }
+
+
+class LayeredDictTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base = defaults()
+        self.conf = LayeredDict(self.base)
+
+    def test_writes_leave_layers_alone(self):
+        self.conf['loggers']['django']['level'] = 'DEBUG'
+        self.conf['handlers']['file'] = {'class': 'logging.FileHandler'}
+        del self.conf['handlers']['console']
+        self.assertEqual(self.conf['loggers']['django']['level'], 'DEBUG')
+        self.assertEqual(list(self.conf['handlers']), ['file'])
+        self.assertEqual(self.base, defaults())
+
+    def test_lists_read_through_views_are_copies(self):
+        self.conf['handlers']['console']['filters'].append('sampled')
+        self.conf['loggers']['django']['handlers'].append('file')
+        self.assertEqual(self.conf['handlers']['console']['filters'],
+                         ['require_debug', 'sampled'])
+        self.assertEqual(self.conf.resolve()['loggers']['django']['handlers'],
+                         ['console', 'file'])
+        self.assertEqual(self.base, defaults())
+
+    def test_resolve_copies_lists(self):
+        resolved = self.conf.resolve()
+        resolved['handlers']['console']['filters'].append('sampled')
+        resolved['loggers']['django']['level'] = 'DEBUG'
+        self.assertEqual(self.base, defaults())
+        self.assertEqual(self.conf.resolve(), defaults())
+
+    def test_deep_update(self):
+        overlay = {'loggers': {'django': {'level': 'WARNING'}, 'app': {'level': 'ERROR'}}}
+        self.conf.deep_update(overlay)
+        self.conf['loggers']['app']['handlers'] = ['console']
+        expected = defaults()
+        expected['loggers']['django']['level'] = 'WARNING'
+        expected['loggers']['app'] = {'level': 'ERROR', 'handlers': ['console']}
+        self.assertEqual(self.conf.resolve(), expected)
+        self.assertEqual(overlay, {'loggers': {'django': {'level': 'WARNING'},
+                                               'app': {'level': 'ERROR'}}})
+        self.assertEqual(self.base, defaults())
+
+    def test_views_see_later_writes(self):
+        loggers = self.conf['loggers']
+        self.conf['loggers'] = {'app': {}}
+        self.assertEqual(list(loggers), ['app'])
+
+    def test_pickle_and_copy(self):
+        self.conf['loggers']['django']['level'] = 'DEBUG'
+        del self.conf['version']
+        for conf in (pickle.loads(pickle.dumps(self.conf)), copy.deepcopy(self.conf)):
+            self.assertEqual(conf.resolve(), self.conf.resolve())
+            self.assertNotIn('version', conf)
@@ -0,0 +1,83 @@
+from __future__ import absolute_import
+import unittest
+from os import path
+from cinch.lazy import lazy_setting
+from cinch.mixins import FHSDirsMixin, MediaMixin, SetDefaultMixin
+
+
+class Settings(SetDefaultMixin):
+    VAR_DIR = '/a/var'
+
+    @lazy_setting
+    def LOG_DIR(cnf):
+        return path.join(cnf.VAR_DIR, 'log')
+
+    @lazy_setting
+    def ERROR_LOG(cnf):
+        return path.join(cnf.LOG_DIR, 'error.log')
+
+
+class LazySettingsTestCase(unittest.TestCase):
+    def test_lazy_settings_are_memoised(self):
+        calls = []
+        settings = Settings()
+        settings.setdefault_lazy('TMP_DIR', lambda s: calls.append(1) or '/tmp')
+        self.assertEqual((settings.TMP_DIR, settings.TMP_DIR), ('/tmp', '/tmp'))
+        self.assertEqual(calls, [1])
+
+    def test_setting_a_lazy_dependency_forgets_dependents(self):
+        settings = Settings()
+        self.assertEqual(settings.ERROR_LOG, '/a/var/log/error.log')
+        settings.LOG_DIR = '/logs'
+        self.assertEqual(settings.ERROR_LOG, '/logs/error.log')
+
+    def test_setting_a_plain_dependency_forgets_dependents(self):
+        settings = Settings()
+        self.assertEqual(settings.ERROR_LOG, '/a/var/log/error.log')
+        settings.VAR_DIR = '/b/var'
+        self.assertEqual((settings.LOG_DIR, settings.ERROR_LOG),
+                         ('/b/var/log', '/b/var/log/error.log'))
+
+    def test_setting_a_missing_dependency_forgets_dependents(self):
+        class MediaSettings(MediaMixin, SetDefaultMixin):
+            VAR_DIR = '/a/var'
+        settings = MediaSettings()
+        settings.setup()
+        self.assertEqual(settings.FILE_UPLOAD_TEMP_DIR, '/a/var/tmp')
+        settings.TMP_DIR = '/tmp'
+        self.assertEqual(settings.FILE_UPLOAD_TEMP_DIR, '/tmp')
+
+    def test_fhs_dirs_follow_project_path(self):
+        class FHSSettings(FHSDirsMixin):
+            pass
+        settings = FHSSettings()
+        settings.PROJECT_PATH = '/a'
+        self.assertEqual(settings.ETC_DIR, '/a/etc')
+        settings.PROJECT_PATH = '/b'
+        self.assertEqual((settings.ETC_DIR, settings.ETC_LOCAL_DIR), ('/b/etc', '/b/etc/local'))
+
+    def test_explicit_settings_are_kept(self):
+        settings = Settings()
+        self.assertEqual(settings.LOG_DIR, '/a/var/log')
+        settings.ERROR_LOG = '/errors.log'
+        settings.VAR_DIR = '/b/var'
+        self.assertEqual(settings.ERROR_LOG, '/errors.log')
+
+    def test_circular_lazy_settings(self):
+        settings = Settings()
+        settings.setdefault_lazy('FIRST', lambda s: s.SECOND)
+        settings.setdefault_lazy('SECOND', lambda s: s.FIRST)
+        with self.assertRaises(RuntimeError):
+            settings.FIRST
+
+
+class SetDefaultTestCase(unittest.TestCase):
+    def test_defaults_are_per_instance(self):
+        first, second = Settings(), Settings()
+        first.setdefault('DEBUG', False)
+        second.DEBUG = True
+        self.assertFalse(first.explicit('DEBUG'))
+        self.assertTrue(second.explicit('DEBUG'))
+        first.DEBUG = True
+        self.assertTrue(first.explicit('DEBUG'))
+        self.assertEqual(second.setdefault('DEBUG', False), True)
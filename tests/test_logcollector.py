@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+import os
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from cinch.logcollector import LogCollector, recv_message, send_message
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import logging, sys
+from cinch.loghandlers import CollectorHandler
+socket_path, filename, count = sys.argv[1], sys.argv[2], int(sys.argv[3])
+handler = CollectorHandler(
+    {'class': 'logging.FileHandler', 'filename': filename,
+     'formatter': {'format': '%(process)d %(message)s'}},
+    socket_path, batch_size=10, spawn=False)
+logger = logging.getLogger('worker')
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+for i in range(count):
+    logger.info('record %d', i)
+handler.close()
+"""
+
+
+class LogCollectorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'collector.sock')
+        self.log_path = os.path.join(self.tmp_dir, 'app.log')
+        self.collector = LogCollector(self.socket_path, idle_timeout=60)
+        self.server_thread = threading.Thread(target=self.collector.serve)
+        self.server_thread.start()
+        deadline = time.time() + 10
+        while not os.path.exists(self.socket_path) and time.time() < deadline:
+            time.sleep(0.01)
+
+    def tearDown(self):
+        self.collector.stop()
+        self.server_thread.join(10)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_socket_is_private(self):
+        mode = stat.S_IMODE(os.stat(self.socket_path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+    def test_messages_are_data(self):
+        left, right = socket.socketpair()
+        try:
+            send_message(left, ['records', [['key', {'msg': u'caf\xe9', 'levelno': 20}]]])
+            self.assertEqual(recv_message(right),
+                             ['records', [['key', {'msg': u'caf\xe9', 'levelno': 20}]]])
+        finally:
+            left.close()
+            right.close()
+
+    def test_processes_write_through_collector(self):
+        processes, count = 4, 50
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT_DIR, env.get('PYTHONPATH')]))
+        workers = [subprocess.Popen([sys.executable, '-c', WORKER, self.socket_path,
+                                     self.log_path, str(count)], env=env)
+                   for i in range(processes)]
+        self.assertEqual([worker.wait() for worker in workers], [0] * processes)
+        deadline = time.time() + 10
+        while self.collector.written < processes * count and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.collector.written, processes * count)
+        self.collector.stop()
+        self.server_thread.join(10)
+        with open(self.log_path) as log_f:
+            lines = log_f.read().splitlines()
+        self.assertEqual(len(lines), processes * count)
+        pids = set(line.split()[0] for line in lines)
+        self.assertEqual(len(pids), processes)
+        for pid in pids:
+            self.assertEqual(sorted(line.split(None, 1)[1] for line in lines
+                                    if line.split()[0] == pid),
+                             sorted('record {}'.format(i) for i in range(count)))
+
+
+class CollectorHandlerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_falls_back_without_waiting(self):
+        import logging
+        from cinch.loghandlers import CollectorHandler
+        log_path = os.path.join(self.tmp_dir, 'app.log')
+        handler = CollectorHandler(
+            {'class': 'logging.FileHandler', 'filename': log_path,
+             'formatter': logging.Formatter('%(message)s')},
+            os.path.join(self.tmp_dir, 'missing.sock'), spawn=False)
+        handler.handle(logging.makeLogRecord({'msg': 'hello', 'levelno': logging.INFO}))
+        start = time.time()
+        handler.close()
+        self.assertLess(time.time() - start, 1)
+        with open(log_path) as log_f:
+            self.assertEqual(log_f.read(), 'hello\n')
+
+    def test_record_left_intact(self):
+        import logging
+        from cinch.loghandlers import CollectorHandler
+        handler = CollectorHandler(
+            {'class': 'logging.NullHandler'}, os.path.join(self.tmp_dir, 'missing.sock'),
+            spawn=False)
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.makeLogRecord({'msg': 'failed %s', 'args': ('here',),
+                                            'levelno': logging.ERROR,
+                                            'exc_info': sys.exc_info()})
+        record_dict = handler.prepare(record)
+        handler.close()
+        self.assertEqual(record_dict['msg'], 'failed here')
+        self.assertIn('ValueError: boom', record_dict['exc_text'])
+        self.assertEqual((record.msg, record.args), ('failed %s', ('here',)))
+        self.assertIs(record.exc_info[0], ValueError)
+
+    def test_spawned_collector_is_reaped(self):
+        from cinch.loghandlers import CollectorHandler
+        handler = CollectorHandler(
+            {'class': 'logging.NullHandler'}, os.path.join(self.tmp_dir, 'spawned.sock'),
+            spawn=False, idle_timeout=0.5)
+        collector = handler._spawn_collector()
+        handler.close()
+        deadline = time.time() + 10
+        while collector.returncode is None and time.time() < deadline:
+            time.sleep(0.05)
+        # Waited for by the reaper thread, rather than left a zombie.
+        self.assertEqual(collector.returncode, 0)
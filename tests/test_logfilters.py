@@ -0,0 +1,57 @@
+from __future__ import absolute_import
+import gc
+import logging
+import unittest
+import weakref
+from cinch import logfilters
+from cinch.logfilters import RateLimitFilter, SamplingFilter
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class SuppressingFilterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.summaries = ListHandler()
+        self.summary_logger = logging.getLogger('cinch.tests.logfilters.summary')
+        self.summary_logger.propagate = False
+        self.summary_logger.addHandler(self.summaries)
+
+    def tearDown(self):
+        self.summary_logger.removeHandler(self.summaries)
+
+    def record(self, msg='hello', name='cinch.tests.logfilters'):
+        return logging.makeLogRecord({'name': name, 'msg': msg, 'levelno': logging.INFO,
+                                      'levelname': 'INFO'})
+
+    def test_sampling(self):
+        log_filter = SamplingFilter(rate=3, summary_logger=self.summary_logger.name)
+        kept = [log_filter.filter(self.record()) for i in range(7)]
+        self.assertEqual(kept, [True, False, False, True, False, False, True])
+        log_filter.close()
+        summary, = self.summaries.records
+        self.assertIn('suppressed 4 records', summary.getMessage())
+
+    def test_rate_limit_by_template(self):
+        log_filter = RateLimitFilter(rate=0.001, burst=2,
+                                     summary_logger=self.summary_logger.name)
+        kept = [log_filter.filter(self.record(msg)) for msg in ('a', 'a', 'a', 'b')]
+        self.assertEqual(kept, [True, True, False, True])
+        log_filter.close()
+
+    def test_closed_at_exit_without_being_kept_alive(self):
+        log_filter = SamplingFilter(rate=2, summary_logger=self.summary_logger.name)
+        log_filter.filter(self.record())
+        log_filter.filter(self.record())
+        logfilters._close_filters()
+        self.assertEqual(len(self.summaries.records), 1)
+        filter_ref = weakref.ref(log_filter)
+        del log_filter
+        gc.collect()
+        self.assertIsNone(filter_ref())
@@ -0,0 +1,32 @@
+from __future__ import absolute_import
+import json
+import logging
+import sys
+import unittest
+from collections import OrderedDict
+from cinch.logformatters import JSONLinesFormatter
+
+
+class JSONLinesFormatterTestCase(unittest.TestCase):
+    def record(self, msg='Hello %s', args=('world',), exc_info=None):
+        return logging.LogRecord('cinch.tests', logging.INFO, __file__, 10,
+                                 msg, args, exc_info)
+
+    def test_fields_keep_their_order(self):
+        fields = ('thread', 'name', 'message', 'lineno', 'levelname', 'asctime', 'process')
+        line = JSONLinesFormatter(fields).format(self.record())
+        data = json.loads(line, object_pairs_hook=OrderedDict)
+        self.assertEqual(tuple(data), fields)
+        self.assertEqual((data['message'], data['lineno']), ('Hello world', 10))
+
+    def test_missing_fields_are_null(self):
+        line = JSONLinesFormatter(('name', 'request_id')).format(self.record())
+        self.assertEqual(json.loads(line), {'name': 'cinch.tests', 'request_id': None})
+
+    def test_exceptions_are_included(self):
+        try:
+            raise ValueError('oops')
+        except ValueError:
+            record = self.record(exc_info=sys.exc_info())
+        data = json.loads(JSONLinesFormatter(('message',)).format(record))
+        self.assertIn('ValueError: oops', data['exc_info'])
@@ -0,0 +1,66 @@
+from __future__ import absolute_import
+import logging
+import os
+import unittest
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from cinch.loghandlers import QueueHandler, QueueListener
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class QueueHandlerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.target = ListHandler()
+        self.handler = QueueHandler(self.target)
+        self.other = ListHandler()
+        self.logger = logging.getLogger('cinch.tests.loghandlers')
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.logger.addHandler(self.other)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.removeHandler(self.other)
+        self.handler.close()
+
+    def test_records_are_queued(self):
+        self.logger.error('record %d', 1)
+        self.handler.listener.stop()
+        self.assertEqual([record.msg for record in self.target.records], ['record 1'])
+
+    def test_later_handlers_keep_exception(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            self.logger.exception('failed %s', 'here')
+        self.handler.listener.stop()
+        queued, = self.target.records
+        self.assertIsNone(queued.exc_info)
+        self.assertIn('ValueError: boom', queued.exc_text)
+        record, = self.other.records
+        self.assertEqual((record.msg, record.args), ('failed %s', ('here',)))
+        self.assertIs(record.exc_info[0], ValueError)
+        self.assertIsNot(record, queued)
+
+
+class QueueListenerTestCase(unittest.TestCase):
+    def test_drop_oldest_keeps_stop_sentinel(self):
+        listener = QueueListener(maxsize=1, overflow='drop-oldest')
+        # As if stop() had just queued its sentinel, with the queue full.
+        listener._pid = os.getpid()
+        listener.queue = queue.Queue(1)
+        listener.queue.put((None, None))
+        record = logging.makeLogRecord({'msg': 'late'})
+        listener.enqueue(ListHandler(), record)
+        self.assertEqual(listener.queue.get_nowait(), (None, None))
+        self.assertEqual(listener.dropped, 1)
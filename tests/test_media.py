@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+import unittest
+from . import django, setup_django
+
+
+@unittest.skipIf(django is None, "Django isn't installed")
+class MediaTestCase(unittest.TestCase):
+    def setUp(self):
+        from django.test.utils import override_settings
+        setup_django()
+        self.tmp_dir = os.path.realpath(tempfile.mkdtemp())
+        self.root = os.path.join(self.tmp_dir, 'media')
+        os.makedirs(os.path.join(self.root, 'docs'))
+        self.write(os.path.join(self.root, 'docs', 'report.txt'), 'report')
+        self.write(os.path.join(self.tmp_dir, 'secret.txt'), 'secret')
+        # A sibling whose name starts with MEDIA_ROOT's.
+        os.makedirs(os.path.join(self.tmp_dir, 'media-private'))
+        self.write(os.path.join(self.tmp_dir, 'media-private', 'key.txt'), 'key')
+        self.override = override_settings(MEDIA_ROOT=self.root, CINCH_MEDIA_SENDFILE=None)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, path, content):
+        with open(path, 'w') as file_f:
+            file_f.write(content)
+
+
+class MediaPathTestCase(MediaTestCase):
+    def assertNotFound(self, name):
+        from django.http import Http404
+        from cinch.media import media_path
+        self.assertRaises(Http404, media_path, name)
+
+    def test_files_under_media_root(self):
+        from cinch.media import media_path
+        report = os.path.join(self.root, 'docs', 'report.txt')
+        for name in ('docs/report.txt', '/docs/report.txt', 'docs/./report.txt',
+                     'docs/../docs/report.txt'):
+            self.assertEqual(media_path(name), report, name)
+
+    def test_parent_directories(self):
+        for name in ('../secret.txt', 'docs/../../secret.txt', '../media-private/key.txt',
+                     '..', '../media/../secret.txt'):
+            self.assertNotFound(name)
+
+    def test_absolute_paths_are_under_media_root(self):
+        self.assertNotFound(os.path.join(self.tmp_dir, 'secret.txt'))
+
+    def test_symlinks_out_of_media_root(self):
+        os.symlink(os.path.join(self.tmp_dir, 'secret.txt'),
+                   os.path.join(self.root, 'secret.txt'))
+        os.symlink(self.tmp_dir, os.path.join(self.root, 'up'))
+        self.assertNotFound('secret.txt')
+        self.assertNotFound('up/secret.txt')
+
+    def test_symlinks_within_media_root(self):
+        from cinch.media import media_path
+        os.symlink(os.path.join(self.root, 'docs', 'report.txt'),
+                   os.path.join(self.root, 'latest.txt'))
+        self.assertEqual(media_path('latest.txt'), os.path.join(self.root, 'docs', 'report.txt'))
+
+    def test_media_root_through_a_symlink(self):
+        from django.test.utils import override_settings
+        from cinch.media import media_path
+        link = os.path.join(self.tmp_dir, 'media-link')
+        os.symlink(self.root, link)
+        with override_settings(MEDIA_ROOT=link):
+            self.assertEqual(media_path('docs/report.txt'),
+                             os.path.join(self.root, 'docs', 'report.txt'))
+            self.assertNotFound('../secret.txt')
+
+    def test_directories_and_missing_files(self):
+        self.assertNotFound('docs')
+        self.assertNotFound('')
+        self.assertNotFound('docs/missing.txt')
+
+    def test_media_root_must_be_set(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from django.test.utils import override_settings
+        from cinch.media import media_path
+        with override_settings(MEDIA_ROOT=''):
+            self.assertRaises(ImproperlyConfigured, media_path, 'docs/report.txt')
+
+
+class MediaResponseTestCase(MediaTestCase):
+    def test_streamed(self):
+        from cinch.media import media_response
+        response = media_response('docs/report.txt')
+        self.assertEqual(b''.join(response.streaming_content), b'report')
+        self.assertEqual((response['Content-Type'], response['Content-Length']),
+                         ('text/plain', '6'))
+        response.close()
+
+    def test_not_modified(self):
+        from django.http import HttpRequest
+        from cinch.media import media_response
+        request = HttpRequest()
+        request.META['HTTP_IF_MODIFIED_SINCE'] = media_response(
+            'docs/report.txt', as_attachment=True)['Last-Modified']
+        self.assertEqual(media_response('docs/report.txt', request).status_code, 304)
+
+    def test_sendfile(self):
+        from django.test.utils import override_settings
+        from cinch.media import media_response
+        with override_settings(CINCH_MEDIA_SENDFILE='x-sendfile'):
+            response = media_response('docs/report.txt')
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.root, 'docs', 'report.txt'))
+        self.write(os.path.join(self.root, 'docs', 'a report.txt'), 'report')
+        with override_settings(CINCH_MEDIA_SENDFILE='x-accel-redirect'):
+            response = media_response('docs/a report.txt')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/docs/a%20report.txt')
+        self.assertEqual(response.content, b'')
+
+    def test_content_disposition(self):
+        from cinch.media import content_disposition
+        self.assertEqual(content_disposition('attachment', 'Résumé "final".pdf'),
+                         'attachment; filename="R?sum? final.pdf"; '
+                         "filename*=UTF-8''R%C3%A9sum%C3%A9%20%22final%22.pdf")
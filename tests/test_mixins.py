@@ -0,0 +1,67 @@
+from __future__ import absolute_import
+import unittest
+from cinch import cinch_settings
+from cinch.lazy import lazy_setting
+from cinch.mixins import SetDefaultMixin
+
+
+class Mixin(object):
+    MIXIN_SETTING = 'mixin'
+    _private = 'private'
+
+
+class BaseSettings(SetDefaultMixin):
+    DEBUG = False
+    SITE_ID = 1
+    helper = 'not a setting'
+    _PRIVATE = 'not a setting'
+
+
+class Settings(Mixin, BaseSettings):
+    SITE_ID = 2
+
+    @lazy_setting
+    def LOG_DIR(cnf):
+        return '/var/log'
+
+
+class SettingsRegistryTestCase(unittest.TestCase):
+    def test_declared_settings(self):
+        self.assertEqual(sorted(BaseSettings._declared_settings), ['DEBUG', 'SITE_ID'])
+        self.assertEqual(sorted(Settings._declared_settings), ['LOG_DIR', 'SITE_ID'])
+
+    def test_setting_names_follow_the_mro(self):
+        self.assertEqual(Settings._setting_names, ('DEBUG', 'SITE_ID', 'MIXIN_SETTING', 'LOG_DIR'))
+        self.assertEqual(Settings._setting_names_set, frozenset(Settings._setting_names))
+
+    def test_instance_settings_are_included(self):
+        settings = Settings()
+        settings.ALLOWED_HOSTS = ['example.com']
+        settings.setdefault_lazy('TMP_DIR', lambda s: '/tmp')
+        settings.SITE_ID = 3
+        self.assertEqual(settings.setting_names(),
+                         ['DEBUG', 'SITE_ID', 'MIXIN_SETTING', 'LOG_DIR',
+                          'ALLOWED_HOSTS', 'TMP_DIR'])
+
+    def test_settings_added_later_reach_subclasses(self):
+        class Base(SetDefaultMixin):
+            DEBUG = False
+
+        class Sub(Base):
+            pass
+        Base.TIME_ZONE = 'UTC'
+        Base.lower = 'not a setting'
+        self.assertEqual(Base._declared_settings, ('DEBUG', 'TIME_ZONE'))
+        self.assertEqual(Sub._setting_names, ('DEBUG', 'TIME_ZONE'))
+        self.assertIn('TIME_ZONE', Sub._setting_names_set)
+        self.assertNotIn('lower', Sub._setting_names_set)
+
+    def test_cinch_settings_exports_setting_names(self):
+        settings_globals = {'Settings': Settings}
+        cinch_settings(settings_globals, 'Settings')
+        for name in ('DEBUG', 'SITE_ID', 'MIXIN_SETTING', 'LOG_DIR'):
+            self.assertIn(name, settings_globals)
+        self.assertEqual((settings_globals['SITE_ID'], settings_globals['LOG_DIR']),
+                         (2, '/var/log'))
+        for name in ('helper', '_PRIVATE', '_private'):
+            self.assertNotIn(name, settings_globals)
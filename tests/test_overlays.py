@@ -0,0 +1,156 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+from cinch.overlays import HostOverlays, HostSettings, add_host_overlays
+from . import django, setup_django
+
+
+class Settings(object):
+    """Stands in for django.conf.settings."""
+    ROOT_URLCONF = 'base.urls'
+    SITE_ID = 1
+    CACHES = {'default': {'BACKEND': 'locmem', 'KEY_PREFIX': 'base', 'TIMEOUT': 60}}
+
+
+OVERLAYS = {
+    'Example.com': {'ROOT_URLCONF': 'example.urls', 'SITE_ID': 2},
+    '.example.org': {'CACHES': {'default': {'KEY_PREFIX': 'example.org'}}},
+}
+
+
+class HostSettingsTestCase(unittest.TestCase):
+    def test_overlay_over_base(self):
+        view = HostSettings(Settings(), OVERLAYS['Example.com'], 'example.com')
+        self.assertEqual((view.ROOT_URLCONF, view.SITE_ID), ('example.urls', 2))
+        self.assertEqual(view.CACHES, Settings.CACHES)
+        with self.assertRaises(AttributeError):
+            view.MISSING
+
+    def test_dicts_are_merged(self):
+        view = HostSettings(Settings(), OVERLAYS['.example.org'], '.example.org')
+        self.assertEqual(view.CACHES, {'default': {
+            'BACKEND': 'locmem', 'KEY_PREFIX': 'example.org', 'TIMEOUT': 60}})
+        self.assertEqual(Settings.CACHES['default']['KEY_PREFIX'], 'base')
+
+    def test_read_only(self):
+        with self.assertRaises(AttributeError):
+            HostSettings(Settings()).SITE_ID = 3
+
+
+class HostOverlaysTestCase(unittest.TestCase):
+    def test_views_are_shared_by_pattern(self):
+        overlays = HostOverlays(OVERLAYS, Settings())
+        view = overlays.get('www.example.org')
+        self.assertEqual(view.pattern, '.example.org')
+        self.assertIs(overlays.get('a.example.org:8000'), view)
+        self.assertEqual(overlays.get('EXAMPLE.COM').SITE_ID, 2)
+
+    def test_other_hosts_get_the_base_view(self):
+        overlays = HostOverlays(OVERLAYS, Settings())
+        for host in ('example.net', 'www.example.com', 'example.org.evil.com', 'bad host'):
+            self.assertIs(overlays.get(host), overlays.base_view, host)
+        self.assertEqual(overlays.base_view.SITE_ID, 1)
+
+    def test_least_recently_used_views_are_dropped(self):
+        overlays = HostOverlays(OVERLAYS, Settings(), max_size=1)
+        view = overlays.get('example.com')
+        overlays.get('example.org')
+        self.assertEqual(list(overlays._views), ['.example.org'])
+        self.assertIsNot(overlays.get('example.com'), view)
+
+    def test_add_host_overlays(self):
+        middleware, loaders = add_host_overlays(
+            ['cinch.hosts.HostValidationMiddleware', 'django.middleware.common.CommonMiddleware'],
+            ('django.template.loaders.filesystem.Loader',))
+        self.assertEqual(middleware, [
+            'cinch.hosts.HostValidationMiddleware', 'cinch.overlays.HostOverlayMiddleware',
+            'django.middleware.common.CommonMiddleware'])
+        self.assertEqual(loaders, ['cinch.template_loaders.HostTemplateLoader',
+                                   'django.template.loaders.filesystem.Loader'])
+        self.assertEqual(add_host_overlays(middleware, loaders), (middleware, loaders))
+
+
+@unittest.skipIf(django is None, "Django isn't installed")
+class HostOverlayMiddlewareTestCase(unittest.TestCase):
+    def setUp(self):
+        from django.test.utils import override_settings
+        setup_django()
+        self.template_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.template_dir, 'page.html'), 'w') as template_f:
+            template_f.write('example.org page')
+        overlays = dict(OVERLAYS)
+        overlays['.example.org'] = dict(overlays['.example.org'],
+                                        TEMPLATE_DIRS=[self.template_dir])
+        self.override = override_settings(
+            HOST_OVERLAYS=overlays, ROOT_URLCONF='base.urls', ALLOWED_HOSTS=['*'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                'KEY_PREFIX': 'base'}})
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.template_dir)
+
+    def request(self, host):
+        from django.http import HttpRequest
+        request = HttpRequest()
+        request.META = {'HTTP_HOST': host, 'SERVER_NAME': 'testserver', 'SERVER_PORT': '80'}
+        return request
+
+    def test_request_uses_host_settings(self):
+        from django.conf import settings
+        from cinch.overlays import HostOverlayMiddleware, host_settings
+        middleware = HostOverlayMiddleware()
+        request = self.request('example.com')
+        middleware.process_request(request)
+        self.assertEqual(request.urlconf, 'example.urls')
+        self.assertIs(host_settings(), request.host_settings)
+        self.assertEqual(host_settings().SITE_ID, 2)
+        middleware.process_response(request, None)
+        self.assertIs(host_settings(), settings)
+        request = self.request('example.net')
+        middleware.process_request(request)
+        self.assertFalse(hasattr(request, 'urlconf'))
+        middleware.process_response(request, None)
+
+    def test_host_cache(self):
+        from cinch.overlays import HostOverlayMiddleware, host_cache
+        middleware = HostOverlayMiddleware()
+        request = self.request('www.example.org')
+        middleware.process_request(request)
+        try:
+            cache = host_cache()
+            self.assertEqual(cache.key_prefix, 'example.org')
+            self.assertIs(host_cache(), cache)
+        finally:
+            middleware.process_response(request, None)
+        self.assertEqual(host_cache().key_prefix, 'base')
+
+    def test_host_templates(self):
+        from django.template import Engine, TemplateDoesNotExist
+        from cinch.overlays import HostOverlayMiddleware
+        from cinch.template_loaders import HostTemplateLoader
+        loader = HostTemplateLoader(Engine())
+        middleware = HostOverlayMiddleware()
+        request = self.request('www.example.org')
+        middleware.process_request(request)
+        try:
+            template = loader.load_template('page.html')[0]
+            self.assertIs(request.host_settings.templates['page.html'][0], template)
+        finally:
+            middleware.process_response(request, None)
+        request = self.request('example.com')
+        middleware.process_request(request)
+        try:
+            self.assertRaises(TemplateDoesNotExist, loader.load_template, 'page.html')
+        finally:
+            middleware.process_response(request, None)
+
+    def test_unused_without_overlays(self):
+        from django.core.exceptions import MiddlewareNotUsed
+        from django.test.utils import override_settings
+        from cinch.overlays import HostOverlayMiddleware
+        with override_settings(HOST_OVERLAYS={}):
+            self.assertRaises(MiddlewareNotUsed, HostOverlayMiddleware)
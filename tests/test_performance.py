@@ -0,0 +1,52 @@
+from __future__ import absolute_import
+import unittest
+from cinch.performance import (
+    CACHED_LOADER, CONDITIONAL_GET_MIDDLEWARE, GZIP_MIDDLEWARE, SESSION_ENGINE,
+    apply_production_profile, check_production_profile)
+
+
+MEMCACHED = {'default': {'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache'}}
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ProductionProfileTestCase(unittest.TestCase):
+    def settings(self, **settings):
+        settings.setdefault('MIDDLEWARE_CLASSES', [
+            'cinch.hosts.HostValidationMiddleware',
+            'django.middleware.common.CommonMiddleware',
+            'debug_toolbar.middleware.DebugToolbarMiddleware',
+        ])
+        settings.setdefault('INSTALLED_APPS', ['django.contrib.auth', 'debug_toolbar'])
+        settings.setdefault('DATABASES', {'default': {}, 'pooled': {'POOL': {}}})
+        apply_production_profile(settings)
+        return settings
+
+    def test_profile(self):
+        settings = self.settings(CACHES=MEMCACHED)
+        self.assertEqual(settings['TEMPLATE_LOADERS'][0][0], CACHED_LOADER)
+        self.assertEqual(settings['SESSION_ENGINE'], SESSION_ENGINE)
+        self.assertEqual(settings['DATABASES']['default']['CONN_MAX_AGE'], 600)
+        self.assertNotIn('CONN_MAX_AGE', settings['DATABASES']['pooled'])
+        self.assertEqual(settings['MIDDLEWARE_CLASSES'], [
+            'cinch.hosts.HostValidationMiddleware', GZIP_MIDDLEWARE,
+            CONDITIONAL_GET_MIDDLEWARE, 'django.middleware.common.CommonMiddleware'])
+        self.assertEqual(settings['INSTALLED_APPS'], ['django.contrib.auth'])
+        self.assertEqual(check_production_profile(settings), [])
+
+    def test_sessions_not_cached_per_process(self):
+        for caches in ({}, LOCMEM):
+            settings = self.settings(CACHES=caches)
+            self.assertNotIn('SESSION_ENGINE', settings)
+            self.assertEqual([name for (name, problem) in check_production_profile(settings)],
+                             ['SESSION_ENGINE'])
+
+    def test_per_process_session_cache_reported(self):
+        settings = self.settings(CACHES=LOCMEM, SESSION_ENGINE=SESSION_ENGINE)
+        problems = check_production_profile(settings)
+        self.assertEqual(len(problems), 1)
+        self.assertIn("per process", problems[0][1])
+
+    def test_session_cache_alias(self):
+        caches = dict(LOCMEM, sessions=MEMCACHED['default'])
+        settings = self.settings(CACHES=caches, SESSION_CACHE_ALIAS='sessions')
+        self.assertEqual(settings['SESSION_ENGINE'], SESSION_ENGINE)
@@ -0,0 +1,103 @@
+from __future__ import absolute_import
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from cinch.db.pool import ConnectionPool, PoolExhausted
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'test.db')
+        connection = sqlite3.connect(self.db_path)
+        connection.execute('CREATE TABLE item (name TEXT)')
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def connect(self):
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def test_checkout_and_return(self):
+        pool = ConnectionPool(self.connect, max_size=2)
+        connection = pool.acquire()
+        connection.execute("INSERT INTO item VALUES ('a')")
+        connection.commit()
+        real = connection._connection
+        connection.close()
+        self.assertEqual(pool.get_stats()['idle'], 1)
+        again = pool.acquire()
+        self.assertIs(again._connection, real)
+        self.assertEqual(again.execute('SELECT name FROM item').fetchall(), [('a',)])
+        again.close()
+        stats = pool.get_stats()
+        self.assertEqual((stats['created'], stats['reused'], stats['released']), (1, 1, 2))
+
+    def test_return_rolls_back(self):
+        pool = ConnectionPool(self.connect, max_size=1)
+        connection = pool.acquire()
+        connection.execute("INSERT INTO item VALUES ('uncommitted')")
+        connection.close()
+        connection = pool.acquire()
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM item').fetchone(), (0,))
+        connection.close()
+
+    def test_exhausted(self):
+        pool = ConnectionPool(self.connect, max_size=1, timeout=0.1)
+        connection = pool.acquire()
+        self.assertRaises(PoolExhausted, pool.acquire)
+        connection.close()
+        pool.acquire().close()
+        self.assertEqual(pool.get_stats()['exhausted'], 1)
+
+    def test_waits_for_a_connection(self):
+        pool = ConnectionPool(self.connect, max_size=1, timeout=5)
+        connection = pool.acquire()
+        threading.Timer(0.1, connection.close).start()
+        pool.acquire().close()
+        self.assertEqual(pool.get_stats()['waited'], 1)
+        self.assertEqual(pool.get_stats()['created'], 1)
+
+    def test_unusable_connections_are_replaced(self):
+        pool = ConnectionPool(self.connect, max_size=1, check=lambda connection: False,
+                              check_after=0)
+        connection = pool.acquire()
+        real = connection._connection
+        connection.close()
+        connection = pool.acquire()
+        self.assertIsNot(connection._connection, real)
+        connection.close()
+        self.assertEqual(pool.get_stats()['closed_unusable'], 1)
+
+    def test_checks_run_outside_the_lock(self):
+        locked = []
+
+        def check(connection):
+            # Other threads can use the pool meanwhile.
+            locked.append(not pool._lock.acquire(False))
+            if not locked[-1]:
+                pool._lock.release()
+            return True
+
+        pool = ConnectionPool(self.connect, check=check, check_after=0)
+        pool.acquire().close()
+        pool.acquire().close()
+        self.assertEqual(locked, [False])
+        self.assertEqual(pool.get_stats()['reused'], 1)
+
+    def test_acquire_connects_with_its_connect(self):
+        pool = ConnectionPool(max_size=2)
+        paths = []
+
+        def connect():
+            paths.append(self.db_path)
+            return self.connect()
+
+        pool.acquire(connect).close()
+        pool.acquire(connect).close()
+        self.assertEqual(paths, [self.db_path])
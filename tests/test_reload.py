@@ -0,0 +1,97 @@
+from __future__ import absolute_import
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+try:
+    import django
+except ImportError:
+    django = None
+
+
+class Settings(object):
+    """Stands in for django.conf.settings."""
+    CINCH_LOG_LEVELS = {}
+
+
+@unittest.skipIf(django is None, "Django isn't installed")
+class SettingsReloaderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.etc_dir = tempfile.mkdtemp()
+        self.mtime = time.time()
+        self.settings = Settings()
+        self.logger = logging.getLogger('cinch.tests.reload')
+        self.logger.setLevel(logging.NOTSET)
+
+    def tearDown(self):
+        shutil.rmtree(self.etc_dir)
+        self.logger.setLevel(logging.NOTSET)
+
+    def write_cinch_json(self, settings):
+        conf_path = os.path.join(self.etc_dir, 'cinch.json')
+        with open(conf_path, 'w') as conf_f:
+            json.dump({'settings': settings}, conf_f)
+        # Move the mtime on, however coarse the filesystem's are.
+        self.mtime += 10
+        os.utime(conf_path, (self.mtime, self.mtime))
+
+    def reloader(self):
+        from cinch.reload import SettingsReloader
+        return SettingsReloader(self.etc_dir, self.settings,
+                                reloadable=['CINCH_LOG_LEVELS', 'CINCH_FLAG'])
+
+    def test_applies_and_reverts_log_levels(self):
+        self.write_cinch_json({})
+        reloader = self.reloader()
+        self.write_cinch_json({'cinch_log_levels': {'cinch.tests.reload': 'DEBUG'}})
+        self.assertEqual(reloader.poll(),
+                         {'CINCH_LOG_LEVELS': {'cinch.tests.reload': 'DEBUG'}})
+        self.assertEqual(self.settings.CINCH_LOG_LEVELS, {'cinch.tests.reload': 'DEBUG'})
+        self.assertEqual(self.logger.level, logging.DEBUG)
+        # Removed from cinch.json, so reverted to what it was before.
+        self.write_cinch_json({'unrelated': True})
+        self.assertEqual(reloader.poll(), {'CINCH_LOG_LEVELS': {}})
+        self.assertEqual(self.settings.CINCH_LOG_LEVELS, {})
+        self.assertEqual(self.logger.level, logging.NOTSET)
+
+    def test_unchanged_files_are_not_reloaded(self):
+        self.write_cinch_json({'cinch_flag': True})
+        self.settings.CINCH_FLAG = True
+        reloader = self.reloader()
+        self.assertEqual(reloader.poll(), {})
+
+    def test_settings_set_from_the_start_revert_to_defaults(self):
+        self.write_cinch_json({'cinch_log_levels': {'cinch': 'DEBUG'}})
+        self.settings.CINCH_LOG_LEVELS = {'cinch': 'DEBUG'}
+        self.settings.CINCH_RELOAD_DEFAULTS = {'CINCH_LOG_LEVELS': {}}
+        reloader = self.reloader()
+        self.write_cinch_json({})
+        self.assertEqual(reloader.poll(), {'CINCH_LOG_LEVELS': {}})
+        self.assertEqual(self.settings.CINCH_LOG_LEVELS, {})
+
+    def test_settings_set_from_the_start_without_defaults_are_unset(self):
+        self.write_cinch_json({'cinch_flag': True})
+        self.settings.CINCH_FLAG = True
+        reloader = self.reloader()
+        self.write_cinch_json({})
+        self.assertEqual(reloader.poll(), {'CINCH_FLAG': None})
+        self.assertFalse(hasattr(self.settings, 'CINCH_FLAG'))
+
+    def test_swaps_wrapped_settings(self):
+        from cinch.reload import swap_settings
+
+        class LazySettings(object):
+            def __init__(self, wrapped):
+                self._wrapped = wrapped
+
+        wrapped = Settings()
+        wrapped.CINCH_FLAG = False
+        lazy = LazySettings(wrapped)
+        swap_settings(lazy, {'CINCH_FLAG': True, 'CINCH_LOG_LEVELS': {'a': 'INFO'}})
+        self.assertIsNot(lazy._wrapped, wrapped)
+        self.assertEqual((lazy._wrapped.CINCH_FLAG, lazy._wrapped.CINCH_LOG_LEVELS),
+                         (True, {'a': 'INFO'}))
+        self.assertFalse(wrapped.CINCH_FLAG)
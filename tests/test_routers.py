@@ -0,0 +1,97 @@
+from __future__ import absolute_import
+import random
+import unittest
+try:
+    import django
+except ImportError:
+    django = None
+
+
+class Settings(object):
+    """Stands in for django.conf.settings."""
+    DATABASES = {
+        'default': {},
+        'replica1': {'REPLICA_OF': 'default', 'WEIGHT': 3},
+        'replica2': {'REPLICA_OF': 'default', 'WEIGHT': 1},
+        'drained': {'REPLICA_OF': 'default', 'WEIGHT': 0},
+    }
+    CINCH_REPLICA_SELECTION = 'weighted'
+    CINCH_REPLICA_CHECK_INTERVAL = 0
+    CINCH_REPLICA_EJECT_SECONDS = 30
+
+
+@unittest.skipIf(django is None, "Django isn't installed")
+class ReplicaRouterTestCase(unittest.TestCase):
+    def setUp(self):
+        from cinch.db.routers import unpin
+        unpin()
+        self.settings = Settings()
+        self.down = set()
+
+    def tearDown(self):
+        from cinch.db.routers import unpin
+        unpin()
+
+    def router(self, **settings):
+        from cinch.db.routers import ReplicaRouter
+        for (name, val) in settings.items():
+            setattr(self.settings, name, val)
+        down = self.down
+
+        class Router(ReplicaRouter):
+            def check(self, alias):
+                if alias in down:
+                    raise Exception("{} is down".format(alias))
+
+        return Router(self.settings)
+
+    def test_weighted_choice(self):
+        router = self.router()
+        random.seed(0)
+        reads = [router.db_for_read(None) for i in range(400)]
+        self.assertNotIn('drained', reads)
+        self.assertNotIn('default', reads)
+        self.assertTrue(200 < reads.count('replica1') < 400)
+        self.assertTrue(0 < reads.count('replica2') < 200)
+
+    def test_lru_choice(self):
+        router = self.router(CINCH_REPLICA_SELECTION='lru')
+        reads = [router.db_for_read(None) for i in range(4)]
+        self.assertEqual(reads, ['replica1', 'replica2', 'replica1', 'replica2'])
+
+    def test_unhealthy_replicas_are_ejected(self):
+        router = self.router()
+        self.down.add('replica1')
+        self.assertEqual(set(router.db_for_read(None) for i in range(20)), set(['replica2']))
+        self.down.clear()
+        # Still ejected, though it's back.
+        self.assertEqual(set(router.db_for_read(None) for i in range(20)), set(['replica2']))
+        router.eject('replica2')
+        self.assertEqual(router.db_for_read(None), 'default')
+
+    def test_writes_pin_reads_to_the_primary(self):
+        from cinch.db.routers import has_written, unpin
+        router = self.router()
+        self.assertEqual(router.db_for_write(None), 'default')
+        self.assertTrue(has_written())
+        self.assertEqual(router.db_for_read(None), 'default')
+        unpin()
+        self.assertNotEqual(router.db_for_read(None), 'default')
+
+    def test_middleware_unpins_each_request(self):
+        from cinch.db.middleware import ReplicaPinningMiddleware
+        from cinch.db.routers import is_pinned, pin
+        middleware = ReplicaPinningMiddleware.__new__(ReplicaPinningMiddleware)
+        middleware.pin_seconds = 0
+        pin()
+        middleware.process_request(type('Request', (object,), {'COOKIES': {}})())
+        self.assertFalse(is_pinned())
+
+    def test_pinning_middleware_is_added(self):
+        from cinch.db.middleware import MIDDLEWARE, add_pinning_middleware
+        middleware = add_pinning_middleware([
+            'cinch.reload.SettingsReloadMiddleware',
+            'django.contrib.sessions.middleware.SessionMiddleware',
+        ])
+        self.assertEqual(middleware[1], MIDDLEWARE)
+        self.assertEqual(add_pinning_middleware(middleware), middleware)
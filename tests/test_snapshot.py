@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+from cinch.snapshot import SettingsSnapshot, settings_seed, snapshot_settings
+
+
+class SettingsSeedTestCase(unittest.TestCase):
+    def test_same_settings_same_seed(self):
+        first = {'ADMINS': (('Admin', 'admin@example.com'),), 'PROJECT_NAME': 'example',
+                 'HOSTS': set(['b', 'a', 'c']), 'DEBUG': False}
+        second = dict(first, HOSTS=set(['c', 'a', 'b']))
+        self.assertEqual(settings_seed(first, 'base.py'), settings_seed(second, 'base.py'))
+        self.assertNotEqual(settings_seed(first, 'base.py'), settings_seed(first, 'prod.py'))
+        self.assertNotEqual(settings_seed(first), settings_seed(dict(first, DEBUG=True)))
+
+    def test_functions_and_lower_case_names_are_left_out(self):
+        settings = {'PROJECT_NAME': 'example'}
+        with_helpers = dict(settings, S=settings.setdefault, os=os, helper=object())
+        self.assertEqual(snapshot_settings(with_helpers), settings)
+        self.assertEqual(settings_seed(settings), settings_seed(with_helpers))
+
+    def test_unserialisable_settings_have_no_seed(self):
+        # Their repr() would include their address, so would never match.
+        self.assertIsNone(settings_seed({'THING': object()}))
+
+
+class SettingsSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'settings.snapshot')
+        self.dependency = os.path.join(self.tmp_dir, 'cinch.json')
+        with open(self.dependency, 'w') as dependency_f:
+            dependency_f.write('{}')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_loaded_until_a_dependency_changes(self):
+        SettingsSnapshot(self.path, 'seed').save({'DEBUG': True}, files=[self.dependency])
+        self.assertEqual(SettingsSnapshot(self.path, 'seed').load(), {'DEBUG': True})
+        self.assertIsNone(SettingsSnapshot(self.path, 'other seed').load())
+        with open(self.dependency, 'w') as dependency_f:
+            dependency_f.write('{"settings": {}}')
+        self.assertIsNone(SettingsSnapshot(self.path, 'seed').load())
@@ -0,0 +1,165 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from . import django, setup_django
+
+
+@unittest.skipIf(django is None, "Django isn't installed")
+class StaticFilesTestCase(unittest.TestCase):
+    def setUp(self):
+        from django.test.utils import override_settings
+        setup_django()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.src_dir = os.path.join(self.tmp_dir, 'src')
+        self.other_dir = os.path.join(self.tmp_dir, 'other')
+        self.root = os.path.join(self.tmp_dir, 'static')
+        self.manifest_path = os.path.join(self.tmp_dir, 'var', 'manifest.json')
+        self.override = override_settings(
+            STATICFILES_FINDERS=['cinch.staticfiles.IndexedFinder'],
+            REVKOM_STATICFILES={'': self.src_dir, 'css/site.css': self.other_dir + '/site.css'},
+            STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+            STATIC_ROOT=self.root, CINCH_STATIC_MANIFEST=self.manifest_path)
+        self.override.enable()
+        self.clear_finders()
+
+    def tearDown(self):
+        self.override.disable()
+        self.clear_finders()
+        shutil.rmtree(self.tmp_dir)
+
+    def clear_finders(self):
+        # Finders are cached, and IndexedFinder indexes the files once.
+        from django.contrib.staticfiles.finders import get_finder
+        get_finder.cache_clear()
+
+    def write(self, path, content, mtime=None):
+        dir_path = os.path.dirname(path)
+        if not os.path.isdir(dir_path):
+            os.makedirs(dir_path)
+        with open(path, 'w') as file_f:
+            file_f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def read(self, static_path):
+        with open(os.path.join(self.root, *static_path.split('/'))) as file_f:
+            return file_f.read()
+
+    def collect(self, **kwargs):
+        from cinch.staticfiles import collect
+        self.clear_finders()
+        report = collect(threads=2, **kwargs)
+        return dict((key, report[key]) for key in ('files', 'copied', 'skipped', 'removed'))
+
+
+class CollectTestCase(StaticFilesTestCase):
+    def setUp(self):
+        super(CollectTestCase, self).setUp()
+        self.mtime = time.time() - 100
+        self.write(os.path.join(self.src_dir, 'js', 'app.js'), 'app()', self.mtime)
+        self.write(os.path.join(self.src_dir, 'css', 'site.css'), 'src', self.mtime)
+        self.write(os.path.join(self.src_dir, '.hidden'), 'ignored', self.mtime)
+        self.write(os.path.join(self.other_dir, 'site.css'), 'other', self.mtime)
+
+    def test_unchanged_files_are_skipped(self):
+        self.assertEqual(self.collect(),
+                         {'files': 2, 'copied': 2, 'skipped': 0, 'removed': 0})
+        self.assertEqual((self.read('js/app.js'), self.read('css/site.css')), ('app()', 'src'))
+        self.assertFalse(os.path.exists(os.path.join(self.root, '.hidden')))
+        self.assertEqual(self.collect(),
+                         {'files': 2, 'copied': 0, 'skipped': 2, 'removed': 0})
+        # Touched, but the same, it's hashed rather than copied.
+        self.write(os.path.join(self.src_dir, 'js', 'app.js'), 'app()', self.mtime + 10)
+        self.assertEqual(self.collect()['copied'], 0)
+        self.write(os.path.join(self.src_dir, 'js', 'app.js'), 'app(1)', self.mtime + 20)
+        self.assertEqual(self.collect()['copied'], 1)
+        self.assertEqual(self.read('js/app.js'), 'app(1)')
+        self.assertEqual(self.collect(force=True)['copied'], 2)
+
+    def test_stale_files_are_removed(self):
+        self.collect()
+        app_path = os.path.join(self.root, 'js', 'app.js')
+        self.write(app_path + '.gz', 'compressed')
+        os.remove(os.path.join(self.src_dir, 'js', 'app.js'))
+        self.assertEqual(self.collect(),
+                         {'files': 1, 'copied': 0, 'skipped': 1, 'removed': 1})
+        self.assertFalse(os.path.exists(app_path))
+        self.assertFalse(os.path.exists(app_path + '.gz'))
+        # Only once.
+        self.assertEqual(self.collect()['removed'], 0)
+
+    def test_dry_run(self):
+        self.assertEqual(self.collect(dry_run=True)['copied'], 2)
+        self.assertFalse(os.path.exists(self.root))
+        self.assertFalse(os.path.exists(self.manifest_path))
+
+    def test_indexed_finder_finds_every_match(self):
+        from cinch.staticfiles import IndexedFinder
+        finder = IndexedFinder()
+        # The directory comes first, by static path.
+        self.assertEqual(finder.find('css/site.css'),
+                         os.path.join(self.src_dir, 'css', 'site.css'))
+        self.assertEqual(finder.find('css/site.css', all=True), [
+            os.path.join(self.src_dir, 'css', 'site.css'),
+            os.path.join(self.other_dir, 'site.css')])
+        self.assertEqual(finder.find('missing.css'), [])
+        self.assertEqual(sorted(path for (path, storage) in finder.list(['.*'])),
+                         ['css/site.css', 'js/app.js'])
+
+
+class CompressFilesTestCase(StaticFilesTestCase):
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def compress(self, names, **kwargs):
+        from cinch.staticfiles import compress_files
+        return compress_files(self.root, names, threads=2, min_size=100, **kwargs)
+
+    def test_compressed_copies(self):
+        import gzip
+        self.write(self.path('js/app.js'), 'app();\n' * 100)
+        self.assertEqual(self.compress(['js/app.js']), 1)
+        with gzip.open(self.path('js/app.js.gz')) as gzip_f:
+            self.assertEqual(gzip_f.read(), b'app();\n' * 100)
+        # Dated as the original, so they're only compressed again if it changes.
+        self.assertEqual(int(os.stat(self.path('js/app.js.gz')).st_mtime),
+                         int(os.stat(self.path('js/app.js')).st_mtime))
+        self.assertEqual(self.compress(['js/app.js']), 0)
+        mtime = time.time() + 10
+        self.write(self.path('js/app.js'), 'app(1);\n' * 100, mtime)
+        self.assertEqual(self.compress(['js/app.js']), 1)
+
+    def test_same_bytes_every_time(self):
+        self.write(self.path('app.js'), 'app();\n' * 100)
+        self.compress(['app.js'])
+        with open(self.path('app.js.gz'), 'rb') as gzip_f:
+            first = gzip_f.read()
+        os.remove(self.path('app.js.gz'))
+        self.compress(['app.js'])
+        with open(self.path('app.js.gz'), 'rb') as gzip_f:
+            self.assertEqual(gzip_f.read(), first)
+
+    def test_files_not_worth_compressing(self):
+        self.write(self.path('logo.png'), 'x' * 1000)
+        with open(self.path('random.bin'), 'wb') as random_f:
+            random_f.write(os.urandom(1000))
+        self.assertEqual(self.compress(['logo.png', 'random.bin'], gzip_level=1), 0)
+        self.assertFalse(os.path.exists(self.path('logo.png.gz')))
+        self.assertFalse(os.path.exists(self.path('random.bin.gz')))
+
+    def test_copies_of_files_now_too_small_are_removed(self):
+        self.write(self.path('app.js'), 'app();\n' * 100)
+        self.compress(['app.js'])
+        self.write(self.path('app.js'), 'app();', time.time() + 10)
+        self.assertEqual(self.compress(['app.js']), 0)
+        self.assertFalse(os.path.exists(self.path('app.js.gz')))
+
+    def test_gzip_setting(self):
+        from django.test.utils import override_settings
+        self.write(self.path('app.js'), 'app();\n' * 100)
+        with override_settings(CINCH_STATIC_GZIP=False):
+            self.assertEqual(self.compress(['app.js']), 0)
+        self.assertFalse(os.path.exists(self.path('app.js.gz')))
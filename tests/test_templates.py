@@ -0,0 +1,54 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+from cinch.templates import format_warm_report, template_names
+from . import django, setup_django
+
+
+class TemplatesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dirs = [os.path.join(self.tmp_dir, 'project'), os.path.join(self.tmp_dir, 'app')]
+        self.write('project/base.html', '<title>{% block title %}{% endblock %}</title>')
+        self.write('project/pages/home.html',
+                   '{% extends "base.html" %}{% block title %}Home{% endblock %}')
+        self.write('project/pages/.home.html.swp', '')
+        self.write('project/.git/HEAD.html', '')
+        self.write('project/email/welcome.txt', 'Welcome')
+        self.write('project/style.css', '')
+        self.write('app/base.html', 'Overridden by the project')
+        self.write('app/broken.html', '{% if %}')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as template_f:
+            template_f.write(content)
+
+    def test_template_names(self):
+        self.assertEqual(template_names(self.dirs),
+                         ['base.html', 'email/welcome.txt', 'pages/home.html', 'broken.html'])
+        self.assertEqual(template_names(self.dirs, ['.txt']), ['email/welcome.txt'])
+
+    @unittest.skipIf(django is None, "Django isn't installed")
+    def test_warm_templates(self):
+        from django.test.utils import override_settings
+        from cinch.templates import warm_templates
+        setup_django()
+        loaders = [('django.template.loaders.cached.Loader',
+                    ['django.template.loaders.filesystem.Loader'])]
+        with override_settings(TEMPLATE_DIRS=self.dirs, TEMPLATES=[{
+                'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                'DIRS': self.dirs, 'OPTIONS': {'loaders': loaders}}]):
+            report = warm_templates(threads=2)
+        self.assertEqual(report['templates'], 4)
+        self.assertEqual([name for (name, error) in report['failures']], ['broken.html'])
+        self.assertEqual(sorted(name for (seconds, name) in report['timings']),
+                         ['base.html', 'broken.html', 'email/welcome.txt', 'pages/home.html'])
+        self.assertIn('Failed: broken.html', format_warm_report(report))